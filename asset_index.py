@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from convert_images import file_hash
+
+# SQLite 缓存：文件以 (根目录, 路径) 为键，(inode, 大小, 修改时间) 任一变化即视为失效
+INDEX_FILE = ".asset-index.sqlite"
+SCHEMA_VERSION = 2
+
+# LRU 上限：超出时最久没有被查询过的缓存行最先淘汰
+MAX_ENTRIES = 200000
+# 最近使用时间按天记录，同一天内无变化的重复运行不需要写数据库
+LRU_RESOLUTION = 86400
+
+def _today():
+    return int(time.time()) // LRU_RESOLUTION
+
+def scan_tree(root="public"):
+    """用 os.scandir 遍历一次目录树，返回 (文件索引, 目录列表)
+
+    文件索引为 相对路径 -> {inode, size, mtime_ns, hash, width, height}。哈希和尺寸
+    先留空，第一次用到时才按路径查询缓存（见 lookup_entry），查不到再计算。
+    """
+    files = {}
+    dirs = []
+    stack = [""]
+
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(root, rel_dir)) as entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(rel_path)
+                    stack.append(rel_path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    files[rel_path] = {
+                        'inode': stat.st_ino,
+                        'size': stat.st_size,
+                        'mtime_ns': stat.st_mtime_ns,
+                        'hash': None,
+                        'width': None,
+                        'height': None,
+                    }
+
+    return files, sorted(dirs)
+
+def connect(index_file=INDEX_FILE):
+    """打开缓存数据库，结构版本不一致时清空重建"""
+    db = sqlite3.connect(index_file)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        db.executescript(f"""
+            DROP TABLE IF EXISTS files;
+            DROP TABLE IF EXISTS validations;
+            CREATE TABLE files (
+                root TEXT NOT NULL, path TEXT NOT NULL,
+                inode INTEGER, size INTEGER, mtime_ns INTEGER,
+                hash TEXT, width INTEGER, height INTEGER,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (root, path)
+            ) WITHOUT ROWID;
+            CREATE INDEX files_last_used ON files (last_used);
+            CREATE TABLE validations (
+                name TEXT PRIMARY KEY, signature TEXT NOT NULL, result TEXT NOT NULL,
+                last_used INTEGER NOT NULL
+            );
+            PRAGMA user_version = {SCHEMA_VERSION};
+        """)
+    return db
+
+def load_index(index_file=INDEX_FILE):
+    """读取缓存的校验结果，数据库损坏时返回 None
+
+    文件行不在这里整体读出：无变化的重复运行通常只用到很少几个文件的哈希，
+    整表读入在十万个文件时和目录扫描本身一样耗时。文件行由 lookup_entry 按路径查询。
+    """
+    try:
+        db = connect(index_file)
+    except sqlite3.DatabaseError:
+        return None
+    try:
+        return {name: {'signature': signature, 'result': json.loads(result)}
+                for name, signature, result in db.execute("SELECT name, signature, result FROM validations")}
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        db.close()
+
+def open_db(index):
+    """索引共用一个数据库连接，第一次查询时才打开，save_index 时关闭"""
+    if index.get('db') is None:
+        index['db'] = connect(index['index_file'])
+    return index['db']
+
+def _apply_cached(entry, row):
+    """记下查询到的缓存行，inode、大小和修改时间都一致时沿用缓存的哈希和尺寸"""
+    entry['cached'] = row
+    if row and (row[0], row[1], row[2]) == (entry['inode'], entry['size'], entry['mtime_ns']):
+        entry['hash'], entry['width'], entry['height'] = row[3], row[4], row[5]
+
+def lookup_entry(index, rel_path):
+    """第一次用到某个文件时查询缓存，同一目录下的文件一次查出
+
+    用到一个文件的工具通常会用到同目录的其他文件，按目录批量查询比逐个路径查询快得多。
+    """
+    entry = index['files'][rel_path]
+    if 'cached' in entry:
+        return entry
+    if not index['index_file']:
+        entry['cached'] = None
+        return entry
+    rel_dir = os.path.dirname(rel_path)
+    try:
+        db = open_db(index)
+        if rel_dir in index['loaded_dirs']:
+            # 目录已经查过：这是缓存中没有的文件，或被 refresh_entry 替换的条目（缓存行已失效）
+            entry['cached'] = None
+            return entry
+        prefix = f"{rel_dir}/" if rel_dir else ""
+        # 主键范围查询，只取目录下的直接子文件
+        rows = db.execute(
+            "SELECT path, inode, size, mtime_ns, hash, width, height, last_used FROM files "
+            "WHERE root = ? AND path >= ? AND path < ? AND instr(substr(path, ?), '/') = 0",
+            (index['root'], prefix, prefix + '\uffff', len(prefix) + 1))
+        cached = {row[0]: row[1:] for row in rows}
+    except sqlite3.DatabaseError:
+        # 数据库损坏时不再查询，全部重新计算
+        index['index_file'] = None
+        entry['cached'] = None
+        return entry
+    index['loaded_dirs'].add(rel_dir)
+    files = index['files']
+    for name in cached.keys() | {rel_path}:
+        other = files.get(name)
+        if other is not None and 'cached' not in other:
+            _apply_cached(other, cached.get(name))
+    return entry
+
+def save_index(index, index_file=INDEX_FILE):
+    """只把查询过且有变化的行写回缓存，并按 LRU 淘汰超出上限的旧行"""
+    if not index_file or not index.get('index_file'):
+        close_db(index)
+        return
+    today = _today()
+    rows = []
+    for path, entry in index['files'].items():
+        if 'cached' not in entry or (entry['hash'] is None and entry['width'] is None):
+            continue
+        row = (entry['inode'], entry['size'], entry['mtime_ns'], entry['hash'], entry['width'], entry['height'],
+               today)
+        if entry['cached'] != row:
+            entry['cached'] = row
+            rows.append((index['root'], path, *row))
+
+    validations = {name: v for name, v in index.get('validations', {}).items() if v.get('dirty')}
+    if not rows and not validations:
+        close_db(index)
+        return
+
+    db = open_db(index) if index_file == index['index_file'] else connect(index_file)
+    try:
+        with db:
+            if rows:
+                db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            for name, validation in validations.items():
+                db.execute("INSERT OR REPLACE INTO validations VALUES (?, ?, ?, ?)",
+                           (name, validation['signature'], json.dumps(validation['result'], ensure_ascii=False),
+                            today))
+                validation['dirty'] = False
+
+            excess = db.execute("SELECT COUNT(*) FROM files").fetchone()[0] - MAX_ENTRIES if rows else 0
+            if excess > 0:
+                # 最久没有被查询过的行最先淘汰，今天用到的行不淘汰
+                db.execute("DELETE FROM files WHERE (root, path) IN "
+                           "(SELECT root, path FROM files WHERE last_used < ? ORDER BY last_used LIMIT ?)",
+                           (today, excess))
+    finally:
+        db.close()
+        index['db'] = None
+
+def close_db(index):
+    """关闭索引共用的数据库连接"""
+    if index.get('db') is not None:
+        index['db'].close()
+        index['db'] = None
+
+def build_index(root="public", index_file=INDEX_FILE):
+    """遍历一次 root 建立内存索引；缓存的哈希和尺寸按需查询，校验结果一次读入"""
+    validations = load_index(index_file) if index_file else None
+
+    files, dirs = scan_tree(root)
+    return {
+        'version': SCHEMA_VERSION,
+        'root': root,
+        'files': files,
+        'dirs': dirs,
+        # 数据库损坏时为 None，之后只在内存中计算
+        'index_file': index_file if validations is not None else None,
+        'db': None,
+        'loaded_dirs': set(),
+        'validations': validations or {},
+    }
+
+def tree_signature(index):
+    """目录树中文件集合的摘要，只要有文件增删就会变化"""
+    digest = hashlib.sha1()
+    for path in sorted(index['files']):
+        digest.update(path.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+def file_signature(paths):
+    """一组文件的 (inode, 大小, 修改时间) 摘要，文件不存在时记为空"""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{path}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{path}:-")
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+def cached_validation(index, name, signature):
+    """返回签名一致的上次校验结果，没有或已失效时返回 None"""
+    validation = index.get('validations', {}).get(name)
+    if validation and validation['signature'] == signature:
+        return validation['result']
+    return None
+
+def store_validation(index, name, signature, result):
+    """记录本次校验结果，save_index 时写入缓存"""
+    index.setdefault('validations', {})[name] = {'signature': signature, 'result': result, 'dirty': True}
+
+def url_to_path(url):
+    """把站点 URL（/gallery/a.webp）转换为索引中的相对路径"""
+    return url.split('?', 1)[0].split('#', 1)[0].lstrip('/')
+
+def url_exists(index, url):
+    """检查 URL 对应的文件是否在索引中"""
+    return url_to_path(url) in index['files']
+
+def full_path(index, rel_path):
+    """返回索引中相对路径对应的磁盘路径"""
+    return os.path.join(index['root'], rel_path)
+
+def get_hash(index, rel_path):
+    """返回文件内容哈希，首次访问时计算并写入索引"""
+    entry = lookup_entry(index, rel_path)
+    if not entry['hash']:
+        entry['hash'] = file_hash(full_path(index, rel_path))
+    return entry['hash']
+
+def get_dimensions(index, rel_path):
+    """返回图片的 (宽, 高)，首次访问时只读取文件头并写入索引"""
+    from PIL import Image
+
+    entry = lookup_entry(index, rel_path)
+    if entry.get('width') is None:
+        with Image.open(full_path(index, rel_path)) as image:
+            entry['width'], entry['height'] = image.size
+    return entry['width'], entry['height']
+
+def refresh_entry(index, rel_path):
+    """文件被改写后重新读取状态，缓存的哈希和尺寸随之失效"""
+    stat = os.stat(full_path(index, rel_path))
+    index['files'][rel_path] = {
+        'inode': stat.st_ino,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': None,
+        'width': None,
+        'height': None,
+    }
+    return index['files'][rel_path]
+
+def files_with_suffix(index, suffixes):
+    """按扩展名（不区分大小写）筛选索引中的文件，返回排序后的相对路径"""
+    suffixes = {s.lower() for s in suffixes}
+    return sorted(p for p in index['files'] if os.path.splitext(p)[1].lower() in suffixes)
+
+def total_size(index, prefix=""):
+    """统计索引中文件的总大小，可以只统计某个子目录"""
+    if not prefix:
+        return sum(entry['size'] for entry in index['files'].values())
+    prefix = prefix.rstrip('/') + '/'
+    return sum(entry['size'] for path, entry in index['files'].items() if path.startswith(prefix))
+
+def remove_file(index, rel_path):
+    """删除磁盘文件并同步更新索引，返回被删除文件的大小"""
+    entry = index['files'].pop(rel_path)
+    os.unlink(full_path(index, rel_path))
+    return entry['size']
+
+def empty_dirs(index):
+    """根据索引找出空目录（含只包含空目录的目录），按从深到浅排序以便逐级删除"""
+    has_files = {os.path.dirname(p) for p in index['files']}
+    children = {}
+    for d in index['dirs']:
+        children.setdefault(os.path.dirname(d), []).append(d)
+
+    empty = []
+    empty_set = set()
+    for d in sorted(index['dirs'], key=lambda d: d.count('/'), reverse=True):
+        if d not in has_files and all(c in empty_set for c in children.get(d, [])):
+            empty_set.add(d)
+            empty.append(d)
+    return empty
+
+def remove_dir(index, rel_dir):
+    """删除空目录并同步更新索引"""
+    os.rmdir(full_path(index, rel_dir))
+    index['dirs'].remove(rel_dir)
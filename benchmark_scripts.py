@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import builtins
+import resource
+import tempfile
+import contextlib
+import multiprocessing
+
+# 生成中文文件名用的词汇，包含映射表里的词和映射表里没有的字
+CHINESE_WORDS = ['白平衡', '点', '测光', '博贺港', '全景', '晚霞', '渔夫', '构图', '色彩', '逆光',
+                 '示意图', '相机', '镜头', '海边', '看海', '非常态', '瞪']
+
+LESSON_NAMES = ['第一课  摄影简史', '第二课  相机、附件', '第三课   摄影曝光原理（一）',
+                '第五课  摄影构图（一）', '第七课  摄影用光', '第八课  摄影色彩的运用']
+
+def random_chinese_name(rng):
+    """随机拼出一个中文文件名（不含扩展名）"""
+    return ''.join(rng.choice(CHINESE_WORDS) for _ in range(rng.randint(1, 4))) + str(rng.randint(1, 99))
+
+def generate_tree(root, images=10000, depth=4, chinese_ratio=0.5, seed=42):
+    """在 root 下生成合成的 public/ 目录和 src/data 数据文件，返回生成信息"""
+    rng = random.Random(seed)
+    public = os.path.join(root, "public")
+    os.makedirs(os.path.join(root, "src", "data"))
+
+    galleries = []
+    tutorials = []
+    chinese_paths = []
+    per_gallery = max(1, images // 50)
+
+    for i in range(images):
+        if i % per_gallery == 0:
+            gallery_slug = f"gallery-{len(galleries):03d}"
+            galleries.append({'slug': gallery_slug, 'title': f"作品集{len(galleries)}",
+                              'description': "合成测试数据", 'photos': []})
+            tutorial = {'slug': f"lesson-{len(tutorials):03d}", 'title': f"教程{len(tutorials)}",
+                        'images': []}
+            tutorials.append(tutorial)
+
+        # 一半图片放在多层课程目录里，一半放在作品集目录里
+        if i % 2:
+            parts = ["images", rng.choice(LESSON_NAMES)] + [f"章节{d}" for d in range(rng.randint(1, depth))]
+        else:
+            parts = ["gallery", gallery_slug]
+        directory = os.path.join(public, *parts)
+        os.makedirs(directory, exist_ok=True)
+
+        if rng.random() < chinese_ratio:
+            name = random_chinese_name(rng) + ".webp"
+        else:
+            name = f"image-{i}.webp"
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            path = os.path.join(directory, f"dup-{i}-{name}")
+
+        # 少量内容重复的文件，供去重逻辑使用
+        content = b"RIFF" + (str(i % (images // 20 or 1)) if i % 20 == 0 else str(i)).encode() * 16
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        url = "/" + os.path.relpath(path, public).replace(os.sep, '/')
+        if parts[0] == "images":
+            chinese_paths.append(path)
+            tutorial['images'].append(url)
+            tutorial.setdefault('featuredImageUrl', url)
+        else:
+            galleries[-1].setdefault('coverPhotoUrl', url)
+            galleries[-1]['photos'].append({'id': f"p-{i}", 'title': name, 'url': url, 'thumbnailUrl': url,
+                                            'date': "2023-01-01", 'location': "测试"})
+
+        # 清理脚本要删除的 JPG/NEF/TXT 文件
+        if i % 10 == 0:
+            with open(os.path.splitext(path)[0] + rng.choice(['.jpg', '.jpeg', '.NEF', '.txt']), 'wb') as f:
+                f.write(content)
+
+    # 约 1% 的引用指向不存在的文件
+    for gallery in galleries:
+        for photo in gallery['photos'][::100]:
+            photo['url'] = photo['url'].replace('.webp', '-missing.webp')
+
+    with open(os.path.join(root, "src", "data", "galleries.json"), 'w', encoding='utf-8') as f:
+        json.dump(galleries, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(root, "src", "data", "tutorials.json"), 'w', encoding='utf-8') as f:
+        json.dump(tutorials, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(root, "src", "data", "photographer.json"), 'w', encoding='utf-8') as f:
+        json.dump({'name': "测试", 'avatarUrl': "/photographer-avatar.webp"}, f, ensure_ascii=False)
+
+    return {'images': images, 'galleries': len(galleries), 'tutorials': len(tutorials),
+            'chinese_paths': len(chinese_paths)}
+
+def read_io_counters():
+    """读取 /proc/self/io 中的读写系统调用次数（非 Linux 返回空）"""
+    try:
+        with open('/proc/self/io') as f:
+            return {k: int(v) for k, v in (line.split(': ') for line in f)}
+    except OSError:
+        return {}
+
+def read_rss_kb():
+    """读取 /proc/self/status 中当前的常驻内存（KB，非 Linux 返回 None）"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+# 按名字统计的文件系统调用：stat 类、打开文件、列目录
+COUNTED_CALLS = {
+    'stat_calls': [(os, 'stat'), (os, 'lstat')],
+    'open_calls': [(builtins, 'open'), (os, 'open')],
+    'scandir_calls': [(os, 'scandir'), (os, 'listdir')],
+}
+
+@contextlib.contextmanager
+def count_fs_calls(counts):
+    """临时包装 os.stat/os.scandir/open 等函数，把调用次数累加到 counts
+
+    /proc/self/io 只有读写次数，stat 和 openat 要在 Python 层计数。os.path.exists、os.walk
+    和 pathlib 都通过这些模块属性调用，所以能被统计到；工作进程里的调用不计入。
+    """
+    originals = []
+    for key, targets in COUNTED_CALLS.items():
+        counts[key] = 0
+        for module, name in targets:
+            original = getattr(module, name)
+            originals.append((module, name, original))
+
+            def wrapper(*args, _original=original, _key=key, **kwargs):
+                counts[_key] += 1
+                return _original(*args, **kwargs)
+            setattr(module, name, wrapper)
+    try:
+        yield counts
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+
+def measure(func, workdir, result_queue):
+    """在子进程中运行 func 并测量墙钟时间、文件系统调用、读写次数和峰值内存"""
+    # 各脚本都使用相对于当前目录的 public/ 和 src/data 路径
+    os.chdir(workdir)
+
+    before_io = read_io_counters()
+    # fork 出的进程一开始就带着父进程的内存，ru_maxrss 是包含这部分的绝对值
+    start_rss = read_rss_kb()
+    before_usage = resource.getrusage(resource.RUSAGE_SELF)
+    fs_calls = {}
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), count_fs_calls(fs_calls):
+        func()
+    wall = time.perf_counter() - start
+    after_usage = resource.getrusage(resource.RUSAGE_SELF)
+    # 本进程是每次运行新 fork 的，RUSAGE_CHILDREN 只包含本次运行启动的工作进程
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    after_io = read_io_counters()
+
+    result = {
+        'wall_seconds': round(wall, 4),
+        'user_seconds': round(after_usage.ru_utime - before_usage.ru_utime, 4),
+        'system_seconds': round(after_usage.ru_stime - before_usage.ru_stime, 4),
+        # Linux 上 ru_maxrss 的单位是 KB；绝对峰值，包含 fork 时继承的父进程内存
+        'peak_rss_abs_kb': after_usage.ru_maxrss,
+        # 本次运行的工作进程中最大的一个的峰值，没有工作进程时为 0
+        'workers_peak_rss_kb': children_usage.ru_maxrss,
+    }
+    result.update(fs_calls)
+    if start_rss is not None:
+        result['start_rss_kb'] = start_rss
+        # 本次运行在继承的内存之上增加的峰值
+        result['peak_rss_growth_kb'] = max(0, after_usage.ru_maxrss - start_rss)
+    if before_io:
+        # /proc/self/io 的 syscr/syscw 只统计 read/write 类调用
+        result['read_syscalls'] = after_io['syscr'] - before_io['syscr']
+        result['write_syscalls'] = after_io['syscw'] - before_io['syscw']
+        result['bytes_read'] = after_io['rchar'] - before_io['rchar']
+        result['bytes_written'] = after_io['wchar'] - before_io['wchar']
+    result_queue.put(result)
+
+def bench_check_image_paths():
+    import check_images
+    check_images.check_image_paths(verbose=False)
+
+def bench_cleanup_public_directory():
+    import cleanup_images
+    cleanup_images.cleanup_public_directory()
+
+def bench_create_english_filename():
+    import fix_chinese_filenames
+    names = []
+    for root, dirs, files in os.walk("public"):
+        names.extend(files)
+    for name in names:
+        fix_chinese_filenames.create_english_filename(name)
+
+def bench_rename_files_in_directory():
+    import fix_chinese_filenames
+    fix_chinese_filenames.rename_files_in_directory("public/images")
+
+def bench_update_json_references():
+    import fix_remaining_chinese_names
+    renamed_items = []
+    for root, dirs, files in os.walk("public/images"):
+        for name in files:
+            old = os.path.join(root, name)
+            renamed_items.append({'type': 'file', 'old': old, 'new': os.path.join(root, "renamed-" + name)})
+    fix_remaining_chinese_names.update_json_references(renamed_items)
+
+# 名称 -> (函数, 是否会修改目录树)
+BENCHMARKS = {
+    'check_images.check_image_paths': (bench_check_image_paths, False),
+    'cleanup_images.cleanup_public_directory': (bench_cleanup_public_directory, True),
+    'fix_chinese_filenames.create_english_filename': (bench_create_english_filename, False),
+    'fix_chinese_filenames.rename_files_in_directory': (bench_rename_files_in_directory, True),
+    'fix_remaining_chinese_names.update_json_references': (bench_update_json_references, True),
+}
+
+def run_benchmark(name, base_dir, repeat=1):
+    """在独立进程和独立沙箱目录中运行一个基准测试，返回多次运行的结果"""
+    func, mutates = BENCHMARKS[name]
+    context = multiprocessing.get_context('fork')
+    runs = []
+
+    for _ in range(repeat):
+        # 会修改文件的脚本在目录树副本中运行，原始合成数据不受影响
+        workdir = base_dir
+        if mutates:
+            workdir = tempfile.mkdtemp(prefix="bench-sandbox-")
+            shutil.copytree(os.path.join(base_dir, "public"), os.path.join(workdir, "public"))
+            shutil.copytree(os.path.join(base_dir, "src"), os.path.join(workdir, "src"))
+
+        try:
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(func, workdir, queue))
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                runs.append({'error': f"exit code {process.exitcode}"})
+            else:
+                runs.append(queue.get())
+        finally:
+            if mutates:
+                shutil.rmtree(workdir, ignore_errors=True)
+            else:
+                # 只读测试也会留下索引缓存，删掉以免影响下一次测量
+                for suffix in ("", "-wal", "-shm"):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(os.path.join(workdir, ".asset-index.sqlite" + suffix))
+
+    return runs
+
+def main():
+    parser = argparse.ArgumentParser(description="为图片维护脚本生成合成数据并测量耗时、系统调用和峰值内存")
+    parser.add_argument('--images', type=int, default=10000, help="合成图片数量（默认 10000）")
+    parser.add_argument('--depth', type=int, default=4, help="课程目录的最大嵌套层数")
+    parser.add_argument('--chinese-ratio', type=float, default=0.5, help="中文文件名比例")
+    parser.add_argument('--repeat', type=int, default=1, help="每个基准重复次数")
+    parser.add_argument('--only', action='append', choices=list(BENCHMARKS), help="只运行指定的基准")
+    parser.add_argument('--output', help="结果 JSON 输出路径（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    base_dir = tempfile.mkdtemp(prefix="bench-data-")
+    try:
+        start = time.perf_counter()
+        info = generate_tree(base_dir, args.images, args.depth, args.chinese_ratio)
+        info['generate_seconds'] = round(time.perf_counter() - start, 2)
+        print(f"已生成合成数据: {info}", file=sys.stderr)
+
+        report = {'dataset': info, 'python': sys.version.split()[0], 'benchmarks': {}}
+        for name in args.only or BENCHMARKS:
+            print(f"运行 {name}...", file=sys.stderr)
+            report['benchmarks'][name] = run_benchmark(name, base_dir, args.repeat)
+    finally:
+        shutil.rmtree(base_dir, ignore_errors=True)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
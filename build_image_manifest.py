@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import json
+import math
+import base64
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from asset_index import build_index, save_index, get_hash, url_to_path, full_path
+from check_images import collect_references, TUTORIALS_FILE, GALLERIES_FILE
+from compile_data import compile_data
+from convert_images import available_workers, prepare_image
+from json_references import atomic_write_json
+
+MANIFEST_FILE = "src/data/image-manifest.json"
+CACHE_FILE = ".image-metadata-cache.json"
+
+# blurhash 的横向/纵向分量数
+BLURHASH_COMPONENTS = (4, 3)
+# 计算 blurhash 和主色时使用的缩略图边长
+SAMPLE_SIZE = 32
+# 内联占位图（LQIP）的宽度
+LQIP_WIDTH = 16
+
+# EXIF 标签：DateTimeOriginal 位于 Exif 子 IFD，DateTime 位于主 IFD
+EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 36867
+TAG_DATETIME = 306
+TAG_ORIENTATION = 0x0112
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+def _encode83(value, length):
+    result = ''
+    for i in range(1, length + 1):
+        digit = (value // (83 ** (length - i))) % 83
+        result += _BASE83[digit]
+    return result
+
+def _srgb_to_linear(value):
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+_SRGB_TO_LINEAR = [_srgb_to_linear(v) for v in range(256)]
+
+def _linear_to_srgb(value):
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+def blurhash_encode(image, components=BLURHASH_COMPONENTS):
+    """按 blurhash 算法对一张小尺寸 RGB 图片编码"""
+    cx, cy = components
+    width, height = image.size
+    raw = image.tobytes()
+    pixels = [(_SRGB_TO_LINEAR[raw[k]], _SRGB_TO_LINEAR[raw[k + 1]], _SRGB_TO_LINEAR[raw[k + 2]])
+              for k in range(0, len(raw), 3)]
+
+    cos_x = [[math.cos(math.pi * i * x / width) for x in range(width)] for i in range(cx)]
+    cos_y = [[math.cos(math.pi * j * y / height) for y in range(height)] for j in range(cy)]
+
+    factors = []
+    for j in range(cy):
+        for i in range(cx):
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                basis_y = cos_y[j][y]
+                for x in range(width):
+                    basis = basis_y * cos_x[i][x]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((cx - 1) + (cy - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(v) for factor in ac for v in factor)
+        quantised_max = max(0, min(82, int(math.floor(actual_max * 166 - 0.5))))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1
+        result += _encode83(0, 1)
+
+    result += _encode83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for r, g, b in ac:
+        quant = [max(0, min(18, int(math.floor(_sign_pow(v / max_value, 0.5) * 9 + 9.5)))) for v in (r, g, b)]
+        result += _encode83(quant[0] * 19 * 19 + quant[1] * 19 + quant[2], 2)
+    return result
+
+def dominant_color(image, colors=5):
+    """把小图量化为几种颜色，返回出现最多的颜色（#rrggbb）"""
+    quantized = image.quantize(colors=colors)
+    palette = quantized.getpalette()
+    count, index = max(quantized.getcolors())
+    r, g, b = palette[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+def exif_capture_date(image):
+    """读取 EXIF 拍摄时间，返回 ISO 格式字符串，没有时返回 None"""
+    exif = image.getexif()
+    value = exif.get_ifd(EXIF_IFD).get(TAG_DATETIME_ORIGINAL) or exif.get(TAG_DATETIME)
+    if not value:
+        return None
+    # EXIF 格式为 "YYYY:MM:DD HH:MM:SS"
+    value = str(value).strip().rstrip('\x00')
+    date, _, time = value.partition(' ')
+    return date.replace(':', '-') + ('T' + time if time else '')
+
+def extract_metadata(task):
+    """在工作进程中解码图片并提取尺寸、占位图、主色和拍摄时间"""
+    from PIL import Image
+
+    with Image.open(task['path']) as image:
+        taken_at = exif_capture_date(image)
+
+        # 记录按 EXIF 方向旋转后的原图尺寸
+        width, height = image.size
+        if image.getexif().get(TAG_ORIENTATION, 1) in (5, 6, 7, 8):
+            width, height = height, width
+
+        # draft 让 JPEG 在解码时直接缩小，减少大图的解码开销，只影响采样
+        image.draft('RGB', (SAMPLE_SIZE * 4, SAMPLE_SIZE * 4))
+        image = prepare_image(image).convert('RGB')
+
+    sample = image.resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.BILINEAR)
+
+    lqip_height = max(1, round(LQIP_WIDTH * height / width))
+    lqip = image.resize((LQIP_WIDTH, lqip_height), Image.BILINEAR)
+    buffer = io.BytesIO()
+    lqip.save(buffer, 'WEBP', quality=40)
+
+    return {
+        'hash': task['hash'],
+        'metadata': {
+            'width': width,
+            'height': height,
+            'blurhash': blurhash_encode(sample),
+            'lqip': "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode('ascii'),
+            'dominantColor': dominant_color(sample),
+            'takenAt': taken_at,
+        },
+    }
+
+def load_cache(cache_file=CACHE_FILE):
+    """读取 内容哈希 -> 元数据 的缓存"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def collect_image_urls():
+    """收集 galleries.json 和 tutorials.json 引用的全部图片 URL，预生成的尺寸变体和兄弟格式除外"""
+    urls = {}
+    for reference in collect_references([GALLERIES_FILE, TUTORIALS_FILE]):
+        if '.variants[' not in reference['field'] and '.formats.' not in reference['field']:
+            urls[reference['url']] = True
+    return sorted(urls)
+
+def build_manifest(urls, workers=None, cache_file=CACHE_FILE):
+    """并行提取图片元数据，内容哈希未变化的图片直接使用缓存"""
+    index = build_index()
+    cache = load_cache(cache_file)
+    manifest = {}
+    tasks = {}
+
+    for url in urls:
+        rel_path = url_to_path(url)
+        if rel_path not in index['files']:
+            print(f"缺失图片: public{url}")
+            continue
+        content_hash = get_hash(index, rel_path)
+        if content_hash in cache:
+            manifest[url] = cache[content_hash]
+        else:
+            tasks.setdefault(content_hash, {'path': full_path(index, rel_path), 'hash': content_hash, 'urls': []})
+            tasks[content_hash]['urls'].append(url)
+
+    print(f"共 {len(urls)} 张图片，{len(manifest)} 张使用缓存，{len(tasks)} 张需要解码")
+
+    with ProcessPoolExecutor(max_workers=workers or available_workers()) as executor:
+        futures = {executor.submit(extract_metadata, task): task for task in tasks.values()}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"提取元数据失败 {task['path']}: {e}")
+                continue
+            cache[result['hash']] = result['metadata']
+            for url in task['urls']:
+                manifest[url] = result['metadata']
+                print(f"已提取: {url}")
+
+    # 同一个进程里已计算的哈希写回索引，缓存只保留仍被引用的内容
+    save_index(index)
+    used = {get_hash(index, url_to_path(url)) for url in manifest}
+    atomic_write_json(cache_file, {h: m for h, m in cache.items() if h in used})
+
+    return dict(sorted(manifest.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="为数据文件引用的图片生成尺寸、占位图、主色和拍摄时间清单")
+    parser.add_argument('--workers', type=int, help="进程数（默认使用全部可用核心）")
+    parser.add_argument('--output', default=MANIFEST_FILE, help="清单输出路径")
+    args = parser.parse_args()
+
+    manifest = build_manifest(collect_image_urls(), args.workers)
+
+    old_manifest = None
+    if os.path.exists(args.output):
+        with open(args.output, 'r', encoding='utf-8') as f:
+            old_manifest = json.load(f)
+
+    if manifest != old_manifest:
+        atomic_write_json(args.output, manifest)
+        print(f"已更新 {args.output}（{len(manifest)} 张图片）")
+        # 作品集分片内嵌了各自照片的元数据
+        compile_data()
+    else:
+        print(f"{args.output} 无需更新")
+    print("完成!")
+
+if __name__ == "__main__":
+    main()
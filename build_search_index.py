@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import argparse
+import unicodedata
+
+from compile_data import BLOG_FILE, GALLERIES_FILE, digest, write_if_changed
+from fix_chinese_filenames import WORD_MAPPING, build_trie
+from json_references import atomic_write_json
+from json_stream import iter_array
+
+# 站点运行时按需下载：docs.json 为文档列表，terms-<前缀>.json 为倒排表分片
+SEARCH_DIR = "public/search"
+DOCS_FILE = f"{SEARCH_DIR}/docs.json"
+
+# 记录 -> 内容摘要和词项，以及文档编号；内容没变的记录不重新分词
+CACHE_FILE = ".search-index.json"
+# 分词规则变化时递增，旧缓存整体失效
+TOKENIZER_VERSION = 1
+
+# 中文词项按首字的码位分组，每 256 个码位一个分片；英文按首字母分片
+CJK_SHARD_SHIFT = 8
+
+# 字段权重：标题命中比正文命中重要
+FIELD_WEIGHTS = {
+    'title': 5,
+    'excerpt': 2,
+    'description': 2,
+    'location': 2,
+    'photoTitle': 2,
+    'content': 1,
+}
+
+_TOKEN_RE = re.compile(r'[\u4e00-\u9fff]+|[a-z0-9]+')
+# Markdown 链接地址和 HTML 标签不参与索引
+_MARKUP_RE = re.compile(r'\]\([^)]*\)|<[^>]+>')
+
+# 复用文件名转换的词汇表：正文中的“构图”同时索引为 composition，英文查询也能找到中文文章
+_TRIE = build_trie(WORD_MAPPING)
+_END = ''
+
+def normalize(text):
+    """全角转半角并转为小写，查询端做同样处理"""
+    return unicodedata.normalize('NFKC', text).lower()
+
+def dictionary_terms(run):
+    """找出中文片段中出现的词汇表词语，产出对应英文的各个单词"""
+    for i in range(len(run)):
+        node = _TRIE
+        for char in run[i:]:
+            node = node.get(char)
+            if node is None:
+                break
+            if _END in node:
+                for word in node[_END].split('-'):
+                    if len(word) > 1 or word.isdigit():
+                        yield word
+
+def tokenize(text, expand=True):
+    """中文取相邻两字（单字片段取单字），英文和数字按连续字母数字切分，单个字母丢弃
+
+    expand 为 True 时追加词汇表中的英文对应词，只在建索引时使用。
+    """
+    for run in _TOKEN_RE.findall(normalize(text)):
+        if run[0].isascii():
+            if len(run) > 1 or run.isdigit():
+                yield run
+            continue
+        if len(run) == 1:
+            yield run
+        for i in range(len(run) - 1):
+            yield run[i:i + 2]
+        if expand:
+            yield from dictionary_terms(run)
+
+def shard_key(term):
+    """词项所在的分片：英文取首字母，中文取首字码位的高位"""
+    if term[0].isascii():
+        return term[0]
+    return f"u{ord(term[0]) >> CJK_SHARD_SHIFT:x}"
+
+def blog_fields(post):
+    yield 'title', post.get('title', '')
+    yield 'excerpt', post.get('excerpt', '')
+    yield 'content', _MARKUP_RE.sub(' ', post.get('content', ''))
+
+def gallery_fields(gallery):
+    yield 'title', gallery.get('title', '')
+    yield 'description', gallery.get('description', '')
+    for photo in gallery.get('photos', []):
+        yield 'photoTitle', photo.get('title', '')
+        yield 'description', photo.get('description', '')
+        yield 'location', photo.get('location', '')
+
+# 文档类型 -> (数据文件, 字段提取函数, 结果中展示的图片字段)
+SOURCES = {
+    'blog': (BLOG_FILE, blog_fields, 'featuredImageUrl'),
+    'gallery': (GALLERIES_FILE, gallery_fields, 'coverPhotoUrl'),
+}
+
+def term_weights(fields):
+    """词项 -> 按字段权重累加的出现次数"""
+    weights = {}
+    for field, text in fields:
+        if not isinstance(text, str) or not text:
+            continue
+        weight = FIELD_WEIGHTS[field]
+        for term in tokenize(text):
+            weights[term] = weights.get(term, 0) + weight
+    return weights
+
+def new_cache():
+    return {'version': TOKENIZER_VERSION, 'next_id': 0, 'ids': {}, 'records': {}, 'files': {}}
+
+def load_cache(cache_file=CACHE_FILE):
+    """读取分词缓存，不存在、已损坏或分词规则已变化时返回空缓存"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return new_cache()
+    return cache if cache.get('version') == TOKENIZER_VERSION else new_cache()
+
+def scan_records(cache, stats):
+    """逐条读取数据文件，只对内容有变化的记录重新分词，返回本次出现的记录键"""
+    seen = {}
+    for kind, (data_file, fields, image_field) in SOURCES.items():
+        if not os.path.exists(data_file):
+            continue
+        for record in iter_array(data_file):
+            slug = record.get('slug')
+            if not slug:
+                continue
+            key = f"{kind}:{slug}"
+            value = digest(record)
+            cached = cache['records'].get(key)
+            if cached is None or cached['digest'] != value:
+                cache['records'][key] = {
+                    'digest': value,
+                    'doc': {'type': kind, 'slug': slug, 'title': record.get('title', ''),
+                            'image': record.get(image_field, '')},
+                    'terms': term_weights(fields(record)),
+                }
+                stats['tokenized'] += 1
+            else:
+                stats['reused'] += 1
+            # 文档编号保持稳定，新增记录不会让其他记录的倒排表全部变化
+            if key not in cache['ids']:
+                cache['ids'][key] = cache['next_id']
+                cache['next_id'] += 1
+            seen[key] = cache['ids'][key]
+    return seen
+
+def build_shards(cache, seen):
+    """分片 -> 词项 -> [文档编号, 权重, 文档编号, 权重, ...]"""
+    shards = {}
+    for key, doc_id in sorted(seen.items(), key=lambda item: item[1]):
+        for term, weight in cache['records'][key]['terms'].items():
+            postings = shards.setdefault(shard_key(term), {}).setdefault(term, [])
+            postings.extend((doc_id, weight))
+    return {name: dict(sorted(terms.items())) for name, terms in shards.items()}
+
+def remove_stale_files(names, manifest, stats, search_dir=SEARCH_DIR):
+    """删除已经没有词项的分片文件"""
+    if not os.path.isdir(search_dir):
+        return
+    for name in sorted(os.listdir(search_dir)):
+        if name.startswith('terms-') and name.endswith('.json') and name[len('terms-'):-len('.json')] not in names:
+            path = f"{search_dir}/{name}"
+            os.remove(path)
+            manifest.pop(path, None)
+            stats['removed'] += 1
+            print(f"已删除 {path}")
+
+def build_search_index(cache_file=CACHE_FILE, rebuild=False):
+    """增量构建倒排索引，只重写内容有变化的分片"""
+    cache = new_cache() if rebuild else load_cache(cache_file)
+    stats = {'tokenized': 0, 'reused': 0, 'written': 0, 'unchanged': 0, 'removed': 0}
+
+    seen = scan_records(cache, stats)
+    for key in set(cache['records']) - set(seen):
+        del cache['records'][key]
+        del cache['ids'][key]
+
+    # 删除的记录留下空位，编号不复用
+    docs = [None] * cache['next_id']
+    for key, doc_id in seen.items():
+        docs[doc_id] = cache['records'][key]['doc']
+
+    shards = build_shards(cache, seen)
+    manifest = cache['files']
+    try:
+        for name, terms in sorted(shards.items()):
+            write_if_changed(f"{SEARCH_DIR}/terms-{name}.json", terms, manifest, stats, indent=None)
+        remove_stale_files(set(shards), manifest, stats)
+        write_if_changed(DOCS_FILE, {'version': TOKENIZER_VERSION, 'cjkShardShift': CJK_SHARD_SHIFT, 'docs': docs},
+                         manifest, stats, indent=None)
+    finally:
+        atomic_write_json(cache_file, cache)
+
+    print(f"\n文档 {len(seen)} 个（重新分词 {stats['tokenized']} 个，复用 {stats['reused']} 个），"
+          f"词项 {sum(len(t) for t in shards.values())} 个，分片 {len(shards)} 个；"
+          f"写入 {stats['written']} 个文件，{stats['unchanged']} 个未变化，删除 {stats['removed']} 个")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="为博客文章和作品集生成按词项前缀分片的中英文全文索引")
+    parser.add_argument('--cache', default=CACHE_FILE, help="分词缓存路径")
+    parser.add_argument('--rebuild', action='store_true', help="忽略缓存重新分词并重新编号")
+    args = parser.parse_args()
+    build_search_index(args.cache, args.rebuild)
+
+if __name__ == "__main__":
+    main()
@@ -2,82 +2,251 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
+import sys
 import json
+import argparse
+import subprocess
 
-def check_image_paths():
+from asset_index import (
+    build_index, save_index, url_exists, file_signature, tree_signature, cached_validation, store_validation,
+)
+from convert_images import sibling_url
+from json_stream import iter_array, peek_first_char
+
+TUTORIALS_FILE = "src/data/tutorials.json"
+GALLERIES_FILE = "src/data/galleries.json"
+PHOTOGRAPHER_FILE = "src/data/photographer.json"
+BLOG_FILE = "src/data/blog.json"
+BLOG_CONFIG_FILE = "src/data/blog-config.json"
+VIDEO_MANIFEST_FILE = "src/data/video-manifest.json"
+
+# 校验结果缓存的名称；缓存内容为 {checked, missing}，只保存缺失的结果
+VALIDATION_NAME = "check_images.missing"
+
+# Markdown 图片 ![alt](/a.webp "title")，以及内联 HTML 的 <img>、<video>、<source> 标签
+MARKDOWN_IMAGE_RE = re.compile(r'!\[[^\]]*\]\(\s*<?([^)\s>]+)|(<(?:img|video|source)\s[^>]*>)', re.IGNORECASE)
+# 标签中的地址属性：<img src>、<video src poster>、<source src>
+TAG_URL_RE = re.compile(r'\b(?:src|poster)=["\']([^"\']+)["\']', re.IGNORECASE)
+
+# 数据文件 -> 引用提取函数列表；数组文件对每个元素调用，对象文件对整个对象调用
+REFERENCE_EXTRACTORS = {}
+
+def register_extractor(data_file, extractor):
+    """为数据文件注册一个提取函数，extractor(record) 产出 (字段路径, URL)"""
+    REFERENCE_EXTRACTORS.setdefault(data_file, []).append(extractor)
+    return extractor
+
+def string_field(path):
+    """提取单个字符串字段，path 可以用点号表示嵌套字段，例如 heroImage.url"""
+    keys = path.split('.')
+
+    def extract(record):
+        value = record
+        for key in keys:
+            if not isinstance(value, dict):
+                return
+            value = value.get(key)
+        if isinstance(value, str) and value:
+            yield path, value
+    return extract
+
+def string_list_field(name):
+    """提取字符串列表字段中的每一项"""
+    def extract(record):
+        for j, value in enumerate(record.get(name) or []):
+            if isinstance(value, str) and value:
+                yield f"{name}[{j}]", value
+    return extract
+
+def iter_markdown_images(text):
+    """扫描 Markdown 文本中的站内图片地址，外部链接和 data URI 不检查"""
+    for match in MARKDOWN_IMAGE_RE.finditer(text):
+        urls = [match.group(1)] if match.group(1) else TAG_URL_RE.findall(match.group(2))
+        for url in urls:
+            if url.startswith('/') and not url.startswith('//'):
+                yield url
+
+def markdown_field(name):
+    """提取 Markdown 正文字段中引用的图片"""
+    def extract(record):
+        text = record.get(name)
+        if isinstance(text, str) and ('](' in text or '<img' in text or '<video' in text):
+            for k, url in enumerate(iter_markdown_images(text)):
+                yield f"{name}<image {k}>", url
+    return extract
+
+def gallery_photos(gallery):
+    """提取作品集中每张照片的原图、缩略图、预生成尺寸和兄弟格式"""
+    for j, photo in enumerate(gallery.get('photos', [])):
+        if 'url' in photo:
+            yield f"photos[{j}].url", photo['url']
+        if 'thumbnailUrl' in photo:
+            yield f"photos[{j}].thumbnailUrl", photo['thumbnailUrl']
+        for k, variant in enumerate(photo.get('variants', [])):
+            yield f"photos[{j}].variants[{k}].url", variant['url']
+        for fmt in photo.get('formats', []):
+            yield f"photos[{j}].formats.{fmt}", sibling_url(photo['url'], fmt)
+            for k, variant in enumerate(photo.get('variants', [])):
+                yield f"photos[{j}].variants[{k}].formats.{fmt}", sibling_url(variant['url'], fmt)
+
+def sibling_formats(url_field, formats_field):
+    """提取记录在 formats 字段中的兄弟格式文件，url_field/formats_field 可以是嵌套字段"""
+    url_extract = string_field(url_field)
+
+    def extract(record):
+        formats = record
+        for key in formats_field.split('.'):
+            formats = formats.get(key) if isinstance(formats, dict) else None
+        for _, url in url_extract(record):
+            for fmt in formats or []:
+                yield f"{formats_field}.{fmt}", sibling_url(url, fmt)
+    return extract
+
+def video_manifest_entries(manifest):
+    """视频元数据清单：每个转码文件和它的封面帧都必须存在"""
+    for url, meta in manifest.items():
+        yield f"[{url!r}]", url
+        if meta.get('poster'):
+            yield f"[{url!r}].poster", meta['poster']
+
+register_extractor(TUTORIALS_FILE, string_field('featuredImageUrl'))
+register_extractor(TUTORIALS_FILE, string_list_field('images'))
+register_extractor(TUTORIALS_FILE, markdown_field('content'))
+
+register_extractor(GALLERIES_FILE, string_field('coverPhotoUrl'))
+register_extractor(GALLERIES_FILE, gallery_photos)
+
+register_extractor(PHOTOGRAPHER_FILE, string_field('avatarUrl'))
+
+register_extractor(BLOG_FILE, string_field('featuredImageUrl'))
+register_extractor(BLOG_FILE, string_list_field('images'))
+register_extractor(BLOG_FILE, markdown_field('content'))
+register_extractor(BLOG_FILE, sibling_formats('featuredImageUrl', 'featuredImageFormats'))
+
+register_extractor(BLOG_CONFIG_FILE, string_field('heroImage.url'))
+register_extractor(BLOG_CONFIG_FILE, sibling_formats('heroImage.url', 'heroImage.formats'))
+
+register_extractor(VIDEO_MANIFEST_FILE, video_manifest_entries)
+
+DATA_FILES = list(REFERENCE_EXTRACTORS)
+
+def iter_references(data_file, data):
+    """用注册的提取函数从数据文件中提取图片引用，产出 (字段路径, URL)"""
+    extractors = REFERENCE_EXTRACTORS.get(data_file, [])
+    if isinstance(data, dict):
+        for extractor in extractors:
+            yield from extractor(data)
+        return
+
+    # 数组文件可能是流式读取的，只遍历一次，每个元素依次交给所有提取函数
+    for i, record in enumerate(data):
+        for extractor in extractors:
+            for field, url in extractor(record):
+                yield f"[{i}].{field}", url
+
+def collect_references(data_files=DATA_FILES, loader=None):
+    """读取数据文件并逐条产出图片引用"""
+    for data_file in data_files:
+        data = loader(data_file) if loader else load_data_file(data_file)
+        if data is None:
+            continue
+        for field, url in iter_references(data_file, data):
+            yield {'source': data_file, 'field': field, 'url': url}
+
+def load_data_file(data_file):
+    """读取工作区中的数据文件，不存在时返回 None；数组文件以流的方式逐条读取"""
+    if not os.path.exists(data_file):
+        return None
+    if peek_first_char(data_file) == '[':
+        return iter_array(data_file)
+    with open(data_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def validate_references(references, exists):
+    """逐条检查引用并立即产出结果，exists 为 URL -> bool 的检查函数"""
+    for reference in references:
+        status = 'ok' if exists(reference['url']) else 'missing'
+        yield dict(reference, status=status, path="public" + reference['url'])
+
+def validate_all(index):
+    """检查全部引用；数据文件和目录中的文件集合都没变时直接返回上次的结果
+
+    返回 (结果迭代器, 统计, 是否来自缓存)。结果逐条产出，不整体留在内存中；
+    缓存只保存缺失的结果和引用总数，所以命中缓存时只产出缺失的结果。
+    统计 {'checked', 'missing'} 在迭代结束后才完整。
+    """
+    signature = f"{file_signature(DATA_FILES)}:{tree_signature(index)}"
+    cached = cached_validation(index, VALIDATION_NAME, signature)
+    if cached is not None:
+        return iter(cached['missing']), {'checked': cached['checked'], 'missing': len(cached['missing'])}, True
+
+    summary = {'checked': 0, 'missing': 0}
+    return stream_and_store(index, signature, summary), summary, False
+
+def stream_and_store(index, signature, summary):
+    """逐条产出检查结果，全部检查完后只把缺失的结果和计数写入缓存"""
+    missing = []
+    for result in validate_references(collect_references(), lambda url: url_exists(index, url)):
+        summary['checked'] += 1
+        if result['status'] != 'ok':
+            missing.append(result)
+            summary['missing'] += 1
+        yield result
+    store_validation(index, VALIDATION_NAME, signature, {'checked': summary['checked'], 'missing': missing})
+
+def git_output(*args):
+    """执行 git 命令并返回标准输出"""
+    return subprocess.run(['git', *args], check=True, capture_output=True, text=True).stdout
+
+def changed_files_since(rev):
+    """返回自 rev 以来被修改、删除或新增（含未跟踪）的文件路径"""
+    changed = set(git_output('diff', '--name-only', '--no-renames', rev, '--').splitlines())
+    changed.update(git_output('ls-files', '--others', '--exclude-standard').splitlines())
+    return changed
+
+def load_data_file_at(rev, data_file):
+    """读取 rev 版本中的数据文件，不存在时返回 None"""
+    try:
+        return json.loads(git_output('show', f"{rev}:{data_file}"))
+    except subprocess.CalledProcessError:
+        return None
+
+def select_changed_references(references, rev):
+    """只保留自 rev 以来新增的引用，以及指向被修改/删除文件的引用"""
+    changed = changed_files_since(rev)
+    changed_urls = {'/' + path[len('public/'):] for path in changed if path.startswith('public/')}
+
+    old_urls = {}
+    for data_file in DATA_FILES:
+        if data_file in changed:
+            old_refs = collect_references([data_file], loader=lambda f: load_data_file_at(rev, f))
+            old_urls[data_file] = {ref['url'] for ref in old_refs}
+
+    for ref in references:
+        is_new = ref['source'] in old_urls and ref['url'] not in old_urls[ref['source']]
+        if is_new or ref['url'] in changed_urls:
+            yield ref
+
+def check_image_paths(index=None, verbose=True):
     """检查所有 JSON 文件中的图片路径是否存在"""
-    
+
+    # 只遍历一次 public 目录，之后的存在性检查都查询内存索引
+    if index is None:
+        index = build_index()
+
+    results, _, cached = validate_all(index)
+    if cached:
+        print("数据文件和图片目录均未变化，使用上次的检查结果")
+        verbose = False
+
     issues = []
-    
-    # 检查 tutorials.json
-    tutorials_file = "src/data/tutorials.json"
-    if os.path.exists(tutorials_file):
-        with open(tutorials_file, 'r', encoding='utf-8') as f:
-            tutorials = json.load(f)
-        
-        for tutorial in tutorials:
-            # 检查 featuredImageUrl
-            if 'featuredImageUrl' in tutorial:
-                image_path = "public" + tutorial['featuredImageUrl']
-                if not os.path.exists(image_path):
-                    issues.append(f"Missing: {image_path}")
-                else:
-                    print(f"✓ Found: {image_path}")
-            
-            # 检查 images 数组
-            if 'images' in tutorial:
-                for image_url in tutorial['images']:
-                    image_path = "public" + image_url
-                    if not os.path.exists(image_path):
-                        issues.append(f"Missing: {image_path}")
-                    else:
-                        print(f"✓ Found: {image_path}")
-    
-    # 检查 galleries.json
-    galleries_file = "src/data/galleries.json"
-    if os.path.exists(galleries_file):
-        with open(galleries_file, 'r', encoding='utf-8') as f:
-            galleries = json.load(f)
-        
-        for gallery in galleries:
-            # 检查 coverPhotoUrl
-            if 'coverPhotoUrl' in gallery:
-                image_path = "public" + gallery['coverPhotoUrl']
-                if not os.path.exists(image_path):
-                    issues.append(f"Missing: {image_path}")
-                else:
-                    print(f"✓ Found: {image_path}")
-            
-            # 检查 photos 数组
-            if 'photos' in gallery:
-                for photo in gallery['photos']:
-                    if 'url' in photo:
-                        image_path = "public" + photo['url']
-                        if not os.path.exists(image_path):
-                            issues.append(f"Missing: {image_path}")
-                        else:
-                            print(f"✓ Found: {image_path}")
-                    
-                    if 'thumbnailUrl' in photo:
-                        image_path = "public" + photo['thumbnailUrl']
-                        if not os.path.exists(image_path):
-                            issues.append(f"Missing: {image_path}")
-                        else:
-                            print(f"✓ Found: {image_path}")
-    
-    # 检查 photographer.json
-    photographer_file = "src/data/photographer.json"
-    if os.path.exists(photographer_file):
-        with open(photographer_file, 'r', encoding='utf-8') as f:
-            photographer = json.load(f)
-        
-        if 'avatarUrl' in photographer:
-            image_path = "public" + photographer['avatarUrl']
-            if not os.path.exists(image_path):
-                issues.append(f"Missing: {image_path}")
-            else:
-                print(f"✓ Found: {image_path}")
-    
+    for result in results:
+        if result['status'] != 'ok':
+            issues.append(f"Missing: {result['path']}")
+        elif verbose:
+            print(f"✓ Found: {result['path']}")
+
     # 输出结果
     if issues:
         print(f"\n❌ 发现 {len(issues)} 个问题:")
@@ -86,6 +255,60 @@ def check_image_paths():
     else:
         print(f"\n✅ 所有图片路径都正确!")
 
+    return issues
+
+def run_validator(output_format, changed_since=None):
+    """以流式方式输出检查结果，返回退出码：0 正常，1 有缺失"""
+    if changed_since:
+        # 增量模式：不遍历 public，只对少量待查 URL 直接 stat
+        references = select_changed_references(collect_references(), changed_since)
+        results = validate_references(references, lambda url: os.path.isfile("public" + url))
+        summary = None
+    else:
+        index = build_index()
+        results, summary, _ = validate_all(index)
+
+    checked = 0
+    missing = 0
+    for result in results:
+        checked += 1
+        if result['status'] != 'ok':
+            missing += 1
+        if output_format == 'jsonl':
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+        elif result['status'] != 'ok':
+            print(f"Missing: {result['path']} ({result['source']} {result['field']})", flush=True)
+    if summary:
+        # 命中缓存时只重放了缺失的结果，引用总数以统计为准
+        checked = summary['checked']
+
+    if output_format == 'jsonl':
+        print(json.dumps({'status': 'summary', 'checked': checked, 'missing': missing}), flush=True)
+    else:
+        print(f"检查了 {checked} 个引用，缺失 {missing} 个")
+
+    if not changed_since:
+        save_index(index)
+    return 1 if missing else 0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="检查数据文件中的图片路径是否存在")
+    parser.add_argument('--format', choices=['text', 'jsonl'], help="流式输出格式；不指定时为原来的逐条打印模式")
+    parser.add_argument('--changed-since', metavar='GIT_REV', help="只检查自该版本以来改动过的引用和文件")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+
+    if args.format or args.changed_since:
+        try:
+            sys.exit(run_validator(args.format or 'text', args.changed_since))
+        except subprocess.CalledProcessError as e:
+            print(f"git 命令失败: {e.stderr.strip()}", file=sys.stderr)
+            sys.exit(2)
+
     print("检查图片路径...")
-    check_image_paths()
\ No newline at end of file
+    index = build_index()
+    issues = check_image_paths(index)
+    save_index(index)
+    sys.exit(1 if issues else 0)
@@ -2,122 +2,329 @@
 # -*- coding: utf-8 -*-
 
 import os
+import re
+import glob
 import shutil
-from pathlib import Path
+import hashlib
+import argparse
+from datetime import datetime
 
-def cleanup_public_directory():
+from asset_index import (
+    build_index, save_index, files_with_suffix, full_path, remove_file,
+    empty_dirs, remove_dir, total_size, get_hash, url_to_path,
+)
+from check_images import collect_references, iter_markdown_images
+from compile_data import compile_data
+from convert_images import SIBLING_FORMATS, sibling_url
+from develop_raw import RAW_DIR, RAW_SUFFIXES
+from generate_thumbnails import VARIANT_DIR
+from json_references import collect_referenced_urls, iter_strings, update_references
+from json_stream import iter_records
+from process_videos import POSTER_SUFFIX, VIDEO_MANIFEST_FILE, VIDEO_SUFFIXES
+from publish_assets import (
+    ASSET_MANIFEST_FILE, IMAGE_MANIFEST_FILE, LOADER_MANIFEST_FILE, remap_asset_manifest, remap_loader_manifest,
+    remap_manifest_keys,
+)
+
+IMAGE_SUFFIXES = {'.webp', '.avif', '.png', '.jpg', '.jpeg', '.gif'}
+
+# 孤立文件检测：标记阶段读取的数据文件和源码
+DATA_GLOB = "src/data/*.json"
+SOURCE_PATTERNS = ["src/**/*.tsx", "src/**/*.ts", "src/**/*.css"]
+QUARANTINE_DIR = ".quarantine"
+
+# 只清扫这些类型的静态资源
+SWEEP_SUFFIXES = IMAGE_SUFFIXES | VIDEO_SUFFIXES
+
+# 浏览器或 PWA 按约定直接请求、不会出现在源码里的文件
+CONVENTIONAL_PREFIXES = ('favicon', 'apple-touch-icon', 'icons/')
+
+# 源码中以 / 开头的字符串、模板字符串和 CSS url()
+_SOURCE_URL_RE = re.compile(r'''["'`(](/[^"'`()\s]*)''')
+
+# 部分哈希只读取文件开头这么多字节
+PARTIAL_HASH_BYTES = 64 * 1024
+
+def move_raw_file(index, rel_path, raw_dir=RAW_DIR):
+    """把 RAW 文件移到 raw_dir 下的相同相对位置并同步索引，返回文件大小"""
+    dst_path = os.path.join(raw_dir, rel_path)
+    os.makedirs(os.path.dirname(dst_path) or '.', exist_ok=True)
+    shutil.move(full_path(index, rel_path), dst_path)
+    return index['files'].pop(rel_path)['size']
+
+def partial_hash(path, size=PARTIAL_HASH_BYTES):
+    """只读取文件开头一块计算哈希，用于快速排除内容不同的文件"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read(size)).hexdigest()
+
+def group_by(paths, key):
+    """按 key 分组，只返回包含两个以上文件的组"""
+    groups = {}
+    for path in paths:
+        groups.setdefault(key(path), []).append(path)
+    return [group for group in groups.values() if len(group) > 1]
+
+def is_derivative(index, rel_path):
+    """由原图生成的文件：响应式变体、原图旁边的 AVIF/JXL 兄弟格式和视频封面帧，它们与原图相似是预期的"""
+    if VARIANT_DIR in rel_path.split('/')[:-1] or rel_path.endswith(POSTER_SUFFIX):
+        return True
+    stem, ext = os.path.splitext(rel_path)
+    return ext.lower().lstrip('.') in SIBLING_FORMATS and stem + '.webp' in index['files']
+
+def find_duplicate_files(index, suffixes):
+    """按 大小 -> 部分哈希 -> 完整哈希 逐级查找内容完全相同的文件
+
+    大小不同的文件不会被读取，开头一块就不同的文件也不会被完整读取。
+    由原图生成的文件不参与比较，它们跟随原图处理。
+    """
+    files = index['files']
+    duplicates = []
+    candidates = [p for p in files_with_suffix(index, suffixes) if not is_derivative(index, p)]
+
+    for same_size in group_by(candidates, lambda p: files[p]['size']):
+        for same_head in group_by(same_size, lambda p: partial_hash(full_path(index, p))):
+            # 小于一块的文件，部分哈希已经覆盖全部内容
+            if files[same_head[0]]['size'] <= PARTIAL_HASH_BYTES:
+                duplicates.append(sorted(same_head))
+                continue
+            for same_content in group_by(same_head, lambda p: get_hash(index, p)):
+                duplicates.append(sorted(same_content))
+
+    return duplicates
+
+def collect_source_urls(patterns=SOURCE_PATTERNS):
+    """扫描源码中的站内路径，返回 (URL 集合, 动态路径前缀集合)
+
+    模板字符串里 ${...} 之前的静态部分作为前缀，前缀下的文件都视为可达；
+    只有 / 的前缀（例如 /${locale}/...）是页面路由，不用来保护资源。
+    """
+    urls = set()
+    prefixes = set()
+    for pattern in patterns:
+        for path in glob.glob(pattern, recursive=True):
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            for url in _SOURCE_URL_RE.findall(text):
+                if '${' in url:
+                    prefix = url.split('${', 1)[0]
+                    prefix = prefix[:prefix.rfind('/') + 1]
+                    if len(prefix) > 1:
+                        prefixes.add(prefix)
+                else:
+                    urls.add(url)
+    return urls, prefixes
+
+def mark_reachable(data_glob=DATA_GLOB, patterns=SOURCE_PATTERNS):
+    """标记阶段：收集数据文件（含 Markdown 正文）和源码引用的全部 URL"""
+    urls = set()
+    for json_file in sorted(glob.glob(data_glob)):
+        for record in iter_records(json_file):
+            for value in iter_strings(record):
+                if value.startswith('/'):
+                    urls.add(value)
+                elif '](' in value or '<img' in value or '<video' in value:
+                    urls.update(iter_markdown_images(value))
+
+    # 兄弟格式（AVIF 等）只记录在 formats 字段里，用校验脚本的提取函数展开为 URL
+    urls.update(reference['url'] for reference in collect_references())
+
+    source_urls, prefixes = collect_source_urls(patterns)
+    urls |= source_urls
+    # 引用可能带查询参数或锚点，统一为索引中的相对路径
+    return {url_to_path(url) for url in urls}, prefixes
+
+def is_in_use(rel_path, reachable, prefixes):
+    """文件被直接引用、按约定被请求，或位于源码动态拼接的 URL 前缀之下"""
+    if rel_path in reachable or rel_path.startswith(CONVENTIONAL_PREFIXES):
+        return True
+    url = '/' + rel_path
+    return any(url.startswith(prefix) for prefix in prefixes)
+
+def find_orphans(index, reachable, prefixes, suffixes=SWEEP_SUFFIXES):
+    """清扫阶段：返回没有任何引用的资源文件（相对路径）"""
+    return [rel_path for rel_path in files_with_suffix(index, suffixes)
+            if not is_in_use(rel_path, reachable, prefixes)]
+
+def quarantine_files(index, paths, quarantine_dir=QUARANTINE_DIR):
+    """把文件按原目录结构移到隔离目录，返回本次隔离使用的目录"""
+    target_root = os.path.join(quarantine_dir, datetime.now().strftime('%Y%m%d-%H%M%S'))
+    for rel_path in paths:
+        target = os.path.join(target_root, rel_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(full_path(index, rel_path), target)
+        index['files'].pop(rel_path)
+    return target_root
+
+def sweep_orphans(index=None, quarantine=False, quarantine_dir=QUARANTINE_DIR):
+    """标记-清扫：报告未被引用的资源及大小，可选批量移入隔离目录"""
+    if index is None:
+        index = build_index()
+
+    reachable, prefixes = mark_reachable()
+    orphans = find_orphans(index, reachable, prefixes)
+    orphan_size = sum(index['files'][p]['size'] for p in orphans)
+
+    print(f"可达引用: {len(reachable)} 个，动态路径前缀: {len(prefixes)} 个")
+    print(f"\n未被引用的文件 ({len(orphans)} 个):")
+    for rel_path in orphans:
+        print(f"  {full_path(index, rel_path)} ({index['files'][rel_path]['size']:,} bytes)")
+    print(f"\n共 {orphan_size:,} bytes ({orphan_size / 1024 / 1024:.2f} MB)")
+
+    if quarantine and orphans:
+        target_root = quarantine_files(index, orphans, quarantine_dir)
+        # 隔离后可能留下空目录
+        for dir_path in empty_dirs(index):
+            remove_dir(index, dir_path)
+        print(f"已移动到隔离目录: {target_root}")
+        print(f"确认无误后可删除该目录；需要恢复时把其中的文件移回 {index['root']}/")
+
+    return orphans
+
+def cleanup_public_directory(index=None):
     """清理 public 目录，移除重复文件和 jpg 文件"""
-    
-    public_path = Path("public")
+
+    # 整个清理过程只遍历一次 public 目录，各步骤都查询同一个索引
+    if index is None:
+        index = build_index()
     removed_files = []
     saved_space = 0
-    
+
     print("开始清理 public 目录...")
-    
+
     # 1. 移除所有 .jpg 和 .jpeg 文件
     print("\n1. 移除所有 JPG 文件...")
-    for jpg_file in public_path.rglob("*.jpg"):
-        file_size = jpg_file.stat().st_size
-        print(f"删除 JPG: {jpg_file} ({file_size:,} bytes)")
-        jpg_file.unlink()
-        removed_files.append(str(jpg_file))
+    for jpg_file in files_with_suffix(index, {'.jpg', '.jpeg'}):
+        file_size = remove_file(index, jpg_file)
+        print(f"删除 JPG: {full_path(index, jpg_file)} ({file_size:,} bytes)")
+        removed_files.append(full_path(index, jpg_file))
         saved_space += file_size
-    
-    for jpeg_file in public_path.rglob("*.jpeg"):
-        file_size = jpeg_file.stat().st_size
-        print(f"删除 JPEG: {jpeg_file} ({file_size:,} bytes)")
-        jpeg_file.unlink()
-        removed_files.append(str(jpeg_file))
-        saved_space += file_size
-    
+
     # 2. 移除非图片文件
     print("\n2. 移除非图片文件...")
-    
-    # 移除 .NEF 文件（RAW 格式）
-    for nef_file in public_path.rglob("*.NEF"):
-        file_size = nef_file.stat().st_size
-        print(f"删除 NEF: {nef_file} ({file_size:,} bytes)")
-        nef_file.unlink()
-        removed_files.append(str(nef_file))
+
+    # RAW 原片移到 public/ 之外保留，之后可以用 develop_raw.py 重新生成网页图片
+    for raw_file in files_with_suffix(index, RAW_SUFFIXES):
+        file_size = move_raw_file(index, raw_file)
+        print(f"移动 RAW: {full_path(index, raw_file)} -> {os.path.join(RAW_DIR, raw_file)} ({file_size:,} bytes)")
+        removed_files.append(full_path(index, raw_file))
         saved_space += file_size
-    
+
     # 移除 .txt 文件
-    for txt_file in public_path.rglob("*.txt"):
+    for txt_file in files_with_suffix(index, {'.txt'}):
         # 保留 robots.txt
-        if txt_file.name != "robots.txt":
-            file_size = txt_file.stat().st_size
-            print(f"删除 TXT: {txt_file} ({file_size:,} bytes)")
-            txt_file.unlink()
-            removed_files.append(str(txt_file))
+        if os.path.basename(txt_file) != "robots.txt":
+            file_size = remove_file(index, txt_file)
+            print(f"删除 TXT: {full_path(index, txt_file)} ({file_size:,} bytes)")
+            removed_files.append(full_path(index, txt_file))
             saved_space += file_size
-    
-    # 3. 查找并移除重复的图片文件
-    print("\n3. 查找重复的图片文件...")
-    
-    # 创建文件名到路径的映射
-    file_map = {}
-    duplicates = []
-    
-    for webp_file in public_path.rglob("*.webp"):
-        file_name = webp_file.name
-        if file_name in file_map:
-            # 发现重复文件
-            existing_file = file_map[file_name]
-            duplicates.append((existing_file, webp_file))
-            print(f"发现重复文件: {file_name}")
-            print(f"  原文件: {existing_file}")
-            print(f"  重复文件: {webp_file}")
-        else:
-            file_map[file_name] = webp_file
-    
-    # 移除重复文件（保留第一个，删除后续的）
-    for original, duplicate in duplicates:
-        file_size = duplicate.stat().st_size
-        print(f"删除重复文件: {duplicate} ({file_size:,} bytes)")
-        duplicate.unlink()
-        removed_files.append(str(duplicate))
-        saved_space += file_size
-    
+
+    # 3. 按内容查找重复的图片和视频文件
+    print("\n3. 查找重复的图片和视频文件...")
+
+    referenced = collect_referenced_urls()
+    # 源码中的引用不会被 update_references 改写，被源码引用的副本一律保留
+    source_urls, prefixes = collect_source_urls()
+    source_paths = {url_to_path(url) for url in source_urls}
+
+    def in_source(rel_path):
+        return rel_path in source_paths or any(('/' + rel_path).startswith(prefix) for prefix in prefixes)
+
+    url_map = {}
+
+    for group in find_duplicate_files(index, IMAGE_SUFFIXES | VIDEO_SUFFIXES):
+        # 优先保留源码引用的文件，其次是已被 JSON 引用的文件，否则保留路径最短的一个
+        canonical = min(group, key=lambda p: (not in_source(p), '/' + p not in referenced, p.count('/'), p))
+        print(f"发现重复文件 ({len(group)} 个相同内容):")
+        print(f"  保留: {full_path(index, canonical)}")
+
+        for duplicate in group:
+            if duplicate == canonical:
+                continue
+            if in_source(duplicate):
+                print(f"  保留源码引用的副本: {full_path(index, duplicate)}")
+                continue
+            file_size = remove_file(index, duplicate)
+            print(f"  删除重复文件: {full_path(index, duplicate)} ({file_size:,} bytes)")
+            removed_files.append(full_path(index, duplicate))
+            saved_space += file_size
+            url_map['/' + duplicate] = '/' + canonical
+
+            # 兄弟格式跟随原图：保留的文件缺少时改名过去，否则一并删除
+            for fmt in SIBLING_FORMATS:
+                sibling = url_to_path(sibling_url('/' + duplicate, fmt))
+                if sibling not in index['files']:
+                    continue
+                target = url_to_path(sibling_url('/' + canonical, fmt))
+                if target in index['files']:
+                    file_size = remove_file(index, sibling)
+                    print(f"  删除重复文件的兄弟格式: {full_path(index, sibling)} ({file_size:,} bytes)")
+                    removed_files.append(full_path(index, sibling))
+                    saved_space += file_size
+                else:
+                    os.replace(full_path(index, sibling), full_path(index, target))
+                    index['files'][target] = index['files'].pop(sibling)
+                    print(f"  移动兄弟格式: {full_path(index, sibling)} -> {full_path(index, target)}")
+                url_map['/' + sibling] = '/' + target
+
+    # 把指向被删除副本的引用和清单中的键改为指向保留的文件
+    if url_map:
+        update_references(url_map)
+        remap_manifest_keys(IMAGE_MANIFEST_FILE, url_map)
+        remap_loader_manifest(LOADER_MANIFEST_FILE, url_map)
+        remap_manifest_keys(VIDEO_MANIFEST_FILE, url_map)
+        remap_asset_manifest(ASSET_MANIFEST_FILE, url_map)
+        compile_data()
+
     # 4. 移除空目录
     print("\n4. 移除空目录...")
-    for root, dirs, files in os.walk(public_path, topdown=False):
-        for dir_name in dirs:
-            dir_path = Path(root) / dir_name
-            try:
-                if not any(dir_path.iterdir()):  # 检查目录是否为空
-                    print(f"删除空目录: {dir_path}")
-                    dir_path.rmdir()
-            except OSError:
-                pass  # 目录不为空或其他错误，跳过
-    
+    for dir_path in empty_dirs(index):
+        try:
+            remove_dir(index, dir_path)
+            print(f"删除空目录: {full_path(index, dir_path)}")
+        except OSError:
+            pass  # 目录不为空或其他错误，跳过
+
     # 输出清理结果
     print(f"\n清理完成!")
     print(f"删除了 {len(removed_files)} 个文件")
     print(f"节省空间: {saved_space:,} bytes ({saved_space / 1024 / 1024:.2f} MB)")
-    
+
     if removed_files:
         print(f"\n删除的文件列表:")
         for file in removed_files:
             print(f"  - {file}")
 
-def get_directory_size(path):
+def get_directory_size(path, index=None):
     """获取目录大小"""
-    total_size = 0
-    for root, dirs, files in os.walk(path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            if os.path.exists(file_path):
-                total_size += os.path.getsize(file_path)
-    return total_size
+    if index is None:
+        index = build_index(path)
+    return total_size(index)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="清理 public 目录")
+    parser.add_argument('--orphans', action='store_true', help="只报告没有被数据文件和源码引用的资源")
+    parser.add_argument('--quarantine', action='store_true', help="把未被引用的资源移到隔离目录（隐含 --orphans）")
+    parser.add_argument('--quarantine-dir', default=QUARANTINE_DIR, help="隔离目录")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
+    index = build_index("public")
+
+    if args.orphans or args.quarantine:
+        sweep_orphans(index, args.quarantine, args.quarantine_dir)
+        save_index(index)
+        raise SystemExit(0)
+
     # 清理前的大小
-    before_size = get_directory_size("public")
+    before_size = get_directory_size("public", index)
     print(f"清理前 public 目录大小: {before_size:,} bytes ({before_size / 1024 / 1024:.2f} MB)")
-    
-    cleanup_public_directory()
-    
+
+    cleanup_public_directory(index)
+
     # 清理后的大小
-    after_size = get_directory_size("public")
+    after_size = get_directory_size("public", index)
     print(f"\n清理后 public 目录大小: {after_size:,} bytes ({after_size / 1024 / 1024:.2f} MB)")
-    print(f"总共节省: {before_size - after_size:,} bytes ({(before_size - after_size) / 1024 / 1024:.2f} MB)")
\ No newline at end of file
+    print(f"总共节省: {before_size - after_size:,} bytes ({(before_size - after_size) / 1024 / 1024:.2f} MB)")
+
+    save_index(index)
\ No newline at end of file
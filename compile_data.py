@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import hashlib
+import argparse
+
+from json_references import atomic_write_json, load_json
+from json_stream import iter_array
+
+GALLERIES_FILE = "src/data/galleries.json"
+BLOG_FILE = "src/data/blog.json"
+IMAGE_MANIFEST_FILE = "src/data/image-manifest.json"
+
+# 页面导入的编译结果：列表页只用精简索引，详情页只加载自己的分片
+COMPILED_DIR = "src/data/compiled"
+GALLERY_INDEX_FILE = f"{COMPILED_DIR}/galleries-index.json"
+BLOG_INDEX_FILE = f"{COMPILED_DIR}/blog-index.json"
+GALLERY_SHARD_DIR = f"{COMPILED_DIR}/galleries"
+BLOG_SHARD_DIR = f"{COMPILED_DIR}/blog"
+
+# 分片路径 -> 内容摘要，内容没变的分片不重写
+MANIFEST_FILE = ".compile-manifest.json"
+
+# 首页每个作品集展示的单张作品数量
+PREVIEW_PHOTOS = 2
+
+# slug 直接用作分片文件名
+SLUG_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]*$')
+
+# 博客列表不需要的字段
+BLOG_DETAIL_FIELDS = ('content', 'images')
+
+def digest(data):
+    """编译结果的内容摘要"""
+    text = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def load_manifest(manifest_file=MANIFEST_FILE):
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_if_changed(path, data, manifest, stats, indent=2):
+    """内容摘要与上次一致且文件仍存在时跳过，否则原子写入"""
+    value = digest(data)
+    if manifest.get(path) == value and os.path.exists(path):
+        stats['unchanged'] += 1
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write_json(path, data, indent)
+    manifest[path] = value
+    stats['written'] += 1
+    print(f"已写入 {path}")
+    return True
+
+def remove_stale_shards(shard_dir, slugs, manifest, stats):
+    """删除已经没有对应记录的分片"""
+    if not os.path.isdir(shard_dir):
+        return
+    for name in sorted(os.listdir(shard_dir)):
+        if name.endswith('.json') and name[:-len('.json')] not in slugs:
+            path = f"{shard_dir}/{name}"
+            os.remove(path)
+            manifest.pop(path, None)
+            stats['removed'] += 1
+            print(f"已删除 {path}")
+
+def iter_with_neighbors(records):
+    """逐条产出 (上一条, 当前, 下一条)，只多保留一条记录在内存中"""
+    previous = current = None
+    for record in records:
+        if current is not None:
+            yield previous, current, record
+        previous, current = current, record
+    if current is not None:
+        yield previous, current, None
+
+def valid_slug(record, source):
+    slug = record.get('slug', '')
+    if SLUG_RE.match(slug):
+        return slug
+    print(f"跳过 {source} 中 slug 无法用作文件名的记录: {slug!r}")
+    return None
+
+def gallery_link(gallery):
+    return {'slug': gallery['slug'], 'title': gallery['title']} if gallery else None
+
+def gallery_summary(gallery):
+    """作品集列表项：不含完整照片列表，只保留数量和前几张预览"""
+    photos = gallery.get('photos', [])
+    return {
+        'slug': gallery['slug'],
+        'title': gallery.get('title', ''),
+        'description': gallery.get('description', ''),
+        'coverPhotoUrl': gallery.get('coverPhotoUrl', ''),
+        'photoCount': len(photos),
+        'previewPhotos': photos[:PREVIEW_PHOTOS],
+    }
+
+def gallery_shard(gallery, previous, following, image_manifest):
+    """单个作品集分片，附带该作品集照片的图片元数据和前后导航"""
+    urls = [photo['url'] for photo in gallery.get('photos', []) if photo.get('url')]
+    return {
+        'gallery': gallery,
+        'imageManifest': {url: image_manifest[url] for url in urls if url in image_manifest},
+        'prev': gallery_link(previous),
+        'next': gallery_link(following),
+    }
+
+def iter_data(data_file):
+    """逐条读取数组数据文件；文件不存在时视为空（编译结果随之清空）"""
+    return iter_array(data_file) if os.path.exists(data_file) else iter(())
+
+def compile_galleries(manifest, stats, galleries_file=GALLERIES_FILE, manifest_file=IMAGE_MANIFEST_FILE):
+    """按作品集写分片，返回列表索引"""
+    image_manifest = load_json(manifest_file) if os.path.exists(manifest_file) else {}
+    valid = (g for g in iter_data(galleries_file) if valid_slug(g, galleries_file))
+
+    index = []
+    for previous, gallery, following in iter_with_neighbors(valid):
+        index.append(gallery_summary(gallery))
+        write_if_changed(f"{GALLERY_SHARD_DIR}/{gallery['slug']}.json",
+                         gallery_shard(gallery, previous, following, image_manifest), manifest, stats)
+
+    remove_stale_shards(GALLERY_SHARD_DIR, {g['slug'] for g in index}, manifest, stats)
+    write_if_changed(GALLERY_INDEX_FILE, index, manifest, stats)
+    return index
+
+def compile_blog(manifest, stats, blog_file=BLOG_FILE):
+    """按文章写分片，列表索引去掉正文"""
+    index = []
+    for post in iter_data(blog_file):
+        if not valid_slug(post, blog_file):
+            continue
+        index.append({k: v for k, v in post.items() if k not in BLOG_DETAIL_FIELDS})
+        write_if_changed(f"{BLOG_SHARD_DIR}/{post['slug']}.json", post, manifest, stats)
+
+    remove_stale_shards(BLOG_SHARD_DIR, {p['slug'] for p in index}, manifest, stats)
+    write_if_changed(BLOG_INDEX_FILE, index, manifest, stats)
+    return index
+
+def compile_data(manifest_file=MANIFEST_FILE):
+    """编译作品集和博客数据，只重写内容有变化的文件"""
+    manifest = load_manifest(manifest_file)
+    stats = {'written': 0, 'unchanged': 0, 'removed': 0}
+    try:
+        galleries = compile_galleries(manifest, stats)
+        posts = compile_blog(manifest, stats)
+    finally:
+        atomic_write_json(manifest_file, dict(sorted(manifest.items())))
+
+    print(f"\n作品集 {len(galleries)} 个，文章 {len(posts)} 篇；"
+          f"写入 {stats['written']} 个文件，{stats['unchanged']} 个未变化，删除 {stats['removed']} 个")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="把 galleries.json 和 blog.json 拆分为精简索引和按页面加载的分片")
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help="编译清单路径")
+    args = parser.parse_args()
+    compile_data(args.manifest)
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,302 @@
 
 import os
 import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+from compile_data import compile_data
+
+# 可以转换的源图片格式（RAW 文件由 Pillow 无法解码，需要先导出）
+SOURCE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
+
+# 输出格式 -> (Pillow 格式名, 默认编码参数)
+OUTPUT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'avif': ('AVIF', {'quality': 60, 'speed': 6}),
+    # JPEG-XL 需要可选依赖 pillow-jxl-plugin
+    'jxl': ('JXL', {'quality': 75, 'effort': 7}),
+}
+
+# 为站点图片预生成的同名兄弟格式，按浏览器优先选择的顺序排列
+SIBLING_FORMATS = ('avif', 'jxl')
+
+MANIFEST_FILE = ".image-manifest.json"
+
+# 每完成多少张图片保存一次清单，崩溃后从最近的检查点继续
+CHECKPOINT_EVERY = 20
+
+def available_workers():
+    """返回当前进程可用的 CPU 核心数"""
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """分块计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    """读取转换清单，不存在或已损坏时返回空清单"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'version': 1, 'entries': {}}
+    manifest.setdefault('entries', {})
+    return manifest
+
+def save_manifest(manifest, manifest_path):
+    """原子写入转换清单（先写临时文件再替换）"""
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+
+def save_image(image, dst_path, fmt, options=None):
+    """把图片编码到 dst_path，写完后再改名，避免崩溃留下半个文件"""
+    pil_format, defaults = OUTPUT_FORMATS[fmt]
+    params = dict(defaults)
+    params.update(options or {})
+
+    dst_path = Path(dst_path)
+    dst_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dst_path.with_name(dst_path.name + ".tmp")
+    image.save(tmp_path, pil_format, **params)
+    os.replace(tmp_path, dst_path)
+    return dst_path.stat().st_size
+
+def format_available(fmt):
+    """检查当前环境的 Pillow 能否编码该格式"""
+    from PIL import Image
+
+    if fmt == 'jxl':
+        try:
+            import pillow_jxl  # noqa: F401  导入时注册 JXL 编码器
+        except ImportError:
+            return False
+    Image.init()
+    return OUTPUT_FORMATS[fmt][0] in Image.SAVE
+
+def sibling_url(url, fmt):
+    """同一张图片其他格式的地址：/a/b.webp -> /a/b.avif"""
+    return os.path.splitext(url)[0] + '.' + fmt
+
+def prepare_image(image):
+    """按 EXIF 方向旋转并转换为编码器支持的色彩模式"""
+    from PIL import ImageOps
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+def encode_image(task):
+    """在工作进程中计算源文件哈希并编码为各个目标格式"""
+    from PIL import Image
+
+    src_path = task['src']
+    src_hash = file_hash(src_path)
+    outputs = task['outputs']
+
+    if src_hash == task.get('previous_hash') and all(os.path.exists(dst) for dst in outputs.values()):
+        return {'src': src_path, 'hash': src_hash, 'skipped': True, 'sizes': {}}
+
+    if 'jxl' in outputs:
+        import pillow_jxl  # noqa: F401
+
+    sizes = {}
+    with Image.open(src_path) as image:
+        image = prepare_image(image)
+        for fmt, dst_path in outputs.items():
+            sizes[fmt] = save_image(image, dst_path, fmt, task['options'].get(fmt))
+
+    return {'src': src_path, 'hash': src_hash, 'skipped': False, 'sizes': sizes}
+
+def find_source_images(src_dir):
+    """查找目录中所有可转换的源图片"""
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if os.path.splitext(file)[1].lower() in SOURCE_SUFFIXES:
+                yield Path(root) / file
+
+def make_task(src_path, rel_path, outputs, options, entry):
+    """生成一个转换任务；大小和修改时间都没变且输出齐全时返回 None"""
+    if entry and set(entry.get('outputs', {})) >= set(outputs):
+        stat = os.stat(src_path)
+        if (entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+                and all(os.path.exists(dst) for dst in outputs.values())):
+            return None
+
+    return {
+        'src': str(src_path),
+        'rel': rel_path,
+        'outputs': outputs,
+        'options': options,
+        'previous_hash': entry.get('hash') if entry else None,
+    }
+
+def run_conversion(tasks, skipped, manifest, manifest_path, dst_dir, workers):
+    """在进程池中执行转换任务，定期把结果写入清单"""
+    entries = manifest['entries']
+    print(f"共 {len(tasks) + skipped} 张源图片，{skipped} 张未变化，{len(tasks)} 张待处理（{workers} 个进程）")
+
+    converted = 0
+    failed = []
+    saved_bytes = 0
+    completed = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(encode_image, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"转换失败 {task['src']}: {e}")
+                    failed.append(task['src'])
+                    continue
+
+                stat = os.stat(task['src'])
+                entries[task['rel']] = {
+                    'hash': result['hash'],
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'outputs': {fmt: Path(dst).relative_to(dst_dir).as_posix()
+                                for fmt, dst in task['outputs'].items()},
+                }
+
+                if result['skipped']:
+                    skipped += 1
+                else:
+                    converted += 1
+                    saved_bytes += stat.st_size - min(result['sizes'].values())
+                    print(f"转换: {task['rel']} -> {', '.join(result['sizes'])}")
+
+                completed += 1
+                if completed % CHECKPOINT_EVERY == 0:
+                    save_manifest(manifest, manifest_path)
+    finally:
+        # 无论正常结束还是中断，都保存已完成的部分，下次运行从这里继续
+        save_manifest(manifest, manifest_path)
+
+    print(f"\n转换完成: {converted} 张已转换, {skipped} 张跳过, {len(failed)} 张失败")
+    print(f"节省空间: {saved_bytes:,} bytes ({saved_bytes / 1024 / 1024:.2f} MB)")
+    return {'converted': converted, 'skipped': skipped, 'failed': failed, 'saved_bytes': saved_bytes}
+
+def convert_directory(src_dir="public", dst_dir=None, formats=('webp',), quality=None,
+                      workers=None, manifest_path=MANIFEST_FILE):
+    """并行把 src_dir 中的源图片转换为 WebP/AVIF，按内容哈希跳过未变化的文件"""
+
+    src_dir = Path(src_dir)
+    dst_dir = Path(dst_dir) if dst_dir else src_dir
+    workers = workers or available_workers()
+    options = {fmt: ({'quality': quality} if quality else {}) for fmt in formats}
+
+    manifest = load_manifest(manifest_path)
+
+    tasks = []
+    skipped = 0
+    for src_path in find_source_images(src_dir):
+        rel_path = src_path.relative_to(src_dir).as_posix()
+        outputs = {fmt: str((dst_dir / rel_path).with_suffix('.' + fmt)) for fmt in formats}
+        task = make_task(src_path, rel_path, outputs, options, manifest['entries'].get(rel_path))
+        if task:
+            tasks.append(task)
+        else:
+            skipped += 1
+
+    return run_conversion(tasks, skipped, manifest, manifest_path, dst_dir, workers)
+
+def collect_sibling_sources():
+    """收集作品集照片（含响应式变体）、博客封面和博客头图的 WebP 地址"""
+    from check_images import collect_references, GALLERIES_FILE, BLOG_FILE, BLOG_CONFIG_FILE
+
+    urls = {}
+    for reference in collect_references([GALLERIES_FILE, BLOG_FILE, BLOG_CONFIG_FILE]):
+        field = reference['field'].rsplit('.', 1)[-1]
+        if field in ('url', 'featuredImageUrl') and reference['url'].lower().endswith('.webp'):
+            urls[reference['url']] = True
+    return sorted(urls)
+
+def siblings_ready(url, formats):
+    """返回 url 已经生成好的兄弟格式"""
+    return [fmt for fmt in formats if os.path.exists("public" + sibling_url(url, fmt))]
+
+def record_sibling_formats(formats):
+    """把已生成的兄弟格式写回数据文件：照片的 formats 要求原图和所有变体都已生成"""
+    from check_images import GALLERIES_FILE, BLOG_FILE, BLOG_CONFIG_FILE
+    from json_references import atomic_write_json, load_json
+    from json_stream import transform_array
+
+    def with_formats(record, key, urls):
+        available = [fmt for fmt in formats if all(fmt in siblings_ready(u, formats) for u in urls)]
+        if available:
+            record[key] = available
+        else:
+            record.pop(key, None)
+
+    def update_gallery(gallery):
+        for photo in gallery.get('photos', []):
+            urls = [photo['url']] + [v['url'] for v in photo.get('variants', [])]
+            with_formats(photo, 'formats', urls)
+        return gallery
+
+    def update_post(post):
+        if post.get('featuredImageUrl'):
+            with_formats(post, 'featuredImageFormats', [post['featuredImageUrl']])
+        return post
+
+    if os.path.exists(GALLERIES_FILE):
+        transform_array(GALLERIES_FILE, update_gallery)
+    if os.path.exists(BLOG_FILE):
+        transform_array(BLOG_FILE, update_post)
+    if os.path.exists(BLOG_CONFIG_FILE):
+        config = load_json(BLOG_CONFIG_FILE)
+        hero = config.get('heroImage')
+        if hero and hero.get('url'):
+            with_formats(hero, 'formats', [hero['url']])
+            atomic_write_json(BLOG_CONFIG_FILE, config)
+
+def generate_siblings(formats=('avif',), quality=None, workers=None, manifest_path=MANIFEST_FILE):
+    """为站点引用的 WebP 预生成 AVIF/JPEG-XL 兄弟文件，并记录到数据文件中
+
+    这样按需优化时不必在请求路径上做耗时的 AVIF 编码；源文件按哈希跳过。
+    """
+    formats = tuple(fmt for fmt in SIBLING_FORMATS if fmt in formats)
+    workers = workers or available_workers()
+    options = {fmt: ({'quality': quality} if quality else {}) for fmt in formats}
+    manifest = load_manifest(manifest_path)
+
+    tasks = []
+    skipped = 0
+    for url in collect_sibling_sources():
+        src_path = "public" + url
+        if not os.path.exists(src_path):
+            continue
+        rel_path = url.lstrip('/')
+        outputs = {fmt: "public" + sibling_url(url, fmt) for fmt in formats}
+        task = make_task(src_path, rel_path, outputs, options, manifest['entries'].get(rel_path))
+        if task:
+            tasks.append(task)
+        else:
+            skipped += 1
+
+    result = run_conversion(tasks, skipped, manifest, manifest_path, Path("public"), workers)
+    record_sibling_formats(formats)
+    compile_data()
+    return result
+
 def update_tutorials_cover_images():
     """更新 tutorials.json 中的封面图片引用"""
     
@@ -38,7 +332,41 @@ def update_tutorials_cover_images():
     
     print(f"已更新 {tutorials_file}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="并行转换图片为 WebP/AVIF，并更新教程封面引用")
+    parser.add_argument('source', nargs='?', default="public", help="源图片目录（默认 public）")
+    parser.add_argument('--output', help="输出目录（默认与源图片同目录）")
+    parser.add_argument('--formats', default='webp', help="输出格式，逗号分隔，可选 webp,avif,jxl")
+    parser.add_argument('--siblings', action='store_true',
+                        help="为作品集和博客引用的 WebP 生成同名兄弟格式（默认 avif），并记录到数据文件")
+    parser.add_argument('--quality', type=int, help="编码质量（默认按格式选择）")
+    parser.add_argument('--workers', type=int, help="进程数（默认使用全部可用核心）")
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help="转换清单路径")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    print("更新教程封面图片...")
-    update_tutorials_cover_images()
-    print("完成!")
\ No newline at end of file
+    args = parse_args()
+    formats = tuple(fmt.strip() for fmt in args.formats.split(',') if fmt.strip())
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown:
+        raise SystemExit(f"不支持的输出格式: {', '.join(unknown)}")
+
+    if args.siblings:
+        # 兄弟格式不包括 WebP 本身，默认生成 AVIF
+        formats = tuple(fmt for fmt in formats if fmt in SIBLING_FORMATS) or ('avif',)
+
+    unavailable = [fmt for fmt in formats if not format_available(fmt)]
+    if unavailable:
+        raise SystemExit(f"当前 Pillow 无法编码: {', '.join(unavailable)}（JPEG-XL 需要 pip install pillow-jxl-plugin）")
+
+    if args.siblings:
+        print("生成兄弟格式...")
+        generate_siblings(formats, args.quality, args.workers, args.manifest)
+    else:
+        print("转换图片...")
+        convert_directory(args.source, args.output, formats, args.quality, args.workers, args.manifest)
+
+        if os.path.exists("src/data/tutorials.json"):
+            print("\n更新教程封面图片...")
+            update_tutorials_cover_images()
+    print("完成!")
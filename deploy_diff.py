@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import argparse
+
+from asset_index import build_index, save_index, get_hash
+
+DEPLOY_MANIFEST_FILE = "deploy-manifest.json"
+
+def format_size(size):
+    """把字节数格式化为 MB"""
+    return f"{size / 1024 / 1024:.2f}MB"
+
+def snapshot(index):
+    """为索引中的每个文件计算内容哈希，返回 相对路径 -> {size, mtime_ns, hash}"""
+    return {
+        path: {'size': entry['size'], 'mtime_ns': entry['mtime_ns'], 'hash': get_hash(index, path)}
+        for path, entry in sorted(index['files'].items())
+    }
+
+def load_deploy_manifest(manifest_file=DEPLOY_MANIFEST_FILE):
+    """读取上次发布时的清单，不存在时视为空（首次部署全部上传）"""
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)['files']
+    except FileNotFoundError:
+        return {}
+
+def save_deploy_manifest(files, manifest_file=DEPLOY_MANIFEST_FILE):
+    """原子写入发布清单"""
+    tmp_file = f"{manifest_file}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'files': files}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, manifest_file)
+
+def compute_diff(previous, current):
+    """对比两次快照，得到最小的 上传/重命名/复制/删除 集合
+
+    重命名按内容哈希而不是路径识别：新路径的内容在上次发布中已存在时，
+    优先与一个被删除的旧路径配对为重命名，否则作为服务器端复制，都不需要重新上传。
+    """
+    removed = sorted(set(previous) - set(current))
+
+    # 被删除路径按哈希分组，供重命名配对
+    removed_by_hash = {}
+    for path in removed:
+        removed_by_hash.setdefault(previous[path]['hash'], []).append(path)
+    published_by_hash = {}
+    for path, entry in previous.items():
+        published_by_hash.setdefault(entry['hash'], path)
+
+    diff = {'upload': [], 'rename': [], 'copy': [], 'delete': [], 'unchanged': 0}
+    for path, entry in current.items():
+        old = previous.get(path)
+        if old and old['hash'] == entry['hash']:
+            diff['unchanged'] += 1
+        elif not old and removed_by_hash.get(entry['hash']):
+            diff['rename'].append([removed_by_hash[entry['hash']].pop(0), path])
+        elif not old and entry['hash'] in published_by_hash:
+            diff['copy'].append([published_by_hash[entry['hash']], path])
+        else:
+            diff['upload'].append(path)
+
+    # 没有被重命名认领的旧路径才需要删除
+    diff['delete'] = sorted(p for paths in removed_by_hash.values() for p in paths)
+    return diff
+
+def diff_report(diff, current):
+    """统计上传量与相对全量部署节省的字节数"""
+    total_bytes = sum(entry['size'] for entry in current.values())
+    upload_bytes = sum(current[path]['size'] for path in diff['upload'])
+    reused_bytes = sum(current[new]['size'] for _, new in diff['rename'] + diff['copy'])
+    return {
+        'files': len(current),
+        'total_bytes': total_bytes,
+        'upload_bytes': upload_bytes,
+        'reused_bytes': reused_bytes,
+        'saved_bytes': total_bytes - upload_bytes,
+    }
+
+def print_diff(diff, report, verbose=False):
+    """以文本形式输出部署差异"""
+    if verbose:
+        for path in diff['upload']:
+            print(f"上传: {path}")
+        for old, new in diff['rename']:
+            print(f"重命名: {old} -> {new}")
+        for src, new in diff['copy']:
+            print(f"复制: {src} -> {new}")
+        for path in diff['delete']:
+            print(f"删除: {path}")
+        print()
+
+    print(f"共 {report['files']} 个文件，未变化 {diff['unchanged']} 个")
+    print(f"上传 {len(diff['upload'])} 个，重命名 {len(diff['rename'])} 个，"
+          f"复制 {len(diff['copy'])} 个，删除 {len(diff['delete'])} 个")
+    print(f"需要上传: {format_size(report['upload_bytes'])} / 全量 {format_size(report['total_bytes'])}")
+    print(f"按哈希复用: {format_size(report['reused_bytes'])}")
+    print(f"节省: {format_size(report['saved_bytes'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="对比上次发布的清单，计算本次部署需要上传、重命名和删除的文件")
+    parser.add_argument('--root', default="public", help="要部署的静态资源目录")
+    parser.add_argument('--manifest', default=DEPLOY_MANIFEST_FILE, help="发布清单路径")
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help="输出格式")
+    parser.add_argument('--verbose', action='store_true', help="列出每个文件的操作")
+    parser.add_argument('--mark-published', action='store_true', help="部署成功后把当前状态写入发布清单")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"目录不存在: {args.root}", file=sys.stderr)
+        sys.exit(2)
+
+    index = build_index(args.root)
+    current = snapshot(index)
+    save_index(index)
+
+    previous = load_deploy_manifest(args.manifest)
+    diff = compute_diff(previous, current)
+    report = diff_report(diff, current)
+
+    if args.format == 'json':
+        print(json.dumps(dict(diff, report=report), ensure_ascii=False, indent=2))
+    else:
+        print_diff(diff, report, args.verbose)
+
+    if args.mark_published:
+        save_deploy_manifest(current, args.manifest)
+        if args.format == 'text':
+            print(f"\n已更新发布清单 {args.manifest}")
+
+if __name__ == "__main__":
+    main()
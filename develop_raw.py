@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import mmap
+import time
+import struct
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from convert_images import available_workers, load_manifest, save_manifest, prepare_image, save_image
+from fix_chinese_filenames import create_english_filename
+
+# RAW 原片存放在 public/ 之外，不会被部署
+RAW_DIR = "raw"
+# NEF 以及同样基于 TIFF 容器的 RAW 格式
+RAW_SUFFIXES = {'.nef', '.nrw', '.dng', '.arw', '.cr2', '.pef'}
+
+MANIFEST_FILE = ".raw-manifest.json"
+
+# TIFF 标签
+TAG_COMPRESSION = 0x0103
+TAG_STRIP_OFFSETS = 0x0111
+TAG_ORIENTATION = 0x0112
+TAG_STRIP_BYTE_COUNTS = 0x0117
+TAG_SUB_IFDS = 0x014A
+TAG_JPEG_OFFSET = 0x0201
+TAG_JPEG_LENGTH = 0x0202
+# 旧式 JPEG 压缩：条带数据就是一个完整的 JPEG
+COMPRESSION_OLD_JPEG = 6
+
+# TIFF 数据类型 -> (struct 格式, 字节数)，只解析需要的整数类型
+_TIFF_TYPES = {1: ('B', 1), 3: ('H', 2), 4: ('I', 4), 7: ('B', 1), 13: ('I', 4)}
+
+# 防止损坏文件中的环形 IFD 链导致死循环
+MAX_IFDS = 64
+
+def _read_ifd(buf, offset, endian):
+    """读取一个 IFD，返回 ({标签: 整数值列表}, 下一个 IFD 偏移)"""
+    count, = struct.unpack_from(endian + 'H', buf, offset)
+    tags = {}
+    for i in range(count):
+        tag, kind, n, raw = struct.unpack_from(endian + 'HHI4s', buf, offset + 2 + 12 * i)
+        if kind not in _TIFF_TYPES:
+            continue
+        fmt, size = _TIFF_TYPES[kind]
+        if size * n <= 4:
+            data = raw
+        else:
+            start, = struct.unpack(endian + 'I', raw)
+            data = buf[start:start + size * n]
+        tags[tag] = list(struct.unpack(endian + fmt * n, data[:size * n]))
+    next_offset, = struct.unpack_from(endian + 'I', buf, offset + 2 + 12 * count)
+    return tags, next_offset
+
+def find_previews(buf):
+    """遍历 TIFF 容器中的 IFD 链和 SubIFD，返回 (嵌入 JPEG 列表, 方向)
+
+    JPEG 列表为 [(偏移, 长度)]，按长度从大到小排列；只解析结构，不读取图像数据。
+    """
+    byte_order = bytes(buf[:4])
+    if byte_order == b'II*\x00':
+        endian = '<'
+    elif byte_order == b'MM\x00*':
+        endian = '>'
+    else:
+        raise ValueError("不是 TIFF 容器的 RAW 文件")
+
+    first, = struct.unpack_from(endian + 'I', buf, 4)
+    queue = [first]
+    visited = set()
+    previews = []
+    orientation = 1
+
+    while queue and len(visited) < MAX_IFDS:
+        offset = queue.pop(0)
+        if not offset or offset in visited or offset + 2 > len(buf):
+            continue
+        visited.add(offset)
+        tags, next_offset = _read_ifd(buf, offset, endian)
+
+        if offset == first and TAG_ORIENTATION in tags:
+            orientation = tags[TAG_ORIENTATION][0]
+        if TAG_JPEG_OFFSET in tags and TAG_JPEG_LENGTH in tags:
+            previews.append((tags[TAG_JPEG_OFFSET][0], tags[TAG_JPEG_LENGTH][0]))
+        if (tags.get(TAG_COMPRESSION) == [COMPRESSION_OLD_JPEG]
+                and len(tags.get(TAG_STRIP_OFFSETS, [])) == 1 and TAG_STRIP_BYTE_COUNTS in tags):
+            previews.append((tags[TAG_STRIP_OFFSETS][0], tags[TAG_STRIP_BYTE_COUNTS][0]))
+
+        queue.extend(tags.get(TAG_SUB_IFDS, []))
+        queue.append(next_offset)
+
+    # 只保留确实以 JPEG SOI 标记开头且没有越界的数据块
+    previews = [(o, n) for o, n in set(previews) if n > 2 and o + n <= len(buf) and buf[o:o + 2] == b'\xff\xd8']
+    previews.sort(key=lambda p: p[1], reverse=True)
+    return previews, orientation
+
+def extract_preview(path):
+    """用内存映射读取 RAW 文件，取出最大的嵌入 JPEG 预览，返回 (JPEG 字节, 方向)"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        previews, orientation = find_previews(buf)
+        if not previews:
+            raise ValueError("没有找到嵌入的 JPEG 预览")
+        offset, length = previews[0]
+        return buf[offset:offset + length], orientation
+
+def _apply_orientation(image, orientation):
+    """按 TIFF 方向值旋转或翻转图片"""
+    from PIL import Image
+
+    transpose = {
+        2: Image.FLIP_LEFT_RIGHT, 3: Image.ROTATE_180, 4: Image.FLIP_TOP_BOTTOM,
+        5: Image.TRANSPOSE, 6: Image.ROTATE_270, 7: Image.TRANSVERSE, 8: Image.ROTATE_90,
+    }.get(orientation)
+    return image.transpose(transpose) if transpose is not None else image
+
+def load_raw_image(path, mode='preview', max_size=None):
+    """把 RAW 文件解码为 Pillow 图片
+
+    preview 模式只取出相机嵌入的全尺寸 JPEG，不做去马赛克；full 模式用 rawpy 完整显影。
+    """
+    from PIL import Image
+
+    if mode == 'preview':
+        data, orientation = extract_preview(path)
+        image = Image.open(io.BytesIO(data))
+        # 预览自带 EXIF 方向时由 prepare_image 处理，否则使用 RAW 主 IFD 中的方向
+        has_orientation = image.getexif().get(TAG_ORIENTATION, 1) != 1
+        if max_size:
+            # JPEG 可以在解码时直接按 1/2、1/4、1/8 缩小，远快于解码后再缩放
+            image.draft('RGB', (max_size, max_size))
+        image = prepare_image(image)
+        if not has_orientation:
+            image = _apply_orientation(image, orientation)
+    else:
+        import rawpy
+
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            with rawpy.imread(buf) as raw:
+                # rawpy 会按 RAW 中记录的方向旋转
+                image = Image.fromarray(raw.postprocess(use_camera_wb=True, output_bps=8))
+
+    if max_size and max(image.size) > max_size:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+    return image
+
+def develop(task):
+    """在工作进程中把一张 RAW 解码并编码为 WebP"""
+    started = time.perf_counter()
+    image = load_raw_image(task['src'], task['mode'], task['max_size'])
+    size = save_image(image, task['dst'], 'webp', task['options'])
+    return {'src': task['src'], 'dst': task['dst'], 'size': size, 'width': image.width,
+            'height': image.height, 'seconds': time.perf_counter() - started}
+
+def find_raw_files(raw_dir=RAW_DIR):
+    """查找 RAW 目录中的所有 RAW 文件，返回相对路径"""
+    found = []
+    for directory, dirnames, filenames in os.walk(raw_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in RAW_SUFFIXES:
+                found.append(os.path.relpath(os.path.join(directory, name), raw_dir))
+    return found
+
+def output_path(rel_path, dst_dir, reserved, owners):
+    """raw/<目录>/<中文名>.NEF -> public/<目录>/<英文名>.webp
+
+    不同 RAW 可能转换出同一个英文名，也可能与 public/ 中已有的照片同名，这时和
+    ingest_photos.reserve_url 一样追加 -1、-2。owners 是清单中 输出路径 -> RAW，
+    清单记录为这张 RAW 输出的文件可以覆盖，属于其他 RAW 或来历不明的已有文件不能覆盖。
+    """
+    directory, name = os.path.split(rel_path)
+    stem = os.path.splitext(create_english_filename(name))[0]
+    base = os.path.join(dst_dir, directory, stem)
+
+    def taken(path):
+        if path in reserved:
+            return True
+        if path in owners:
+            return owners[path] != rel_path
+        return os.path.exists(path)
+
+    path = base + '.webp'
+    counter = 1
+    while taken(path):
+        path = f"{base}-{counter}.webp"
+        counter += 1
+    reserved.add(path)
+    return path
+
+def rawpy_available():
+    try:
+        import rawpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def develop_directory(raw_dir=RAW_DIR, dst_dir="public", mode='preview', max_size=None, quality=None,
+                      workers=None, manifest_path=MANIFEST_FILE, force=False):
+    """并行处理 RAW 目录，大小、修改时间和参数都没变的文件跳过"""
+    manifest = load_manifest(manifest_path)
+    entries = manifest['entries']
+    options = {'quality': quality} if quality else {}
+    settings = {'mode': mode, 'max_size': max_size, 'quality': quality}
+
+    tasks = []
+    skipped = 0
+    reserved = set()
+    owners = {entry['dst']: rel_path for rel_path, entry in entries.items() if entry.get('dst')}
+    for rel_path in find_raw_files(raw_dir):
+        src = os.path.join(raw_dir, rel_path)
+        dst = output_path(rel_path, dst_dir, reserved, owners)
+        stat = os.stat(src)
+        entry = entries.get(rel_path)
+        if (not force and entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+                and entry.get('settings') == settings and entry.get('dst') == dst and os.path.exists(dst)):
+            skipped += 1
+            continue
+        tasks.append({'src': src, 'rel_path': rel_path, 'dst': dst, 'mode': mode, 'max_size': max_size,
+                      'options': options, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+
+    print(f"共 {len(tasks) + skipped} 个 RAW 文件，{skipped} 个未变化，{len(tasks)} 个需要处理（{mode} 模式）")
+
+    started = time.perf_counter()
+    done = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers or available_workers()) as executor:
+            futures = {executor.submit(develop, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"处理失败 {task['src']}: {e}")
+                    continue
+                entries[task['rel_path']] = {
+                    'size': task['size'], 'mtime_ns': task['mtime_ns'], 'settings': settings, 'dst': result['dst'],
+                }
+                done += 1
+                print(f"{result['src']} -> {result['dst']} {result['width']}x{result['height']} "
+                      f"{result['size']:,} bytes ({result['seconds']:.2f}s)")
+    finally:
+        save_manifest(manifest, manifest_path)
+
+    elapsed = time.perf_counter() - started
+    if done:
+        print(f"\n处理了 {done} 个文件，用时 {elapsed:.1f}s（{done / elapsed:.2f} 个/秒）")
+    return done
+
+def main():
+    parser = argparse.ArgumentParser(description="把 public/ 之外的 RAW 原片转换为站点使用的 WebP")
+    parser.add_argument('--raw-dir', default=RAW_DIR, help="RAW 原片目录")
+    parser.add_argument('--dst', default="public", help="WebP 输出目录，保持与 RAW 目录相同的子目录结构")
+    parser.add_argument('--mode', choices=['preview', 'full'], default='preview',
+                        help="preview 只提取相机嵌入的 JPEG 预览（快）；full 用 rawpy 完整显影（慢，画质最好）")
+    parser.add_argument('--max-size', type=int, help="输出的最长边像素")
+    parser.add_argument('--quality', type=int, help="WebP 质量")
+    parser.add_argument('--workers', type=int, help="进程数（默认使用全部可用核心）")
+    parser.add_argument('--force', action='store_true', help="忽略清单，全部重新处理")
+    args = parser.parse_args()
+
+    if args.mode == 'full' and not rawpy_available():
+        parser.error("full 模式需要 rawpy：pip install rawpy")
+
+    develop_directory(args.raw_dir, args.dst, args.mode, args.max_size, args.quality, args.workers,
+                      force=args.force)
+
+if __name__ == "__main__":
+    main()
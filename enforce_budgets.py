@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from asset_index import build_index, save_index, files_with_suffix, full_path, get_dimensions, refresh_entry
+from build_image_manifest import MANIFEST_FILE as IMAGE_MANIFEST_FILE
+from cleanup_images import IMAGE_SUFFIXES, is_derivative
+from compile_data import compile_data
+from convert_images import SIBLING_FORMATS, available_workers, save_image, sibling_url
+from generate_thumbnails import GALLERIES_FILE, LOADER_MANIFEST_FILE
+from json_references import atomic_write_json, load_json
+from json_stream import transform_array
+from publish_assets import is_fingerprinted
+
+BUDGETS_FILE = "image-budgets.json"
+
+# 只有 WebP 会被自动重新编码，其他格式只报告
+REENCODE_SUFFIXES = {'.webp'}
+
+# 质量搜索范围和 SSIM 目标；0.90 时大半图片直接落到最低质量，二分查找失去意义
+QUALITY_MIN = 40
+QUALITY_MAX = 90
+SSIM_TARGET = 0.96
+# EXIF 方向标签：重新编码前已按方向旋转，写回的 EXIF 方向要重置
+TAG_ORIENTATION = 0x0112
+
+# 在输出分辨率下取中心区域计算 SSIM（缩小后比较会掩盖压缩痕迹），区域边长和分块大小
+SSIM_SIZE = 512
+SSIM_BLOCK = 8
+WEBP_METHOD = 4
+
+def load_budgets(budgets_file=BUDGETS_FILE):
+    """读取 目录 -> 预算 配置，default 为没有匹配目录时使用的预算"""
+    with open(budgets_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def budget_for(rel_path, budgets):
+    """按最长目录前缀匹配预算"""
+    directory = os.path.dirname(rel_path)
+    while directory:
+        if directory in budgets:
+            return budgets[directory]
+        directory = os.path.dirname(directory)
+    return budgets.get('default')
+
+def find_violations(index, budgets):
+    """用共享索引找出超出字节或尺寸预算的图片
+
+    变体、兄弟格式和封面帧由原图生成，跟随原图重新生成，不单独检查。
+    带指纹的发布副本内容必须与文件名中的哈希一致，只能由 publish_assets.py 重新发布，也不检查。
+    """
+    violations = []
+    for rel_path in files_with_suffix(index, IMAGE_SUFFIXES):
+        if is_derivative(index, rel_path) or is_fingerprinted(rel_path):
+            continue
+        budget = budget_for(rel_path, budgets)
+        if not budget:
+            continue
+        size = index['files'][rel_path]['size']
+        try:
+            width, height = get_dimensions(index, rel_path)
+        except Exception as e:
+            print(f"无法读取图片尺寸 {full_path(index, rel_path)}: {e}")
+            continue
+
+        reasons = []
+        if size > budget.get('max_bytes', size):
+            reasons.append(f"{size:,} bytes > {budget['max_bytes']:,}")
+        if width > budget.get('max_width', width) or height > budget.get('max_height', height):
+            reasons.append(f"{width}x{height} > {budget.get('max_width')}x{budget.get('max_height')}")
+        if reasons:
+            violations.append({
+                'path': rel_path, 'size': size, 'width': width, 'height': height,
+                'budget': budget, 'reasons': reasons,
+            })
+    return violations
+
+def ssim(reference, candidate):
+    """两张同尺寸灰度图的平均 SSIM，按不重叠的小块计算"""
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    width, height = reference.size
+    a = reference.tobytes()
+    b = candidate.tobytes()
+    n = SSIM_BLOCK * SSIM_BLOCK
+    total = 0.0
+    blocks = 0
+
+    for by in range(0, height - SSIM_BLOCK + 1, SSIM_BLOCK):
+        for bx in range(0, width - SSIM_BLOCK + 1, SSIM_BLOCK):
+            sa = sb = saa = sbb = sab = 0
+            for y in range(by, by + SSIM_BLOCK):
+                row = y * width
+                for x in range(row + bx, row + bx + SSIM_BLOCK):
+                    pa = a[x]
+                    pb = b[x]
+                    sa += pa
+                    sb += pb
+                    saa += pa * pa
+                    sbb += pb * pb
+                    sab += pa * pb
+            mean_a = sa / n
+            mean_b = sb / n
+            var_a = saa / n - mean_a * mean_a
+            var_b = sbb / n - mean_b * mean_b
+            cov = sab / n - mean_a * mean_b
+            total += ((2 * mean_a * mean_b + c1) * (2 * cov + c2)) / \
+                     ((mean_a * mean_a + mean_b * mean_b + c1) * (var_a + var_b + c2))
+            blocks += 1
+    return total / blocks if blocks else 1.0
+
+def _ssim_sample(image, box):
+    return image.crop(box).convert('L')
+
+def reencode(task):
+    """在工作进程中缩小并重新编码一张图片
+
+    先二分查找满足 SSIM 目标的最低质量；结果仍超出字节预算时，
+    再二分查找不超出预算的最高质量。只有比原文件小时才替换。
+    """
+    from PIL import Image
+    from convert_images import prepare_image
+
+    budget = task['budget']
+    with Image.open(task['path']) as image:
+        # 保留拍摄时间等 EXIF 信息，图片元数据清单的 takenAt 依赖它
+        exif = image.getexif()
+        image = prepare_image(image)
+        image.load()
+    if TAG_ORIENTATION in exif:
+        exif[TAG_ORIENTATION] = 1
+    exif_bytes = exif.tobytes() if exif else b''
+
+    original_size = image.size
+    max_width = budget.get('max_width', image.width)
+    max_height = budget.get('max_height', image.height)
+    if image.width > max_width or image.height > max_height:
+        image.thumbnail((max_width, max_height), Image.LANCZOS)
+
+    crop_width = min(SSIM_SIZE, image.width)
+    crop_height = min(SSIM_SIZE, image.height)
+    left = (image.width - crop_width) // 2
+    top = (image.height - crop_height) // 2
+    box = (left, top, left + crop_width, top + crop_height)
+    reference = _ssim_sample(image, box)
+    encoded = {}
+
+    def encode(quality):
+        if quality not in encoded:
+            buffer = io.BytesIO()
+            image.save(buffer, 'WEBP', quality=quality, method=WEBP_METHOD, exif=exif_bytes)
+            data = buffer.getvalue()
+            with Image.open(io.BytesIO(data)) as decoded:
+                score = ssim(reference, _ssim_sample(decoded, box))
+            encoded[quality] = (data, score)
+        return encoded[quality]
+
+    # 质量越高 SSIM 越高：找满足目标的最低质量
+    low, high = QUALITY_MIN, QUALITY_MAX
+    while low < high:
+        middle = (low + high) // 2
+        if encode(middle)[1] >= task['ssim_target']:
+            high = middle
+        else:
+            low = middle + 1
+    quality = low
+
+    # 仍然超出字节预算：牺牲一些画质，找不超预算的最高质量
+    max_bytes = budget.get('max_bytes')
+    if max_bytes and len(encode(quality)[0]) > max_bytes:
+        low, high = QUALITY_MIN, quality
+        while low < high:
+            middle = (low + high + 1) // 2
+            if len(encode(middle)[0]) <= max_bytes:
+                low = middle
+            else:
+                high = middle - 1
+        quality = low
+
+    data, score = encode(quality)
+    result = {
+        'path': task['rel_path'],
+        'old_size': task['size'],
+        'new_size': task['size'],
+        'quality': quality,
+        'ssim': round(score, 4),
+        'width': image.width,
+        'height': image.height,
+        'within_budget': not max_bytes or len(data) <= max_bytes,
+        'replaced': False,
+        'resized': image.size != original_size,
+    }
+    if len(data) < task['size']:
+        tmp_path = task['path'] + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, task['path'])
+        result.update(new_size=len(data), replaced=True)
+
+        # 已生成的 AVIF/JXL 兄弟文件按新尺寸重新生成，<picture> 中各格式保持一致
+        if result['resized']:
+            for fmt in SIBLING_FORMATS:
+                sibling = sibling_url(task['path'], fmt)
+                if os.path.exists(sibling):
+                    save_image(image, sibling, fmt)
+    return result
+
+def enforce_budgets(index, violations, workers=None, ssim_target=SSIM_TARGET):
+    """在进程池中重新编码超预算的 WebP，返回每张图片的结果"""
+    tasks = [{
+        'path': full_path(index, v['path']),
+        'rel_path': v['path'],
+        'size': v['size'],
+        'budget': v['budget'],
+        'ssim_target': ssim_target,
+    } for v in violations if os.path.splitext(v['path'])[1].lower() in REENCODE_SUFFIXES]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or available_workers()) as executor:
+        futures = {executor.submit(reencode, task): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"重新编码失败 {task['path']}: {e}")
+                continue
+            results.append(result)
+            status = "" if result['within_budget'] else "（仍超出预算）"
+            print(f"{full_path(index, result['path'])}: {result['old_size']:,} -> {result['new_size']:,} bytes "
+                  f"q={result['quality']} SSIM={result['ssim']} {result['width']}x{result['height']}{status}")
+
+            # 替换后同步索引，哈希和尺寸留空，下次需要时重新计算
+            if result['replaced']:
+                refresh_entry(index, result['path'])
+    return results
+
+def update_dimensions(resized):
+    """缩小尺寸后同步图片元数据清单、照片变体列表和加载器清单中的宽高
+
+    resized 为 URL -> (宽, 高)；比新宽度更宽的变体不再有意义，一并去掉。
+    """
+    def trim(variants, url, width, height):
+        kept = [v for v in variants if v['url'] != url and v['width'] < width]
+        return kept + [{'url': url, 'width': width, 'height': height}]
+
+    if os.path.exists(IMAGE_MANIFEST_FILE):
+        manifest = load_json(IMAGE_MANIFEST_FILE)
+        changed = False
+        for url, (width, height) in resized.items():
+            if url in manifest and (manifest[url]['width'], manifest[url]['height']) != (width, height):
+                manifest[url].update(width=width, height=height)
+                changed = True
+        if changed:
+            atomic_write_json(IMAGE_MANIFEST_FILE, manifest)
+            print(f"已更新 {IMAGE_MANIFEST_FILE} 中的尺寸")
+
+    def update_gallery(gallery):
+        for photo in gallery.get('photos', []):
+            url = photo.get('url')
+            if url in resized and photo.get('variants'):
+                photo['variants'] = trim(photo['variants'], url, *resized[url])
+                if photo.get('thumbnailUrl') not in {v['url'] for v in photo['variants']}:
+                    photo['thumbnailUrl'] = url
+        return gallery
+
+    if os.path.exists(GALLERIES_FILE):
+        transform_array(GALLERIES_FILE, update_gallery)
+
+    if os.path.exists(LOADER_MANIFEST_FILE):
+        loader_manifest = load_json(LOADER_MANIFEST_FILE)
+        changed = False
+        for url, (width, height) in resized.items():
+            if url in loader_manifest:
+                variants = [{'url': u, 'width': w} for w, u in loader_manifest[url]]
+                loader_manifest[url] = [[v['width'], v['url']] for v in trim(variants, url, width, height)]
+                changed = True
+        if changed:
+            atomic_write_json(LOADER_MANIFEST_FILE, loader_manifest)
+
+    compile_data()
+
+def report_by_gallery(results):
+    """按所在目录汇总节省的字节数"""
+    galleries = {}
+    for result in results:
+        directory = os.path.dirname(result['path'])
+        summary = galleries.setdefault(directory, {'files': 0, 'before': 0, 'after': 0})
+        summary['files'] += 1
+        summary['before'] += result['old_size']
+        summary['after'] += result['new_size']
+
+    print("\n按目录汇总:")
+    total = 0
+    for directory, summary in sorted(galleries.items()):
+        saved = summary['before'] - summary['after']
+        total += saved
+        print(f"  public/{directory}: {summary['files']} 张，{summary['before']:,} -> {summary['after']:,} bytes，"
+              f"节省 {saved:,} bytes ({saved / 1024 / 1024:.2f} MB)")
+    print(f"总共节省: {total:,} bytes ({total / 1024 / 1024:.2f} MB)")
+    return galleries
+
+def main():
+    parser = argparse.ArgumentParser(description="检查图片的字节和尺寸预算，并重新编码超出预算的图片")
+    parser.add_argument('--budgets', default=BUDGETS_FILE, help="预算配置文件")
+    parser.add_argument('--check', action='store_true', help="只检查，有超出预算的图片时以状态码 1 退出")
+    parser.add_argument('--ssim', type=float, default=SSIM_TARGET, help="重新编码时的 SSIM 目标")
+    parser.add_argument('--workers', type=int, help="进程数（默认使用全部可用核心）")
+    args = parser.parse_args()
+
+    index = build_index()
+    violations = find_violations(index, load_budgets(args.budgets))
+
+    print(f"超出预算的图片: {len(violations)} 张")
+    for v in violations:
+        print(f"  {full_path(index, v['path'])}: {'，'.join(v['reasons'])}")
+
+    if args.check:
+        save_index(index)
+        sys.exit(1 if violations else 0)
+
+    if violations:
+        print("\n重新编码...")
+        results = enforce_budgets(index, violations, args.workers, args.ssim)
+        report_by_gallery(results)
+        resized = {'/' + r['path']: (r['width'], r['height']) for r in results if r['replaced'] and r['resized']}
+        if resized:
+            update_dimensions(resized)
+    save_index(index)
+
+if __name__ == "__main__":
+    main()
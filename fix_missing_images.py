@@ -1,32 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os
-import json
+from asset_index import build_index, url_exists
+from json_stream import transform_array
 
-def fix_tutorials_json():
+def fix_tutorials_json(index=None):
     """修复 tutorials.json 中缺失的图片引用"""
     
-    tutorials_file = "src/data/tutorials.json"
+    if index is None:
+        index = build_index()
     
-    with open(tutorials_file, 'r', encoding='utf-8') as f:
-        tutorials = json.load(f)
+    tutorials_file = "src/data/tutorials.json"
     
-    for tutorial in tutorials:
+    def fix_tutorial(tutorial):
         # 检查并修复 images 数组
         if 'images' in tutorial:
             valid_images = []
             for image_url in tutorial['images']:
-                image_path = "public" + image_url
-                if os.path.exists(image_path):
+                if url_exists(index, image_url):
                     valid_images.append(image_url)
                 else:
                     print(f"移除缺失的图片: {image_url}")
             tutorial['images'] = valid_images
+        return tutorial
     
-    # 保存修复后的文件
-    with open(tutorials_file, 'w', encoding='utf-8') as f:
-        json.dump(tutorials, f, ensure_ascii=False, indent=2)
+    # 逐条读取、修复并写回，不把整个文件读入内存
+    transform_array(tutorials_file, fix_tutorial)
     
     print(f"已修复 {tutorials_file}")
 
@@ -2,9 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import os
-import shutil
-import json
 import re
+import argparse
+
+from json_references import path_to_url, update_references
+from rename_plan import plan_renames, print_plan, execute_plan, PendingJournalError
 
 def create_chinese_to_english_mapping():
     """创建中英文映射字典"""
@@ -54,104 +56,63 @@ def sanitize_filename(filename, mapping):
     
     return result
 
-def rename_directories_and_files(root_dir):
+def rename_directories_and_files(root_dir, dry_run=False):
     """递归重命名目录和文件"""
     mapping = create_chinese_to_english_mapping()
-    renamed_items = []
+    moves = []
     
-    # 从最深层开始处理，避免路径问题
+    # 从最深层开始处理，目录里的文件先于目录本身重命名，计划中的路径在执行时都有效
     for root, dirs, files in os.walk(root_dir, topdown=False):
-        # 重命名文件
-        for file in files:
-            old_path = os.path.join(root, file)
-            new_filename = sanitize_filename(file, mapping)
-            
-            if new_filename != file:
-                new_path = os.path.join(root, new_filename)
-                try:
-                    os.rename(old_path, new_path)
-                    renamed_items.append({
-                        'type': 'file',
-                        'old': old_path,
-                        'new': new_path
-                    })
-                    print(f"文件重命名: {old_path} -> {new_path}")
-                except Exception as e:
-                    print(f"重命名文件失败 {old_path}: {e}")
-        
-        # 重命名目录
-        for dir_name in dirs:
-            old_dir_path = os.path.join(root, dir_name)
-            new_dir_name = sanitize_filename(dir_name, mapping)
-            
-            if new_dir_name != dir_name:
-                new_dir_path = os.path.join(root, new_dir_name)
-                try:
-                    os.rename(old_dir_path, new_dir_path)
-                    renamed_items.append({
-                        'type': 'directory',
-                        'old': old_dir_path,
-                        'new': new_dir_path
-                    })
-                    print(f"目录重命名: {old_dir_path} -> {new_dir_path}")
-                except Exception as e:
-                    print(f"重命名目录失败 {old_dir_path}: {e}")
+        for name in sorted(files) + sorted(dirs):
+            new_name = sanitize_filename(name, mapping)
+            if new_name != name:
+                moves.append((os.path.join(root, name), os.path.join(root, new_name)))
+    
+    plan = plan_renames(moves)
+    renamed_items = [
+        {'type': 'directory' if os.path.isdir(old) else 'file', 'old': old, 'new': new}
+        for old, new in plan['moves']
+    ]
+    
+    if dry_run:
+        print_plan(plan)
+    else:
+        # 带日志批量执行，JSON 引用在同一个事务中更新
+        execute_plan(plan)
     
     return renamed_items
 
 def update_json_references(renamed_items):
     """更新JSON文件中的路径引用"""
-    json_files = ['src/data/tutorials.json', 'src/data/galleries.json']
+    # 先重命名的是目录里的文件，后重命名的是目录本身，resolve 会依次应用两者
+    rename_map = {path_to_url(item['old']): path_to_url(item['new']) for item in renamed_items}
     
-    for json_file in json_files:
-        if os.path.exists(json_file):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # 将数据转换为字符串进行替换
-                data_str = json.dumps(data, ensure_ascii=False, indent=2)
-                
-                # 替换路径引用
-                for item in renamed_items:
-                    old_path = item['old'].replace('\\', '/')
-                    new_path = item['new'].replace('\\', '/')
-                    
-                    # 移除 public/ 前缀进行匹配
-                    if old_path.startswith('public/'):
-                        old_path = old_path[7:]
-                    if new_path.startswith('public/'):
-                        new_path = new_path[7:]
-                    
-                    data_str = data_str.replace(old_path, new_path)
-                
-                # 写回文件
-                updated_data = json.loads(data_str)
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(updated_data, f, ensure_ascii=False, indent=2)
-                
-                print(f"已更新 {json_file}")
-                
-            except Exception as e:
-                print(f"更新 {json_file} 失败: {e}")
+    try:
+        update_references(rename_map)
+    except Exception as e:
+        print(f"更新 JSON 文件失败: {e}")
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="处理 public/images 中剩余的中文目录名和文件名")
+    parser.add_argument('--dry-run', action='store_true', help="只输出重命名计划，不修改文件")
+    args = parser.parse_args()
+
     print("开始处理剩余的中文目录名和文件名...")
     
     # 处理 public/images 目录
     images_dir = "public/images"
     if os.path.exists(images_dir):
-        renamed_items = rename_directories_and_files(images_dir)
+        try:
+            renamed_items = rename_directories_and_files(images_dir, args.dry_run)
+        except PendingJournalError as e:
+            print(e)
+            return
         
         if renamed_items:
-            print(f"\n总共重命名了 {len(renamed_items)} 个项目")
-            
-            # 更新JSON文件引用
-            print("\n更新JSON文件中的路径引用...")
-            update_json_references(renamed_items)
-            
-            print("\n✅ 所有剩余的中文名称已处理完成！")
+            print(f"\n总共{'计划重命名' if args.dry_run else '重命名了'} {len(renamed_items)} 个项目")
+            if not args.dry_run:
+                print("\n✅ 所有剩余的中文名称已处理完成！")
         else:
             print("\n✅ 没有发现需要重命名的中文名称")
     else:
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from compile_data import compile_data
+from convert_images import (
+    available_workers, file_hash, load_manifest, save_manifest, save_image, prepare_image,
+)
+from json_references import atomic_write_json
+
+GALLERIES_FILE = "src/data/galleries.json"
+BLOG_FILE = "src/data/blog.json"
+NEXT_CONFIG_FILE = "next.config.js"
+MANIFEST_FILE = ".variant-manifest.json"
+
+# 自定义 next/image 加载器（src/lib/imageLoader.ts）使用的清单：原图 URL -> [[宽度, 变体 URL], ...]
+LOADER_MANIFEST_FILE = "src/data/image-loader-manifest.json"
+
+# 变体存放在原图同级的 variants 目录，例如
+# /gallery/coastal-scenery/variants/image-4964-640w.webp
+VARIANT_DIR = "variants"
+
+# 小于这个宽度的 imageSizes（图标尺寸）对照片没有意义
+MIN_VARIANT_WIDTH = 256
+
+# 变体数量多，用较快的编码档位
+VARIANT_OPTIONS = {'quality': 78, 'method': 4}
+
+def read_next_image_sizes(config_path=NEXT_CONFIG_FILE):
+    """从 next.config.js 读取 deviceSizes 和 imageSizes"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = f.read()
+
+    sizes = {}
+    for key in ('deviceSizes', 'imageSizes'):
+        match = re.search(rf'{key}\s*:\s*\[([^\]]*)\]', config)
+        sizes[key] = [int(n) for n in re.findall(r'\d+', match.group(1))] if match else []
+    return sizes
+
+def variant_widths(sizes, min_width=MIN_VARIANT_WIDTH):
+    """合并 deviceSizes 和 imageSizes，得到需要生成的宽度列表"""
+    return sorted({w for w in sizes['deviceSizes'] + sizes['imageSizes'] if w >= min_width})
+
+def variant_url(url, width):
+    """根据原图 URL 和宽度得到变体 URL"""
+    directory, file_name = url.rsplit('/', 1)
+    stem = os.path.splitext(file_name)[0]
+    return f"{directory}/{VARIANT_DIR}/{stem}-{width}w.webp"
+
+def save_variants(image, url, widths):
+    """把已解码的图片缩放为多个宽度的 WebP 变体，返回按宽度排列的变体列表（最后一项是原图）"""
+    from PIL import Image
+
+    variants = []
+    src_width, src_height = image.size
+
+    # 不放大：只生成比原图窄的宽度，另外保留原图宽度本身作为最大一档
+    for width in [w for w in widths if w < src_width]:
+        height = round(src_height * width / src_width)
+        resized = image.resize((width, height), Image.LANCZOS)
+        save_image(resized, "public" + variant_url(url, width), 'webp', VARIANT_OPTIONS)
+        variants.append({'url': variant_url(url, width), 'width': width, 'height': height})
+
+    variants.append({'url': url, 'width': src_width, 'height': src_height})
+    return variants
+
+def render_variants(task):
+    """在工作进程中把一张原图缩放为多个宽度的 WebP"""
+    from PIL import Image
+
+    with Image.open(task['src']) as image:
+        variants = save_variants(prepare_image(image), task['url'], task['widths'])
+    return {'url': task['url'], 'hash': task['hash'], 'variants': variants}
+
+def pick_thumbnail(variants, thumbnail_width):
+    """缩略图取不小于目标宽度的最小变体"""
+    candidates = [v for v in variants if v['width'] >= thumbnail_width] or variants[-1:]
+    return min(candidates, key=lambda v: v['width'])
+
+def collect_photo_urls(galleries):
+    """收集 galleries.json 中所有照片的原图 URL（去重并保持顺序）"""
+    urls = {}
+    for gallery in galleries:
+        for photo in gallery.get('photos', []):
+            if 'url' in photo:
+                urls[photo['url']] = True
+    return list(urls)
+
+def collect_blog_image_urls(posts):
+    """收集 blog.json 中的封面图和配图 URL"""
+    urls = {}
+    for post in posts:
+        if post.get('featuredImageUrl'):
+            urls[post['featuredImageUrl']] = True
+        for url in post.get('images', []):
+            urls[url] = True
+    return list(urls)
+
+def build_loader_manifest(variants_by_url):
+    """生成加载器清单，每张图片的变体按宽度从小到大排列，最后一项是原图"""
+    return {
+        url: [[v['width'], v['url']] for v in sorted(variants, key=lambda v: v['width'])]
+        for url, variants in sorted(variants_by_url.items())
+    }
+
+def generate_variants(urls, widths, workers=None, manifest_path=MANIFEST_FILE):
+    """并行生成缩略图和响应式变体，只重新生成源文件发生变化的图片"""
+
+    workers = workers or available_workers()
+    manifest = load_manifest(manifest_path)
+    entries = manifest['entries']
+    results = {}
+
+    tasks = []
+    for url in urls:
+        src_path = "public" + url
+        if not os.path.exists(src_path):
+            print(f"缺失原图: {src_path}")
+            continue
+
+        stat = os.stat(src_path)
+        entry = entries.get(url)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            src_hash = entry['hash']
+        else:
+            src_hash = file_hash(src_path)
+
+        # 源文件哈希和宽度配置都没变，且变体文件齐全时跳过
+        if (entry and entry['hash'] == src_hash and entry.get('widths') == widths
+                and all(os.path.exists("public" + v['url']) for v in entry['variants'])):
+            entry['size'], entry['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+            results[url] = entry['variants']
+            continue
+
+        tasks.append({'src': src_path, 'url': url, 'hash': src_hash, 'widths': widths,
+                      'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+
+    print(f"共 {len(results) + len(tasks)} 张照片，{len(results)} 张未变化，{len(tasks)} 张需要生成变体")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(render_variants, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"生成变体失败 {task['src']}: {e}")
+                    continue
+
+                entries[task['url']] = {
+                    'hash': task['hash'],
+                    'size': task['size'],
+                    'mtime_ns': task['mtime_ns'],
+                    'widths': widths,
+                    'variants': result['variants'],
+                }
+                results[task['url']] = result['variants']
+                print(f"生成变体: {task['url']} ({len(result['variants']) - 1} 个)")
+    finally:
+        save_manifest(manifest, manifest_path)
+
+    return results
+
+def update_galleries_json(galleries, variants_by_url, thumbnail_width):
+    """把缩略图和变体列表写回 galleries.json 的照片记录"""
+    updated = 0
+    for gallery in galleries:
+        for photo in gallery.get('photos', []):
+            variants = variants_by_url.get(photo.get('url'))
+            if not variants:
+                continue
+
+            thumbnail = pick_thumbnail(variants, thumbnail_width)
+
+            if photo.get('thumbnailUrl') != thumbnail['url'] or photo.get('variants') != variants:
+                photo['thumbnailUrl'] = thumbnail['url']
+                photo['variants'] = variants
+                updated += 1
+    return updated
+
+def main():
+    parser = argparse.ArgumentParser(description="为 galleries.json 和 blog.json 中的图片生成缩略图、响应式变体和加载器清单")
+    parser.add_argument('--workers', type=int, help="进程数（默认使用全部可用核心）")
+    parser.add_argument('--manifest', default=MANIFEST_FILE, help="变体清单路径")
+    parser.add_argument('--loader-manifest', default=LOADER_MANIFEST_FILE, help="加载器清单输出路径")
+    args = parser.parse_args()
+
+    sizes = read_next_image_sizes()
+    widths = variant_widths(sizes)
+    thumbnail_width = max(sizes['imageSizes'])
+    print(f"变体宽度: {widths}，缩略图宽度: {thumbnail_width}")
+
+    with open(GALLERIES_FILE, 'r', encoding='utf-8') as f:
+        galleries = json.load(f)
+
+    urls = collect_photo_urls(galleries)
+    if os.path.exists(BLOG_FILE):
+        with open(BLOG_FILE, 'r', encoding='utf-8') as f:
+            urls += [url for url in collect_blog_image_urls(json.load(f)) if url not in urls]
+
+    variants_by_url = generate_variants(urls, widths, args.workers, args.manifest)
+    updated = update_galleries_json(galleries, variants_by_url, thumbnail_width)
+
+    if updated:
+        atomic_write_json(GALLERIES_FILE, galleries)
+        print(f"已更新 {GALLERIES_FILE} 中 {updated} 张照片")
+    else:
+        print(f"{GALLERIES_FILE} 无需更新")
+
+    # 加载器直接返回预生成的静态文件，运行时不再需要图片优化服务
+    loader_manifest = build_loader_manifest(variants_by_url)
+    atomic_write_json(args.loader_manifest, loader_manifest)
+    print(f"已写入 {args.loader_manifest}（{len(loader_manifest)} 张图片）")
+
+    compile_data()
+    print("完成!")
+
+if __name__ == "__main__":
+    main()
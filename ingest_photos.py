@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import errno
+import select
+import shutil
+import signal
+import struct
+import argparse
+import ctypes
+import ctypes.util
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from build_image_manifest import exif_capture_date
+from build_search_index import build_search_index
+from compile_data import compile_data
+from convert_images import SOURCE_SUFFIXES, available_workers, file_hash, prepare_image, save_image
+from develop_raw import RAW_SUFFIXES, load_raw_image
+from fix_chinese_filenames import create_english_filename, stable_id, _CHINESE_RE
+from generate_thumbnails import (
+    GALLERIES_FILE, LOADER_MANIFEST_FILE, VARIANT_DIR, build_loader_manifest, pick_thumbnail, read_next_image_sizes,
+    save_variants, variant_widths,
+)
+from json_references import atomic_write_json, load_json
+
+# 收件箱：inbox/<作品集>/照片，子目录名为作品集 slug 或标题；直接放在 inbox 下的照片进入 --gallery
+INBOX_DIR = "inbox"
+# 收件箱中以点开头的目录不监视：处理完的原片归档到 .ingested，失败的移到 .failed
+ARCHIVE_DIR = ".ingested"
+FAILED_DIR = ".failed"
+
+GALLERY_ROOT = "/gallery"
+# 未指定 --gallery 时，直接放在收件箱根目录的照片所属作品集
+DEFAULT_GALLERY = "uncategorized"
+STATE_FILE = ".ingest-state.json"
+STATS_FILE = ".ingest-stats.json"
+
+INGEST_SUFFIXES = SOURCE_SUFFIXES | RAW_SUFFIXES | {'.webp'}
+
+# 文件在这段时间内没有新事件且大小不变才开始处理，避免读到拷贝到一半的文件
+SETTLE_SECONDS = 2.0
+POLL_INTERVAL = 2.0
+# 攒够这么多张或距上次写入超过这么久才写一次 galleries.json
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 10.0
+STATS_INTERVAL = 5.0
+
+# inotify(7) 常量
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT_HEADER = struct.Struct('iIII')
+
+def is_ingestable(name):
+    return not name.startswith('.') and os.path.splitext(name)[1].lower() in INGEST_SUFFIXES
+
+def scan_inbox(root):
+    """遍历收件箱（跳过以点开头的目录），产出 (路径, stat)"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.is_file(follow_symlinks=False) and is_ingestable(entry.name):
+                yield entry.path, entry.stat(follow_symlinks=False)
+
+def _inotify_add_tree(watcher, root):
+    """为 root 及其子目录添加监视，返回目录中已经存在的文件（监视建立前拷入的）"""
+    existing = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        wd = watcher['libc'].inotify_add_watch(watcher['fd'], os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_add_watch 失败: {os.strerror(error)}", directory)
+        watcher['watches'][wd] = directory
+        existing.extend(os.path.join(directory, f) for f in filenames if is_ingestable(f))
+    return existing
+
+def inotify_watcher(root):
+    """通过 ctypes 调用 inotify，不可用时抛出 OSError"""
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name or not sys.platform.startswith('linux'):
+        raise OSError(errno.ENOSYS, "当前平台不支持 inotify")
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        error = ctypes.get_errno()
+        raise OSError(error, f"inotify_init1 失败: {os.strerror(error)}")
+
+    watcher = {'kind': 'inotify', 'root': root, 'libc': libc, 'fd': fd, 'watches': {}}
+    try:
+        _inotify_add_tree(watcher, root)
+    except OSError:
+        os.close(fd)
+        raise
+    return watcher
+
+def _read_inotify(watcher, timeout):
+    ready, _, _ = select.select([watcher['fd']], [], [], timeout)
+    if not ready:
+        return []
+    try:
+        data = os.read(watcher['fd'], 64 * 1024)
+    except BlockingIOError:
+        return []
+
+    paths = []
+    offset = 0
+    while offset < len(data):
+        wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+        name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length].rstrip(b'\0')
+        offset += _EVENT_HEADER.size + length
+
+        if mask & IN_Q_OVERFLOW:
+            # 事件队列溢出时丢失了事件，重新扫描一次收件箱
+            print("inotify 事件队列溢出，重新扫描收件箱")
+            paths.extend(path for path, _ in scan_inbox(watcher['root']))
+            continue
+        directory = watcher['watches'].get(wd)
+        if directory is None or not name or name.startswith(b'.'):
+            continue
+        path = os.path.join(directory, os.fsdecode(name))
+        if mask & IN_ISDIR:
+            # 新建或移入的子目录：加监视，并补上在监视建立前已经写入的文件
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                paths.extend(_inotify_add_tree(watcher, path))
+        elif is_ingestable(os.path.basename(path)):
+            paths.append(path)
+    return paths
+
+def polling_watcher(root, interval=POLL_INTERVAL):
+    """轮询收件箱，只遍历收件箱本身，不遍历 public"""
+    return {'kind': 'polling', 'root': root, 'interval': interval, 'seen': {}, 'last_scan': 0.0}
+
+def _read_polling(watcher, timeout):
+    wait_seconds = watcher['last_scan'] + watcher['interval'] - time.monotonic()
+    if wait_seconds > 0:
+        time.sleep(min(wait_seconds, timeout))
+        if wait_seconds > timeout:
+            return []
+
+    current = {path: (stat.st_size, stat.st_mtime_ns) for path, stat in scan_inbox(watcher['root'])}
+    changed = [path for path, signature in current.items() if watcher['seen'].get(path) != signature]
+    watcher['seen'] = current
+    watcher['last_scan'] = time.monotonic()
+    return changed
+
+def open_watcher(root, mode='auto', interval=POLL_INTERVAL):
+    """优先使用 inotify，失败时退回轮询"""
+    if mode in ('auto', 'inotify'):
+        try:
+            return inotify_watcher(root)
+        except OSError as e:
+            if mode == 'inotify':
+                raise
+            print(f"inotify 不可用（{e}），改用每 {interval} 秒轮询")
+    return polling_watcher(root, interval)
+
+def wait_for_changes(watcher, timeout):
+    """等待最多 timeout 秒，返回有新事件的文件路径"""
+    if watcher['kind'] == 'inotify':
+        return _read_inotify(watcher, timeout)
+    return _read_polling(watcher, timeout)
+
+def close_watcher(watcher):
+    if watcher['kind'] == 'inotify':
+        os.close(watcher['fd'])
+
+def touch(pending, path, now):
+    """记录文件的最近一次事件，重复事件会推迟处理时间"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        pending.pop(path, None)
+        return
+    pending[path] = (now, stat.st_size, stat.st_mtime_ns)
+
+def settled(pending, settle, now):
+    """取出已经静止 settle 秒且大小、修改时间没有变化的文件"""
+    ready = []
+    for path, (last, size, mtime_ns) in list(pending.items()):
+        if now - last < settle:
+            continue
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            del pending[path]
+            continue
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            # 仍在写入：重新计时
+            pending[path] = (now, stat.st_size, stat.st_mtime_ns)
+            continue
+        del pending[path]
+        ready.append(path)
+    return sorted(ready)
+
+def ingest_file(task):
+    """在工作进程中解码一张照片，写出 WebP 和响应式变体"""
+    from PIL import Image
+
+    src_hash = file_hash(task['src'])
+    if os.path.splitext(task['src'])[1].lower() in RAW_SUFFIXES:
+        # RAW 只取嵌入的 JPEG 预览，原片随后归档到收件箱的 .ingested 中，不进入 public/
+        image = load_raw_image(task['src'], 'preview')
+        taken_at = exif_capture_date(image)
+    else:
+        with Image.open(task['src']) as image:
+            taken_at = exif_capture_date(image)
+            image = prepare_image(image)
+            image.load()
+    size = save_image(image, "public" + task['url'], 'webp')
+    variants = save_variants(image, task['url'], task['widths'])
+
+    return {'hash': src_hash, 'size': size, 'variants': variants, 'taken_at': taken_at}
+
+def load_state(state_file=STATE_FILE):
+    """读取 源文件哈希 -> 站点 URL，用于跳过重复导入的照片"""
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def gallery_names(galleries_file=GALLERIES_FILE):
+    """现有作品集的 slug 和标题 -> slug"""
+    names = {}
+    for gallery in load_json(galleries_file):
+        names[gallery['slug']] = gallery['slug']
+        names.setdefault(gallery.get('title'), gallery['slug'])
+    return names
+
+def gallery_for(rel_dir, gallery, names):
+    """收件箱子目录 -> (slug, 标题)，无法确定作品集时返回 None
+
+    目录名与现有作品集的 slug 或标题相同时归入该作品集；否则新建，
+    中文目录名转写为 slug，原名作为标题。词汇表无法完整转写的中文目录名
+    不新建 image-<编号> 这样的作品集：指定了 --gallery 时归入该作品集，否则拒绝。
+    """
+    name = rel_dir.split(os.sep, 1)[0] if rel_dir else gallery or DEFAULT_GALLERY
+    if name in names:
+        return names[name], name
+    if _CHINESE_RE.search(name):
+        slug = create_english_filename(name)
+        if slug != f"image-{stable_id(name)}":
+            return slug, name
+        if gallery and rel_dir:
+            return gallery_for('', gallery, names)
+        return None
+    return name, name
+
+def reserve_url(slug, src_path, reserved):
+    """为新照片分配不与现有文件和本次已分配地址冲突的 URL"""
+    base = os.path.splitext(create_english_filename(os.path.basename(src_path)))[0]
+    directory = f"{GALLERY_ROOT}/{slug}"
+    url = f"{directory}/{base}.webp"
+    counter = 1
+    while url in reserved or os.path.exists("public" + url):
+        url = f"{directory}/{base}-{counter}.webp"
+        counter += 1
+    reserved.add(url)
+    return url
+
+def photo_id_prefix(slug):
+    """沿用现有编号风格：coastal-scenery -> cs"""
+    return ''.join(part[0] for part in slug.split('-') if part) or 'p'
+
+def next_photo_id(gallery):
+    prefix = photo_id_prefix(gallery['slug'])
+    numbers = [int(p['id'].rsplit('-', 1)[1]) for p in gallery.get('photos', [])
+               if p.get('id', '').startswith(prefix + '-') and p['id'].rsplit('-', 1)[1].isdigit()]
+    return f"{prefix}-{max(numbers, default=0) + 1:03d}"
+
+def move_under(src_path, inbox, target_dir):
+    """把收件箱中的文件移到 inbox/<target_dir>/ 下的同一相对位置"""
+    dst_path = os.path.join(inbox, target_dir, os.path.relpath(src_path, inbox))
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    shutil.move(src_path, dst_path)
+    return dst_path
+
+def flush(batch, state, names, inbox, thumbnail_width, state_file, stats):
+    """把一批照片一次写入 galleries.json 和加载器清单，然后归档原片"""
+    if not batch:
+        return
+    galleries = load_json(GALLERIES_FILE)
+    by_slug = {g['slug']: g for g in galleries}
+
+    for item in batch:
+        gallery = by_slug.get(item['slug'])
+        if gallery is None:
+            gallery = {'slug': item['slug'], 'title': item['title'], 'description': '',
+                       'coverPhotoUrl': item['url'], 'photos': []}
+            galleries.append(gallery)
+            by_slug[gallery['slug']] = gallery
+            print(f"新建作品集: {gallery['slug']}（{gallery['title']}）")
+
+        taken_at = item['taken_at'] or time.strftime('%Y-%m-%d', time.localtime(item['mtime']))
+        gallery['photos'].append({
+            'id': next_photo_id(gallery),
+            'title': os.path.splitext(os.path.basename(item['src']))[0],
+            'url': item['url'],
+            'thumbnailUrl': pick_thumbnail(item['variants'], thumbnail_width)['url'],
+            'description': '',
+            'date': taken_at[:10],
+            'location': '',
+            'variants': item['variants'],
+        })
+        if not gallery.get('coverPhotoUrl'):
+            gallery['coverPhotoUrl'] = item['url']
+        state[item['hash']] = item['url']
+
+    atomic_write_json(GALLERIES_FILE, galleries)
+    names.update((g['slug'], g['slug']) for g in galleries)
+    loader_manifest = load_json(LOADER_MANIFEST_FILE) if os.path.exists(LOADER_MANIFEST_FILE) else {}
+    loader_manifest.update(build_loader_manifest({item['url']: item['variants'] for item in batch}))
+    atomic_write_json(LOADER_MANIFEST_FILE, dict(sorted(loader_manifest.items())))
+    atomic_write_json(state_file, state)
+
+    # 数据写入成功后才归档原片；中途崩溃时原片仍在收件箱，重启后重新导入
+    for item in batch:
+        move_under(item['src'], inbox, ARCHIVE_DIR)
+
+    stats['registered'] += len(batch)
+    stats['flushes'] += 1
+    print(f"已登记 {len(batch)} 张照片到 {GALLERIES_FILE}")
+    compile_data()
+    build_search_index()
+    batch.clear()
+
+def report_stats(stats, pending, backlog, futures, stats_file):
+    """输出并写入队列深度和吞吐量计数"""
+    elapsed = max(time.monotonic() - stats['started'], 1e-9)
+    snapshot = dict(
+        {k: v for k, v in stats.items() if k != 'started'},
+        settling=len(pending),
+        queued=len(backlog),
+        in_flight=len(futures),
+        elapsed_seconds=round(elapsed, 1),
+        files_per_second=round(stats['completed'] / elapsed, 2),
+        mb_per_second=round(stats['bytes_in'] / elapsed / 1024 / 1024, 2),
+    )
+    atomic_write_json(stats_file, snapshot)
+    print(f"[状态] 等待稳定 {snapshot['settling']}，排队 {snapshot['queued']}，处理中 {snapshot['in_flight']}，"
+          f"完成 {stats['completed']}，失败 {stats['failed']}，重复 {stats['duplicates']}，"
+          f"{snapshot['files_per_second']} 张/秒")
+    return snapshot
+
+def run_ingest(args):
+    """主循环：监视收件箱、去抖、在有界进程池中处理、分批登记"""
+    inbox = args.inbox
+    os.makedirs(inbox, exist_ok=True)
+    sizes = read_next_image_sizes()
+    widths = variant_widths(sizes)
+    thumbnail_width = max(sizes['imageSizes'])
+    workers = args.workers or available_workers()
+    # 同时提交的任务数有上限，大批量导入时内存占用不随收件箱大小增长
+    max_in_flight = workers * 2
+
+    state = load_state(args.state_file)
+    names = gallery_names()
+    watcher = open_watcher(inbox, args.watch, args.poll_interval)
+    print(f"监视 {inbox}/（{watcher['kind']}），{workers} 个进程")
+
+    # Ctrl+C 和 SIGTERM 都只设置停止标记：处理完已提交的任务、登记后再退出
+    stop = []
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: stop.append(signum))
+
+    stats = {'started': time.monotonic(), 'discovered': 0, 'completed': 0, 'failed': 0, 'duplicates': 0,
+             'registered': 0, 'flushes': 0, 'bytes_in': 0}
+    pending = {}
+    backlog = deque()
+    futures = {}
+    batch = []
+    reserved = set()
+    last_flush = last_stats = time.monotonic()
+
+    # 启动前已经在收件箱中的文件直接视为已稳定
+    for path, _ in scan_inbox(inbox):
+        touch(pending, path, -args.settle)
+        stats['discovered'] += 1
+
+    try:
+        # 工作进程忽略 Ctrl+C，由主进程统一收尾
+        with ProcessPoolExecutor(max_workers=workers, initializer=signal.signal,
+                                 initargs=(signal.SIGINT, signal.SIG_IGN)) as executor:
+            while not stop:
+                timeout = 0.1 if futures or backlog or pending else 1.0
+                now = time.monotonic()
+                changes = wait_for_changes(watcher, timeout)
+                if changes:
+                    # 已经排队、处理中或等待登记的文件不再重复处理
+                    claimed = set(backlog) | {t['src'] for t in futures.values()} | {i['src'] for i in batch}
+                    changes = [path for path in changes if path not in claimed]
+                for path in changes:
+                    if path not in pending:
+                        stats['discovered'] += 1
+                    touch(pending, path, now)
+                backlog.extend(settled(pending, args.settle, time.monotonic()))
+
+                while backlog and len(futures) < max_in_flight:
+                    src_path = backlog.popleft()
+                    rel_dir = os.path.dirname(os.path.relpath(src_path, inbox))
+                    target = gallery_for('' if rel_dir == '.' else rel_dir, args.gallery, names)
+                    if target is None:
+                        stats['failed'] += 1
+                        print(f"无法确定作品集 {src_path}：目录名不是现有作品集，也无法转写为英文 slug；"
+                              f"请先在 galleries.json 中建立同名作品集，或用 --gallery 指定")
+                        move_under(src_path, inbox, FAILED_DIR)
+                        continue
+                    slug, title = target
+                    task = {'src': src_path, 'url': reserve_url(slug, src_path, reserved), 'widths': widths,
+                            'slug': slug, 'title': title}
+                    futures[executor.submit(ingest_file, task)] = task
+
+                if futures:
+                    done, _ = wait(list(futures), timeout=0, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle_result(future, futures.pop(future), state, batch, inbox, stats, futures.values())
+
+                now = time.monotonic()
+                if len(batch) >= args.batch_size or (batch and now - last_flush >= args.flush_interval):
+                    flush(batch, state, names, inbox, thumbnail_width, args.state_file, stats)
+                    last_flush = now
+                if now - last_stats >= args.stats_interval:
+                    report_stats(stats, pending, backlog, futures, args.stats_file)
+                    last_stats = now
+
+                if args.once and not (pending or backlog or futures):
+                    break
+
+            # 停止时处理完已提交的任务
+            if stop:
+                print(f"\n收到退出信号，等待 {len(futures)} 个任务完成后登记")
+            for future in list(futures):
+                handle_result(future, futures.pop(future), state, batch, inbox, stats, futures.values())
+    finally:
+        flush(batch, state, names, inbox, thumbnail_width, args.state_file, stats)
+        report_stats(stats, pending, backlog, futures, args.stats_file)
+        close_watcher(watcher)
+    return stats
+
+def remove_empty_dirs(directories, keep=(), stop="public" + GALLERY_ROOT):
+    """逐级向上删除变空的目录（如重复照片留下的 variants/），不删除 stop 本身和 keep 中的目录"""
+    for directory in sorted(directories, key=len, reverse=True):
+        while directory != stop and directory.startswith(stop + '/') and directory not in keep:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                # 不为空或已被删除
+                break
+            directory = os.path.dirname(directory)
+
+def handle_result(future, task, state, batch, inbox, stats, in_flight=()):
+    """处理一个完成的任务：失败移到 .failed，重复删除输出，成功加入待登记批次
+
+    in_flight 为仍在处理的任务，它们正在写入的目录即使暂时为空也不删除。
+    """
+    try:
+        result = future.result()
+    except Exception as e:
+        stats['failed'] += 1
+        print(f"导入失败 {task['src']}: {e}")
+        if os.path.exists(task['src']):
+            move_under(task['src'], inbox, FAILED_DIR)
+        return
+
+    stat = os.stat(task['src'])
+    stats['completed'] += 1
+    stats['bytes_in'] += stat.st_size
+
+    known = state.get(result['hash']) or next((i['url'] for i in batch if i['hash'] == result['hash']), None)
+    if known:
+        # 同一张照片重复拷入：删除刚生成的文件，原片归档
+        stats['duplicates'] += 1
+        for variant in result['variants']:
+            os.remove("public" + variant['url'])
+        busy = {os.path.dirname("public" + t['url']) for t in in_flight}
+        keep = busy | {f"{directory}/{VARIANT_DIR}" for directory in busy}
+        remove_empty_dirs({os.path.dirname("public" + v['url']) for v in result['variants']}, keep)
+        move_under(task['src'], inbox, ARCHIVE_DIR)
+        print(f"跳过重复照片 {task['src']}（已导入为 {known}）")
+        return
+
+    batch.append(dict(task, hash=result['hash'], variants=result['variants'],
+                      taken_at=result['taken_at'], mtime=stat.st_mtime))
+    print(f"已处理 {task['src']} -> {task['url']}（{len(result['variants']) - 1} 个变体）")
+
+def main():
+    parser = argparse.ArgumentParser(description="监视收件箱，把新照片转写命名、转换、生成变体并登记到 galleries.json")
+    parser.add_argument('--inbox', default=INBOX_DIR, help="收件箱目录")
+    parser.add_argument('--gallery', help=f"直接放在收件箱根目录的照片所属作品集（默认 {DEFAULT_GALLERY}），"
+                                          f"也用于无法转写为英文 slug 的中文子目录")
+    parser.add_argument('--watch', choices=['auto', 'inotify', 'poll'], default='auto', help="监视方式")
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL, help="轮询间隔（秒）")
+    parser.add_argument('--settle', type=float, default=SETTLE_SECONDS, help="文件静止多少秒后开始处理")
+    parser.add_argument('--workers', type=int, help="进程数（默认使用全部可用核心）")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="每批登记的照片数")
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL, help="最长多少秒登记一次")
+    parser.add_argument('--stats-interval', type=float, default=STATS_INTERVAL, help="状态输出间隔（秒）")
+    parser.add_argument('--stats-file', default=STATS_FILE, help="队列深度和吞吐量计数的输出文件")
+    parser.add_argument('--state-file', default=STATE_FILE, help="已导入照片的哈希记录")
+    parser.add_argument('--once', action='store_true', help="处理完收件箱中现有的照片后退出")
+    args = parser.parse_args()
+    run_ingest(args)
+
+if __name__ == "__main__":
+    main()
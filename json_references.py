@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import json
+
+from json_stream import peek_first_char, iter_records, transform_array
+
+# 站点数据文件，tutorials.json 可能不存在
+DATA_FILES = [
+    "src/data/tutorials.json",
+    "src/data/galleries.json",
+    "src/data/blog.json",
+    "src/data/blog-config.json",
+    "src/data/photographer.json",
+]
+
+# Markdown 正文中的链接/图片地址：](/path)
+_MARKDOWN_URL_RE = re.compile(r'\]\((/[^)\s]+)')
+# 正文中内联 HTML 的地址：<img src="/path">、<video poster="/path">
+_HTML_URL_RE = re.compile(r'''(\b(?:src|poster)=["'])(/[^"']+)''')
+
+def load_json(json_file):
+    """读取 JSON 文件"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def atomic_write_json(json_file, data, indent=2):
+    """先写入同目录的临时文件再替换，避免写到一半中断留下损坏的 JSON
+
+    indent 为 None 时写成紧凑的单行，用于浏览器运行时下载的文件。
+    """
+    tmp_file = f"{json_file}.tmp"
+    separators = (',', ':') if indent is None else None
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, json_file)
+
+def path_to_url(path):
+    """把 public/ 下的磁盘路径转换为站点 URL"""
+    path = path.replace('\\', '/')
+    if path.startswith('public/'):
+        path = path[len('public'):]
+    return path if path.startswith('/') else '/' + path
+
+def resolve(url, rename_map):
+    """返回 URL 重命名后的值；从完整路径开始逐级向上应用每一级目录的重命名
+
+    映射中的键都是原路径：/a/x -> /a/y 和 /a -> /b 同时存在时，/a/x 得到 /b/y。
+    某一级被移到了别的目录时，更上层的重命名不再适用。
+    """
+    new_url = url
+    path = url
+    while path:
+        # 目录重命名：/images/旧目录/a.webp -> /images/新目录/a.webp
+        if path in rename_map and (new_url == path or new_url.startswith(path + '/')):
+            new_url = rename_map[path] + new_url[len(path):]
+        path = path.rpartition('/')[0]
+    return new_url
+
+def rewrite_references(data, rename_map):
+    """一次遍历 JSON 数据，按 rename_map 替换所有路径字段，返回替换次数"""
+    count = 0
+    items = data.items() if isinstance(data, dict) else enumerate(data)
+    for key, value in items:
+        if isinstance(value, str):
+            if value.startswith('/'):
+                new_value = resolve(value, rename_map)
+            elif '](/' in value or '="/' in value or "='/" in value:
+                new_value = _MARKDOWN_URL_RE.sub(lambda m: '](' + resolve(m.group(1), rename_map), value)
+                new_value = _HTML_URL_RE.sub(lambda m: m.group(1) + resolve(m.group(2), rename_map), new_value)
+            else:
+                continue
+            if new_value != value:
+                data[key] = new_value
+                count += 1
+        elif isinstance(value, (dict, list)):
+            count += rewrite_references(value, rename_map)
+    return count
+
+def update_references(rename_map, data_files=DATA_FILES, rewrite_data=rewrite_references):
+    """每个数据文件只读一次、遍历一次、原子写入一次，返回 文件 -> 替换次数
+
+    rewrite_data(data, rename_map) 原地改写一段 JSON 数据并返回替换次数，
+    默认替换路径，也可以传入其他按映射改写字符串的函数。
+    """
+    results = {}
+    if not rename_map:
+        return results
+
+    for json_file in data_files:
+        if not os.path.exists(json_file):
+            continue
+
+        if peek_first_char(json_file) == '[':
+            # 数组文件逐条流式处理，内存占用与文件大小无关
+            counter = [0]
+
+            def rewrite(item):
+                # 包一层列表，顶层元素本身是字符串时也能被替换
+                wrapper = [item]
+                counter[0] += rewrite_data(wrapper, rename_map)
+                return wrapper[0]
+
+            transform_array(json_file, rewrite, should_replace=lambda: counter[0] > 0)
+            count = counter[0]
+        else:
+            data = load_json(json_file)
+            count = rewrite_data(data, rename_map)
+            if count:
+                atomic_write_json(json_file, data)
+
+        if count:
+            print(f"已更新 {json_file} 中 {count} 处引用")
+        results[json_file] = count
+    return results
+
+def iter_strings(data):
+    """遍历 JSON 数据中的所有字符串值"""
+    if isinstance(data, dict):
+        for value in data.values():
+            yield from iter_strings(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from iter_strings(value)
+    elif isinstance(data, str):
+        yield data
+
+def collect_referenced_urls(data_files=DATA_FILES):
+    """收集数据文件中所有以 / 开头的路径"""
+    referenced = set()
+    for json_file in data_files:
+        if os.path.exists(json_file):
+            for record in iter_records(json_file):
+                referenced.update(s for s in iter_strings(record) if s.startswith('/'))
+    return referenced
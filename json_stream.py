@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+_WHITESPACE = ' \t\n\r'
+# 数组元素之后只能出现的字符
+_ELEMENT_END = _WHITESPACE + ',]'
+
+def _skip(buffer, pos, chars=_WHITESPACE):
+    """跳过 buffer 中 pos 开始的指定字符"""
+    while pos < len(buffer) and buffer[pos] in chars:
+        pos += 1
+    return pos
+
+def peek_first_char(path):
+    """返回文件中第一个非空白字符，用来判断顶层是数组还是对象"""
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(1024)
+            if not chunk:
+                return ''
+            stripped = chunk.lstrip(_WHITESPACE + '\ufeff')
+            if stripped:
+                return stripped[0]
+
+def iter_array(path, chunk_size=CHUNK_SIZE):
+    """增量解析顶层为数组的 JSON 文件，逐个产出数组元素
+
+    缓冲区里最多只保留一个未解析完的元素，峰值内存取决于最大的单个元素
+    （例如一个作品集），而不是整个文件。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        eof = False
+        while not eof and not buffer.strip(_WHITESPACE + '\ufeff'):
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+        buffer = buffer.lstrip('\ufeff')
+        pos = _skip(buffer, 0)
+        if pos >= len(buffer) or buffer[pos] != '[':
+            raise ValueError(f"{path} 顶层不是 JSON 数组")
+        pos += 1
+        read_size = chunk_size
+
+        while True:
+            pos = _skip(buffer, pos, _WHITESPACE + ',')
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+                # 元素后面不是分隔符时可能是被截断的数字（"12." 会解析为 12），先读更多内容
+                if not eof and (end >= len(buffer) or buffer[end] not in _ELEMENT_END):
+                    raise json.JSONDecodeError("need more data", buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                # 单个元素很大时按倍数读取，避免反复从头解析
+                read_size *= 2
+                continue
+
+            yield item
+            read_size = chunk_size
+            if end > chunk_size:
+                buffer = buffer[end:]
+                end = 0
+            pos = end
+
+def iter_records(path):
+    """顶层为数组时逐个产出元素，为对象时整体读取后产出一次"""
+    if peek_first_char(path) == '[':
+        yield from iter_array(path)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield json.load(f)
+
+def iter_photos(galleries_file):
+    """逐张产出 (作品集信息, 照片)，作品集信息不含 photos 列表"""
+    for gallery in iter_array(galleries_file):
+        photos = gallery.pop('photos', [])
+        for photo in photos:
+            yield gallery, photo
+
+def _format_item(item):
+    """按 json.dump(list, indent=2) 的格式输出单个元素"""
+    return json.dumps(item, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+
+def write_array(path, items, should_replace=None):
+    """逐个写出数组元素，格式与 json.dump(..., indent=2) 一致，写完后原子替换
+
+    should_replace 在写完后调用，返回 False 时丢弃临时文件、保留原文件。
+    """
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write("[\n  " if count == 0 else ",\n  ")
+            f.write(_format_item(item))
+            count += 1
+        f.write("\n]" if count else "[]")
+        f.flush()
+        os.fsync(f.fileno())
+
+    if should_replace is not None and not should_replace():
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    return count
+
+def transform_array(path, transform, should_replace=None):
+    """流式读取-变换-写回数组文件；transform 返回新元素，返回 None 表示删除该元素"""
+    def transformed():
+        for item in iter_array(path):
+            result = transform(item)
+            if result is not None:
+                yield result
+
+    # 先写到临时文件，读完原文件后才替换，所以可以读写同一个路径
+    return write_array(path, transformed(), should_replace)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import math
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from asset_index import build_index, save_index, get_hash, files_with_suffix, full_path
+from cleanup_images import IMAGE_SUFFIXES, QUARANTINE_DIR, is_derivative, is_in_use, mark_reachable, quarantine_files
+from convert_images import available_workers
+from json_references import atomic_write_json
+
+CACHE_FILE = ".perceptual-hash-cache.json"
+
+# pHash：32x32 灰度图做 DCT，取左上角 8x8 低频系数（去掉直流分量）与中位数比较
+PHASH_SAMPLE = 32
+PHASH_SIZE = 8
+# dHash：9x8 灰度图，逐行比较相邻像素
+DHASH_SIZE = 8
+
+# 64 位哈希的汉明距离阈值
+PHASH_THRESHOLD = 10
+DHASH_THRESHOLD = 12
+
+_DCT_COS = [[math.cos(math.pi * (2 * x + 1) * u / (2 * PHASH_SAMPLE)) for x in range(PHASH_SAMPLE)]
+            for u in range(PHASH_SIZE)]
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits:
+        value = (value << 1) | bit
+    return value
+
+def phash(gray):
+    """对 32x32 灰度图计算 64 位感知哈希，只计算需要的 8x8 个 DCT 系数"""
+    pixels = gray.tobytes()
+    n = PHASH_SAMPLE
+    # 先对每一行做一维 DCT，只保留前 8 个系数
+    rows = [[sum(_DCT_COS[u][x] * pixels[y * n + x] for x in range(n)) for u in range(PHASH_SIZE)]
+            for y in range(n)]
+    # 再对列做 DCT
+    coefficients = [sum(_DCT_COS[v][y] * rows[y][u] for y in range(n))
+                    for v in range(PHASH_SIZE) for u in range(PHASH_SIZE)]
+    low = coefficients[1:]
+    median = sorted(low)[len(low) // 2]
+    return _bits_to_int(1 if c > median else 0 for c in coefficients)
+
+def dhash(gray):
+    """对 9x8 灰度图计算 64 位差值哈希"""
+    pixels = gray.tobytes()
+    width = DHASH_SIZE + 1
+    return _bits_to_int(1 if pixels[y * width + x] > pixels[y * width + x + 1] else 0
+                        for y in range(DHASH_SIZE) for x in range(DHASH_SIZE))
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+def compute_hashes(task):
+    """在工作进程中解码图片并计算 pHash/dHash"""
+    from PIL import Image
+    from convert_images import prepare_image
+
+    with Image.open(task['path']) as image:
+        image.draft('L', (PHASH_SAMPLE * 4, PHASH_SAMPLE * 4))
+        image = prepare_image(image)
+        width, height = image.size
+        gray = image.convert('L')
+
+    return {
+        'hash': task['hash'],
+        'phash': phash(gray.resize((PHASH_SAMPLE, PHASH_SAMPLE), Image.BILINEAR)),
+        'dhash': dhash(gray.resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BILINEAR)),
+        'width': width,
+        'height': height,
+    }
+
+def bk_insert(tree, value, item):
+    """向 BK 树插入一个哈希；树节点为 [哈希, [条目], {距离: 子节点}]"""
+    if tree is None:
+        return [value, [item], {}]
+    node = tree
+    while True:
+        distance = hamming(value, node[0])
+        if distance == 0:
+            node[1].append(item)
+            return tree
+        child = node[2].get(distance)
+        if child is None:
+            node[2][distance] = [value, [item], {}]
+            return tree
+        node = child
+
+def bk_search(tree, value, threshold):
+    """查找与 value 汉明距离不超过 threshold 的全部条目，按三角不等式剪枝"""
+    results = []
+    stack = [tree] if tree else []
+    while stack:
+        node = stack.pop()
+        distance = hamming(value, node[0])
+        if distance <= threshold:
+            results.extend(node[1])
+        for d, child in node[2].items():
+            if distance - threshold <= d <= distance + threshold:
+                stack.append(child)
+    return results
+
+def load_cache(cache_file=CACHE_FILE):
+    """读取 内容哈希 -> 感知哈希 的缓存"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def hash_images(index, workers=None, cache_file=CACHE_FILE):
+    """并行计算全部图片的感知哈希，内容未变化的图片使用缓存，返回 相对路径 -> 结果"""
+    cache = load_cache(cache_file)
+    results = {}
+    tasks = {}
+
+    for rel_path in files_with_suffix(index, IMAGE_SUFFIXES):
+        if is_derivative(index, rel_path):
+            continue
+        content_hash = get_hash(index, rel_path)
+        if content_hash in cache:
+            results[rel_path] = cache[content_hash]
+        else:
+            tasks.setdefault(content_hash, {'path': full_path(index, rel_path), 'hash': content_hash, 'paths': []})
+            tasks[content_hash]['paths'].append(rel_path)
+
+    print(f"共 {len(results) + sum(len(t['paths']) for t in tasks.values())} 张图片，需要计算 {len(tasks)} 张")
+
+    with ProcessPoolExecutor(max_workers=workers or available_workers()) as executor:
+        futures = {executor.submit(compute_hashes, task): task for task in tasks.values()}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"计算感知哈希失败 {task['path']}: {e}")
+                continue
+            cache[result.pop('hash')] = result
+            for rel_path in task['paths']:
+                results[rel_path] = result
+
+    used = {get_hash(index, p) for p in results}
+    atomic_write_json(cache_file, {h: r for h, r in cache.items() if h in used})
+    return results
+
+def find_near_duplicates(hashes, phash_threshold=PHASH_THRESHOLD, dhash_threshold=DHASH_THRESHOLD):
+    """用 BK 树查找 pHash 相近、dHash 也相近的图片，并查集合并成簇"""
+    tree = None
+    parent = {}
+
+    def find(path):
+        while parent[path] != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    # 边插入边查询，每对图片只比较一次
+    for rel_path in sorted(hashes):
+        entry = hashes[rel_path]
+        parent[rel_path] = rel_path
+        for other in bk_search(tree, entry['phash'], phash_threshold):
+            if hamming(entry['dhash'], hashes[other]['dhash']) <= dhash_threshold:
+                parent[find(rel_path)] = find(other)
+        tree = bk_insert(tree, entry['phash'], rel_path)
+
+    clusters = {}
+    for rel_path in parent:
+        clusters.setdefault(find(rel_path), []).append(rel_path)
+    return [sorted(c) for c in clusters.values() if len(c) > 1]
+
+def describe_clusters(index, clusters, hashes, reachable):
+    """为每个簇选出保留的图片（优先被引用的，其次分辨率和文件最大的），统计可回收字节"""
+    report = []
+    for cluster in clusters:
+        def rank(p):
+            entry = hashes[p]
+            return (p in reachable, entry['width'] * entry['height'], index['files'][p]['size'])
+
+        keep = max(cluster, key=rank)
+        others = [p for p in cluster if p != keep]
+        report.append({
+            'keep': keep,
+            'duplicates': others,
+            'reclaimable_bytes': sum(index['files'][p]['size'] for p in others),
+            'files': [{
+                'path': p,
+                'size': index['files'][p]['size'],
+                'width': hashes[p]['width'],
+                'height': hashes[p]['height'],
+                'referenced': p in reachable,
+                'distance': hamming(hashes[p]['phash'], hashes[keep]['phash']),
+            } for p in cluster],
+        })
+    report.sort(key=lambda c: c['reclaimable_bytes'], reverse=True)
+    return report
+
+def print_report(report):
+    """以文本形式输出相似图片簇"""
+    total = sum(c['reclaimable_bytes'] for c in report)
+    for cluster in report:
+        print(f"\n相似图片 ({len(cluster['files'])} 张，可回收 {cluster['reclaimable_bytes']:,} bytes):")
+        for f in cluster['files']:
+            mark = "保留" if f['path'] == cluster['keep'] else "重复"
+            ref = "，已引用" if f['referenced'] else ""
+            print(f"  [{mark}] public/{f['path']} {f['width']}x{f['height']} "
+                  f"{f['size']:,} bytes 距离 {f['distance']}{ref}")
+    print(f"\n共 {len(report)} 组相似图片，可回收 {total:,} bytes ({total / 1024 / 1024:.2f} MB)")
+
+def main():
+    parser = argparse.ArgumentParser(description="用感知哈希查找不同尺寸或质量导出的同一张照片")
+    parser.add_argument('--threshold', type=int, default=PHASH_THRESHOLD, help="pHash 汉明距离阈值（0-64）")
+    parser.add_argument('--dhash-threshold', type=int, default=DHASH_THRESHOLD, help="dHash 汉明距离阈值（0-64）")
+    parser.add_argument('--workers', type=int, help="进程数（默认使用全部可用核心）")
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help="输出格式")
+    parser.add_argument('--quarantine', action='store_true', help="把未被引用的重复图片移到隔离目录")
+    args = parser.parse_args()
+
+    index = build_index()
+    hashes = hash_images(index, args.workers)
+    reachable, prefixes = mark_reachable()
+    # 位于动态 URL 前缀之下的文件可能在运行时被拼出来，和被直接引用的文件一样对待
+    in_use = {p for p in hashes if is_in_use(p, reachable, prefixes)}
+    report = describe_clusters(index, find_near_duplicates(hashes, args.threshold, args.dhash_threshold),
+                               hashes, in_use)
+
+    if args.format == 'json':
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+    if args.quarantine:
+        # 被引用的副本需要先改引用，这里只移动没有被引用的
+        removable = [p for c in report for p in c['duplicates'] if p not in in_use]
+        if removable:
+            print(f"\n已移动 {len(removable)} 张到隔离目录: {quarantine_files(index, removable, QUARANTINE_DIR)}")
+
+    save_index(index)
+
+if __name__ == "__main__":
+    main()
@@ -9,15 +9,15 @@ const nextConfig = {
     formats: ['image/webp', 'image/avif'],
     deviceSizes: [640, 750, 828, 1080, 1200, 1920, 2048, 3840],
     imageSizes: [16, 32, 48, 64, 96, 128, 256, 384],
-    minimumCacheTTL: 60,
     dangerouslyAllowSVG: true,
     contentSecurityPolicy: "default-src 'self'; script-src 'none'; sandbox;",
-    // 允许优化所有图片
+    // 保持 false 才会调用下面的加载器；加载器优先返回预生成的静态变体，清单里没有的图片回退到 /_next/image
     unoptimized: false,
     // 图片域名配置（如果需要外部图片）
     domains: [],
-    // 图片加载器配置
-    loader: 'default',
+    // 图片加载器配置：src/data/image-loader-manifest.json 由 generate_thumbnails.py 生成
+    loader: 'custom',
+    loaderFile: './src/lib/imageLoader.ts',
   },
   
   // 静态文件配置
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import re
+import json
+import time
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from asset_index import build_index, save_index, files_with_suffix, full_path, get_hash, refresh_entry
+from compile_data import compile_data
+from convert_images import available_workers, load_manifest, save_manifest, save_image
+from develop_raw import RAW_DIR
+from fix_chinese_filenames import create_english_filename
+from json_references import atomic_write_json, collect_referenced_urls, load_json, update_references
+from publish_assets import is_fingerprinted, read_source_text
+
+VIDEO_SUFFIXES = {'.mp4', '.m4v', '.mov', '.webm', '.avi', '.mkv'}
+
+# 生成的文件：<名称>.web.mp4 为网页转码，<名称>.poster.webp 为封面帧
+WEB_SUFFIX = '.web.mp4'
+POSTER_SUFFIX = '.poster.webp'
+
+# 视频元数据：转码 URL -> {poster, width, height, duration, size}，页面和校验脚本读取
+VIDEO_MANIFEST_FILE = "src/data/video-manifest.json"
+# 源文件相对路径 -> 内容哈希和转码参数，哈希与参数都没变的源文件跳过
+MANIFEST_FILE = ".video-manifest.json"
+
+# 默认上限：最长边 1280 像素、视频码率 2500 kbps
+MAX_SIZE = 1280
+MAX_BITRATE = 2500
+AUDIO_BITRATE = 128
+CRF = 23
+# 封面帧取第 1 秒，视频较短时取 10% 处
+POSTER_SECONDS = 1.0
+
+# 正文中的 <video> 标签及其内容（<source> 子标签），用于补上封面帧
+_VIDEO_TAG_RE = re.compile(r'(<video\b[^>]*>)((?:(?!<video\b).)*?</video>)?', re.IGNORECASE | re.DOTALL)
+_SRC_RE = re.compile(r'\bsrc=["\']([^"\']+)["\']', re.IGNORECASE)
+_POSTER_RE = re.compile(r'(\bposter=["\'])[^"\']*', re.IGNORECASE)
+
+def tools_available():
+    return bool(shutil.which('ffmpeg') and shutil.which('ffprobe'))
+
+def run(args):
+    """执行 ffmpeg/ffprobe，失败时把标准错误的最后几行放进异常信息"""
+    result = subprocess.run(args, capture_output=True)
+    if result.returncode != 0:
+        tail = result.stderr.decode('utf-8', 'replace').strip().splitlines()[-3:]
+        raise RuntimeError(f"{args[0]} 退出码 {result.returncode}: {' / '.join(tail)}")
+    return result.stdout
+
+def probe(path):
+    """用 ffprobe 读取时长、尺寸、编码和码率"""
+    info = json.loads(run([
+        'ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path,
+    ]))
+    video = next((s for s in info.get('streams', []) if s.get('codec_type') == 'video'), None)
+    if video is None:
+        raise ValueError("没有视频流")
+    audio = next((s for s in info.get('streams', []) if s.get('codec_type') == 'audio'), None)
+    width, height = int(video['width']), int(video['height'])
+    # 手机竖拍的视频用旋转标记而不是实际的宽高
+    rotation = int(video.get('tags', {}).get('rotate', 0))
+    for side_data in video.get('side_data_list', []):
+        rotation = int(side_data.get('rotation', rotation))
+    if rotation % 180:
+        width, height = height, width
+    return {
+        'duration': round(float(info.get('format', {}).get('duration') or 0), 2),
+        'width': width,
+        'height': height,
+        'video_codec': video.get('codec_name'),
+        'audio_codec': audio.get('codec_name') if audio else None,
+        'bit_rate': int(info.get('format', {}).get('bit_rate') or 0),
+    }
+
+def scale_filter(max_size):
+    """按最长边缩小，不放大；宽高保持偶数以满足 yuv420p"""
+    return (f"scale=w='if(gte(iw,ih),min(iw,{max_size}),-2)':"
+            f"h='if(gte(iw,ih),-2,min(ih,{max_size}))'")
+
+def can_remux(info, settings):
+    """已经是 H.264/AAC 且尺寸和码率都在上限内的视频只需重新封装"""
+    return (info['video_codec'] == 'h264' and info['audio_codec'] in ('aac', None)
+            and max(info['width'], info['height']) <= settings['max_size']
+            and 0 < info['bit_rate'] <= (settings['max_bitrate'] + AUDIO_BITRATE) * 1000)
+
+def transcode_args(src, dst, info, settings, threads):
+    """生成 ffmpeg 参数：moov 移到文件开头（faststart），浏览器不必下载完就能播放"""
+    args = ['ffmpeg', '-v', 'error', '-y', '-i', src, '-map', '0:v:0', '-map', '0:a:0?', '-threads', str(threads)]
+    if can_remux(info, settings):
+        args += ['-c', 'copy']
+    else:
+        bitrate = settings['max_bitrate']
+        args += [
+            '-vf', scale_filter(settings['max_size']), '-c:v', 'libx264', '-preset', 'slow',
+            '-crf', str(settings['crf']), '-maxrate', f"{bitrate}k", '-bufsize', f"{bitrate * 2}k",
+            '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-b:a', f"{AUDIO_BITRATE}k",
+        ]
+    return args + ['-map_metadata', '-1', '-movflags', '+faststart', '-f', 'mp4', dst]
+
+def extract_poster(src, dst, info, settings, options):
+    """用 ffmpeg 取一帧 PNG 通过管道交给 Pillow，编码为 WebP"""
+    from PIL import Image
+
+    seconds = min(POSTER_SECONDS, info['duration'] * 0.1)
+    data = run([
+        'ffmpeg', '-v', 'error', '-ss', f"{seconds:.2f}", '-i', src, '-frames:v', '1',
+        '-vf', scale_filter(settings['max_size']), '-f', 'image2pipe', '-c:v', 'png', '-',
+    ])
+    return save_image(Image.open(io.BytesIO(data)), dst, 'webp', options)
+
+def process(task):
+    """在工作线程中生成一个视频的封面帧和网页转码，返回转码后的元数据"""
+    started = time.perf_counter()
+    info = probe(task['src'])
+    extract_poster(task['src'], task['poster'], info, task['settings'], task['options'])
+
+    # 先写临时文件，转码中断不会留下半个 MP4
+    tmp_path = task['dst'] + '.tmp'
+    try:
+        run(transcode_args(task['src'], tmp_path, info, task['settings'], task['threads']))
+        os.replace(tmp_path, task['dst'])
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    output = probe(task['dst'])
+    return {
+        'rel_path': task['rel_path'], 'remuxed': can_remux(info, task['settings']),
+        'duration': output['duration'], 'width': output['width'], 'height': output['height'],
+        'source_size': os.path.getsize(task['src']), 'size': os.path.getsize(task['dst']),
+        'seconds': time.perf_counter() - started,
+    }
+
+def with_poster(match, video_manifest):
+    """视频地址（标签的 src 或第一个 <source src>）在清单中时，添加或更新 poster 属性"""
+    tag, body = match.group(1), match.group(2) or ''
+    src = _SRC_RE.search(tag) or _SRC_RE.search(body)
+    meta = video_manifest.get(src.group(1)) if src else None
+    if not meta:
+        return match.group(0)
+    if _POSTER_RE.search(tag):
+        tag = _POSTER_RE.sub(lambda m: m.group(1) + meta['poster'], tag, count=1)
+    else:
+        tag = f'{tag[:len("<video")]} poster="{meta["poster"]}"{tag[len("<video"):]}'
+    return tag + body
+
+def add_posters(data, video_manifest):
+    """一次遍历 JSON 数据，给正文中引用了转码视频的 <video> 标签补上封面帧，返回修改次数"""
+    count = 0
+    items = data.items() if isinstance(data, dict) else enumerate(data)
+    for key, value in items:
+        if isinstance(value, str):
+            if '<video' not in value.lower():
+                continue
+            new_value = _VIDEO_TAG_RE.sub(lambda m: with_poster(m, video_manifest), value)
+            if new_value != value:
+                data[key] = new_value
+                count += 1
+        elif isinstance(value, (dict, list)):
+            count += add_posters(value, video_manifest)
+    return count
+
+def output_paths(rel_path):
+    """tutorials/湿版摄影法.mov -> (tutorials/wet-plate-photography.web.mp4, ….poster.webp)"""
+    directory, name = os.path.split(rel_path)
+    stem = os.path.splitext(create_english_filename(name))[0]
+    base = os.path.join(directory, stem).replace(os.sep, '/')
+    return base + WEB_SUFFIX, base + POSTER_SUFFIX
+
+def find_sources(index):
+    """索引中的原始视频：排除生成的转码和发布时复制出的带指纹文件"""
+    return [p for p in files_with_suffix(index, VIDEO_SUFFIXES)
+            if not p.lower().endswith(WEB_SUFFIX) and not is_fingerprinted(p)]
+
+def archive_originals(index, rel_paths, raw_dir=RAW_DIR):
+    """把已转码且不再被引用的原始视频移到 public/ 之外，与 RAW 原片放在一起"""
+    referenced = collect_referenced_urls()
+    source_text = read_source_text()
+    moved = 0
+    for rel_path in rel_paths:
+        url = '/' + rel_path
+        if url in referenced or url in source_text:
+            print(f"保留仍被引用的原始视频: {full_path(index, rel_path)}")
+            continue
+        dst_path = os.path.join(raw_dir, rel_path)
+        os.makedirs(os.path.dirname(dst_path) or '.', exist_ok=True)
+        shutil.move(full_path(index, rel_path), dst_path)
+        index['files'].pop(rel_path)
+        moved += 1
+        print(f"移动原始视频: {full_path(index, rel_path)} -> {dst_path}")
+    return moved
+
+def process_videos(max_size=MAX_SIZE, max_bitrate=MAX_BITRATE, crf=CRF, quality=None, workers=None,
+                   keep_originals=False, manifest_path=MANIFEST_FILE, force=False):
+    """并行生成封面帧和网页转码，更新数据文件中的引用和视频元数据"""
+    index = build_index()
+    manifest = load_manifest(manifest_path)
+    entries = manifest['entries']
+    settings = {'max_size': max_size, 'max_bitrate': max_bitrate, 'crf': crf, 'quality': quality}
+    options = {'quality': quality} if quality else {}
+
+    # 每个 ffmpeg 自己也是多线程的，同时运行的数量和每个的线程数一起分配核心
+    workers = workers or max(1, available_workers() // 2)
+    threads = max(1, available_workers() // workers)
+
+    tasks = []
+    skipped = []
+    for rel_path in find_sources(index):
+        dst, poster = output_paths(rel_path)
+        entry = entries.get(rel_path)
+        if (not force and entry and entry.get('hash') == get_hash(index, rel_path) and entry.get('settings') == settings
+                and dst in index['files'] and poster in index['files']):
+            skipped.append(rel_path)
+            continue
+        tasks.append({'src': full_path(index, rel_path), 'rel_path': rel_path, 'dst': full_path(index, dst),
+                      'poster': full_path(index, poster), 'settings': settings, 'options': options,
+                      'threads': threads})
+
+    print(f"共 {len(tasks) + len(skipped)} 个视频，{len(skipped)} 个未变化，{len(tasks)} 个需要处理")
+
+    video_manifest = load_json(VIDEO_MANIFEST_FILE) if os.path.exists(VIDEO_MANIFEST_FILE) else {}
+    rename_map = {}
+    done = []
+    started = time.perf_counter()
+    try:
+        # ffmpeg 在子进程中运行，线程池只负责调度和等待
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process, task): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"处理失败 {task['src']}: {e}")
+                    continue
+
+                rel_path = task['rel_path']
+                dst, poster = output_paths(rel_path)
+                refresh_entry(index, dst)
+                refresh_entry(index, poster)
+                entries[rel_path] = {'hash': get_hash(index, rel_path), 'settings': settings, 'dst': dst}
+                video_manifest['/' + dst] = {
+                    'poster': '/' + poster, 'width': result['width'], 'height': result['height'],
+                    'duration': result['duration'], 'size': result['size'],
+                }
+                rename_map['/' + rel_path] = '/' + dst
+                done.append(rel_path)
+                print(f"{task['src']} -> {task['dst']} {result['width']}x{result['height']} {result['duration']}s "
+                      f"{result['source_size']:,} -> {result['size']:,} bytes"
+                      f"{'（仅重新封装）' if result['remuxed'] else ''} ({result['seconds']:.1f}s)")
+    finally:
+        save_manifest(manifest, manifest_path)
+
+    # 页面引用改为转码后的文件
+    for rel_path in skipped:
+        rename_map['/' + rel_path] = '/' + output_paths(rel_path)[0]
+    changed = any(update_references(rename_map).values())
+    if done:
+        atomic_write_json(VIDEO_MANIFEST_FILE, dict(sorted(video_manifest.items())))
+        print(f"已写入 {VIDEO_MANIFEST_FILE}（{len(video_manifest)} 个视频）")
+    # 正文中的 <video> 标签带上清单中的封面帧，浏览器不必先下载视频才有画面
+    if any(update_references(video_manifest, rewrite_data=add_posters).values()):
+        changed = True
+    if changed:
+        compile_data()
+
+    if not keep_originals:
+        moved = archive_originals(index, done + skipped)
+        if moved:
+            print(f"移动了 {moved} 个原始视频到 {RAW_DIR}/")
+
+    save_index(index)
+    elapsed = time.perf_counter() - started
+    if done:
+        print(f"\n处理了 {len(done)} 个视频，用时 {elapsed:.1f}s")
+    return done
+
+def main():
+    parser = argparse.ArgumentParser(description="为 public/ 中的视频生成封面帧和适合网页播放的 MP4")
+    parser.add_argument('--max-size', type=int, default=MAX_SIZE, help="输出的最长边像素")
+    parser.add_argument('--max-bitrate', type=int, default=MAX_BITRATE, help="视频码率上限（kbps）")
+    parser.add_argument('--crf', type=int, default=CRF, help="x264 质量参数，越小画质越好、文件越大")
+    parser.add_argument('--quality', type=int, help="封面帧 WebP 质量")
+    parser.add_argument('--workers', type=int, help="同时运行的 ffmpeg 数量（默认使用一半核心）")
+    parser.add_argument('--keep-originals', action='store_true', help="保留 public/ 中的原始视频")
+    parser.add_argument('--force', action='store_true', help="忽略清单，全部重新处理")
+    args = parser.parse_args()
+
+    if not tools_available():
+        parser.error("需要本机安装 ffmpeg 和 ffprobe")
+
+    process_videos(args.max_size, args.max_bitrate, args.crf, args.quality, args.workers,
+                   args.keep_originals, force=args.force)
+
+if __name__ == "__main__":
+    main()
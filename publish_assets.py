@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import glob
+import shutil
+import argparse
+
+from asset_index import build_index, save_index, get_hash, remove_file, url_to_path
+from check_images import collect_references
+from compile_data import compile_data
+from convert_images import SIBLING_FORMATS, sibling_url
+from fix_chinese_filenames import rename_files_in_directory
+from json_references import (
+    DATA_FILES, atomic_write_json, collect_referenced_urls, load_json, resolve, update_references,
+)
+
+ASSET_MANIFEST_FILE = "src/data/asset-manifest.json"
+IMAGE_MANIFEST_FILE = "src/data/image-manifest.json"
+LOADER_MANIFEST_FILE = "src/data/image-loader-manifest.json"
+VIDEO_MANIFEST_FILE = "src/data/video-manifest.json"
+
+# 指纹为内容哈希的前 10 位：image-4216.3f9a2c1b7d.webp
+FINGERPRINT_LENGTH = 10
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{%d}\.[^./]+$' % FINGERPRINT_LENGTH)
+
+PUBLISH_SUFFIXES = {'.webp', '.avif', '.jpg', '.jpeg', '.png', '.gif', '.mp4'}
+
+SOURCE_PATTERNS = ["src/**/*.tsx", "src/**/*.ts"]
+
+def is_fingerprinted(path):
+    """文件名是否已经带有内容指纹"""
+    return bool(FINGERPRINT_RE.search(path))
+
+def fingerprinted_name(index, path):
+    """根据文件内容哈希生成带指纹的文件名"""
+    stem, ext = os.path.splitext(os.path.basename(path))
+    return f"{stem}.{get_hash(index, path_to_rel(path))[:FINGERPRINT_LENGTH]}{ext}"
+
+def path_to_rel(path):
+    """public/ 下的磁盘路径 -> 索引中的相对路径"""
+    return os.path.relpath(path, "public").replace(os.sep, '/')
+
+def remap_manifest_keys(manifest_file, rename_map):
+    """图片元数据清单以 URL 为键，引用改名后同步改键"""
+    if not os.path.exists(manifest_file):
+        return
+    manifest = load_json(manifest_file)
+    remapped = {resolve(url, rename_map): meta for url, meta in manifest.items()}
+    if remapped != manifest:
+        atomic_write_json(manifest_file, dict(sorted(remapped.items())))
+        print(f"已更新 {manifest_file} 的键")
+
+def remap_loader_manifest(manifest_file, rename_map):
+    """加载器清单的键和变体 URL 都要跟着改名"""
+    if not os.path.exists(manifest_file):
+        return
+    manifest = load_json(manifest_file)
+    remapped = {
+        resolve(url, rename_map): [[width, resolve(variant, rename_map)] for width, variant in variants]
+        for url, variants in manifest.items()
+    }
+    if remapped != manifest:
+        atomic_write_json(manifest_file, dict(sorted(remapped.items())))
+        print(f"已更新 {manifest_file}")
+
+def publish_siblings(index, published, recorded):
+    """数据文件中记录了兄弟格式的资源，按主文件的指纹名复制对应的 AVIF/JXL 文件
+
+    页面由主文件地址推导兄弟格式地址（x.<指纹>.webp -> x.<指纹>.avif），
+    所以兄弟文件沿用主文件的指纹，而不是按自身内容另算。
+    """
+    siblings = {}
+    for old_url, new_url in published.items():
+        for fmt in SIBLING_FORMATS:
+            old_sibling = sibling_url(old_url, fmt)
+            rel_path = url_to_path(old_sibling)
+            if old_sibling not in recorded or rel_path not in index['files']:
+                continue
+            new_path = "public" + sibling_url(new_url, fmt)
+            if not os.path.exists(new_path):
+                shutil.copy2("public" + old_sibling, new_path)
+            siblings[old_sibling] = sibling_url(new_url, fmt)
+            print(f"复制兄弟格式: {os.path.basename(old_sibling)} -> {os.path.basename(new_path)}")
+    return siblings
+
+def remap_asset_manifest(manifest_file, rename_map):
+    """资源清单的键（原始 URL）和指纹 URL 都要跟着改名"""
+    if not os.path.exists(manifest_file):
+        return
+    manifest = load_json(manifest_file)
+    remapped = {resolve(url, rename_map): dict(entry, url=resolve(entry['url'], rename_map))
+                for url, entry in manifest.items()}
+    if remapped != manifest:
+        atomic_write_json(manifest_file, dict(sorted(remapped.items())))
+        print(f"已更新 {manifest_file}")
+
+def read_source_text():
+    """读取 TSX/TS 源码，用来确认原文件没有被页面直接引用"""
+    texts = []
+    for pattern in SOURCE_PATTERNS:
+        for path in glob.glob(pattern, recursive=True):
+            with open(path, 'r', encoding='utf-8') as f:
+                texts.append(f.read())
+    return '\n'.join(texts)
+
+def publish_assets(remove_originals=False):
+    """把数据文件引用的资源复制为带内容指纹的文件名，并更新所有引用"""
+    index = build_index()
+    referenced = collect_referenced_urls()
+    # 兄弟格式地址由主文件地址推导，必须在引用改名之前收集
+    recorded = {reference['url'] for reference in collect_references()}
+
+    def should_publish(path):
+        url = '/' + path_to_rel(path)
+        return (url in referenced and not is_fingerprinted(path)
+                and os.path.splitext(path)[1].lower() in PUBLISH_SUFFIXES)
+
+    # 复用重命名流程：复制到指纹文件名，内容相同的文件名相同，已存在即跳过
+    published = rename_files_in_directory(
+        "public", should_publish, lambda path: fingerprinted_name(index, path), copy=True)
+    siblings = publish_siblings(index, published, recorded)
+
+    update_references(published)
+    remap_manifest_keys(IMAGE_MANIFEST_FILE, published)
+    remap_loader_manifest(LOADER_MANIFEST_FILE, published)
+    remap_manifest_keys(VIDEO_MANIFEST_FILE, published)
+
+    # 资源清单：原始 URL -> 指纹 URL，与已有清单合并
+    asset_manifest = load_json(ASSET_MANIFEST_FILE) if os.path.exists(ASSET_MANIFEST_FILE) else {}
+    for old_url, new_url in {**published, **siblings}.items():
+        rel_path = url_to_path(old_url)
+        asset_manifest[old_url] = {
+            'url': new_url,
+            'hash': get_hash(index, rel_path),
+            'size': index['files'][rel_path]['size'],
+        }
+    atomic_write_json(ASSET_MANIFEST_FILE, dict(sorted(asset_manifest.items())))
+    print(f"已写入 {ASSET_MANIFEST_FILE}（{len(asset_manifest)} 个资源）")
+
+    if remove_originals:
+        # 以清单为准，之前发布过、还留在磁盘上的原文件也一并清理
+        still_referenced = collect_referenced_urls(DATA_FILES)
+        source_text = read_source_text()
+        removed = 0
+        for old_url in asset_manifest:
+            if url_to_path(old_url) not in index['files']:
+                continue
+            if old_url in still_referenced or old_url in source_text:
+                print(f"保留仍被引用的原文件: public{old_url}")
+                continue
+            remove_file(index, url_to_path(old_url))
+            removed += 1
+        print(f"删除了 {removed} 个未带指纹的原文件")
+
+    save_index(index)
+    compile_data()
+    return published
+
+def main():
+    parser = argparse.ArgumentParser(description="把资源发布为带内容指纹的文件名，以便设置长期缓存")
+    parser.add_argument('--remove-originals', action='store_true', help="发布后删除不再被引用的原文件")
+    args = parser.parse_args()
+
+    print("发布带指纹的资源...")
+    published = publish_assets(args.remove_originals)
+    print(f"\n共发布 {len(published)} 个资源")
+    print("完成!")
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import os
-import shutil
-import json
+import argparse
+
+from rename_plan import run_plan, PendingJournalError
 
 # 定义文件夹重命名映射
 folder_mapping = {
@@ -17,54 +18,26 @@ folder_mapping = {
     "8.第八课  摄影色彩的运用": "lesson-08-color-theory"
 }
 
-def rename_folders():
+def rename_folders(dry_run=False):
+    """整体规划后批量重命名主文件夹，JSON 中的目录前缀引用随计划一起更新"""
     base_path = "public/images"
     
-    # 重命名主文件夹
-    for old_name, new_name in folder_mapping.items():
-        old_path = os.path.join(base_path, old_name)
-        new_path = os.path.join(base_path, new_name)
-        
-        if os.path.exists(old_path):
-            print(f"重命名: {old_path} -> {new_path}")
-            shutil.move(old_path, new_path)
-        else:
-            print(f"文件夹不存在: {old_path}")
-
-def update_json_files():
-    """更新 JSON 文件中的路径引用"""
-    
-    # 更新 tutorials.json
-    tutorials_file = "src/data/tutorials.json"
-    if os.path.exists(tutorials_file):
-        with open(tutorials_file, 'r', encoding='utf-8') as f:
-            tutorials = json.load(f)
-        
-        # 更新路径
-        for tutorial in tutorials:
-            if 'featuredImageUrl' in tutorial:
-                old_url = tutorial['featuredImageUrl']
-                for old_name, new_name in folder_mapping.items():
-                    if old_name in old_url:
-                        tutorial['featuredImageUrl'] = old_url.replace(old_name, new_name)
-                        break
-            
-            if 'images' in tutorial:
-                for i, image_url in enumerate(tutorial['images']):
-                    for old_name, new_name in folder_mapping.items():
-                        if old_name in image_url:
-                            tutorial['images'][i] = image_url.replace(old_name, new_name)
-                            break
-        
-        # 保存更新后的文件
-        with open(tutorials_file, 'w', encoding='utf-8') as f:
-            json.dump(tutorials, f, ensure_ascii=False, indent=2)
-        
-        print(f"已更新 {tutorials_file}")
+    moves = [
+        (os.path.join(base_path, old_name), os.path.join(base_path, new_name))
+        for old_name, new_name in folder_mapping.items()
+    ]
+    # 映射表里的目标名是固定的，已存在时跳过而不是追加后缀
+    plan, rename_map = run_plan(moves, dry_run=dry_run, on_collision='skip')
+    return rename_map
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把课程文件夹改为英文名并更新 JSON 引用")
+    parser.add_argument('--dry-run', action='store_true', help="只输出重命名计划，不修改文件")
+    args = parser.parse_args()
+
     print("开始重命名文件夹...")
-    rename_folders()
-    print("开始更新 JSON 文件...")
-    update_json_files()
+    try:
+        rename_folders(args.dry_run)
+    except PendingJournalError as e:
+        print(e)
     print("完成!")
\ No newline at end of file
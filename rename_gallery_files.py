@@ -2,9 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import os
-import shutil
+import argparse
 
-def rename_gallery_files():
+from rename_plan import run_plan, PendingJournalError
+
+def rename_gallery_files(dry_run=False):
     """重命名 gallery 文件夹中的中文文件名"""
     
     gallery_path = "public/images/gallery"
@@ -19,17 +21,22 @@ def rename_gallery_files():
         "非常态中的常态.webp": "normal-in-abnormal.webp"
     }
     
-    for old_name, new_name in file_mapping.items():
-        old_path = os.path.join(gallery_path, old_name)
-        new_path = os.path.join(gallery_path, new_name)
-        
-        if os.path.exists(old_path):
-            print(f"重命名文件: {old_path} -> {new_path}")
-            shutil.move(old_path, new_path)
-        else:
-            print(f"文件不存在: {old_path}")
+    moves = [
+        (os.path.join(gallery_path, old_name), os.path.join(gallery_path, new_name))
+        for old_name, new_name in file_mapping.items()
+    ]
+    # 先整体规划再带日志批量执行，JSON 中的引用一起更新
+    plan, rename_map = run_plan(moves, dry_run=dry_run, on_collision='skip')
+    return rename_map
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 gallery 文件夹中的中文文件名改为英文")
+    parser.add_argument('--dry-run', action='store_true', help="只输出重命名计划，不修改文件")
+    args = parser.parse_args()
+
     print("开始重命名 gallery 文件...")
-    rename_gallery_files()
+    try:
+        rename_gallery_files(args.dry_run)
+    except PendingJournalError as e:
+        print(e)
     print("完成!")
\ No newline at end of file
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from collections import deque
+from datetime import datetime
+
+from compile_data import compile_data
+from json_references import DATA_FILES, path_to_url, update_references
+
+JOURNAL_DIR = ".rename-journal"
+PLAN_FILE = "plan.json"
+PROGRESS_FILE = "progress.log"
+BACKUP_DIR = "backup"
+
+TMP_SUFFIX = ".renaming"
+
+class PendingJournalError(Exception):
+    """存在未完成的重命名日志"""
+
+def _listdir(path, cache):
+    """读取目录内容并缓存，规划时每个目录只列一次"""
+    if path not in cache:
+        try:
+            cache[path] = set(os.listdir(path or '.'))
+        except FileNotFoundError:
+            cache[path] = set()
+    return cache[path]
+
+def _with_suffix(path, counter, is_dir):
+    """a.webp -> a-1.webp；目录直接加后缀"""
+    if is_dir:
+        return f"{path}-{counter}"
+    name, ext = os.path.splitext(path)
+    return f"{name}-{counter}{ext}"
+
+def plan_renames(moves, on_collision='suffix'):
+    """根据 (原路径, 新路径) 列表计算完整的重命名计划，不修改磁盘
+
+    - 目标与已有文件或计划中的其他目标冲突时，on_collision='suffix' 追加 -1、-2
+      后缀，'skip' 跳过该项；冲突判断在内存中进行，每个目录只列一次
+    - 目标正好是另一项的原路径时，先移走被占用的那一项
+    - 互相占用形成环（a -> b, b -> a）时，借助临时文件名断开
+
+    返回 {'moves': 逻辑重命名, 'steps': 按执行顺序排列的实际操作, 'skipped': 跳过的项}
+    """
+    listing = {}
+    sources = set()
+    planned = []
+    skipped = []
+
+    for src, dst in moves:
+        if src == dst:
+            continue
+        if not os.path.lexists(src):
+            skipped.append({'src': src, 'dst': dst, 'reason': 'missing'})
+            continue
+        sources.add(src)
+        planned.append([src, dst])
+
+    # 冲突处理：被移走的原路径之后会空出来，其余已存在的名字和已分配的目标都算占用
+    def occupied(path, claimed):
+        existing = _listdir(os.path.dirname(path), listing)
+        taken = os.path.basename(path) in existing and path not in sources
+        return taken or path in claimed
+
+    # 第一遍（skip）：先确定哪些原路径真的会空出来。跳过一项后它的原路径仍然被占用，
+    # 前面已通过检查、以它为目标的项也要跳过，所以重复检查直到没有新的跳过项
+    changed = on_collision == 'skip'
+    while changed:
+        changed = False
+        claimed = set()
+        remaining = []
+        for src, dst in planned:
+            if occupied(dst, claimed):
+                skipped.append({'src': src, 'dst': dst, 'reason': 'exists'})
+                sources.discard(src)
+                changed = True
+                continue
+            claimed.add(dst)
+            remaining.append([src, dst])
+        planned = remaining
+
+    # 第二遍：分配最终目标，skip 时上一遍已排除所有冲突
+    claimed = set()
+    logical = []
+    for src, dst in planned:
+        is_dir = os.path.isdir(src)
+        target = dst
+        counter = 1
+        while occupied(target, claimed):
+            target = _with_suffix(dst, counter, is_dir)
+            counter += 1
+        claimed.add(target)
+        logical.append([src, target])
+
+    # 排序：目标被另一项的原路径占用时，等那一项先执行；其余保持输入顺序。
+    # 目标不重复，所以每个路径最多有一项在等待，依赖关系只会是链或环
+    pending = [list(move) for move in logical]
+    active = {src for src, _ in pending}
+    waiting = {}
+    ready = deque()
+    for i, (src, dst) in enumerate(pending):
+        if dst in active:
+            waiting[dst] = i
+        else:
+            ready.append(i)
+
+    steps = []
+    finished = [False] * len(pending)
+    remaining = len(pending)
+    first_unfinished = 0
+
+    while remaining:
+        if ready:
+            i = ready.popleft()
+            src, dst = pending[i]
+            steps.append([src, dst])
+            finished[i] = True
+            remaining -= 1
+        else:
+            # 剩下的都在环上：把第一项先移到临时名，释放它的原路径
+            while finished[first_unfinished]:
+                first_unfinished += 1
+            i = first_unfinished
+            src = pending[i][0]
+            tmp = src + TMP_SUFFIX
+            while tmp in active or os.path.lexists(tmp):
+                tmp += '~'
+            steps.append([src, tmp])
+            pending[i][0] = tmp
+            active.add(tmp)
+
+        active.discard(src)
+        released = waiting.pop(src, None)
+        if released is not None:
+            ready.append(released)
+
+    return {'moves': logical, 'steps': steps, 'skipped': skipped}
+
+def rename_map_for(plan):
+    """把计划中 public/ 下的逻辑重命名转换为 URL 映射"""
+    return {
+        path_to_url(src): path_to_url(dst)
+        for src, dst in plan['moves']
+        if src.replace('\\', '/').startswith('public/')
+    }
+
+def print_plan(plan):
+    """输出计划（dry-run）"""
+    for src, dst in plan['moves']:
+        print(f"计划重命名: {src} -> {dst}")
+    for item in plan['skipped']:
+        reason = "不存在" if item['reason'] == 'missing' else "目标已存在"
+        print(f"跳过（{reason}）: {item['src']} -> {item['dst']}")
+    extra = len(plan['steps']) - len(plan['moves'])
+    print(f"共 {len(plan['moves'])} 项，{len(plan['steps'])} 步操作" + (f"（含 {extra} 步临时改名以解开循环）" if extra else ""))
+
+def _journal_path(journal_dir, name):
+    return os.path.join(journal_dir, name)
+
+def _read_progress(journal_dir):
+    """读取进度日志，返回 (已完成步骤集合, 标记集合)"""
+    done = set()
+    marks = set()
+    try:
+        with open(_journal_path(journal_dir, PROGRESS_FILE), 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('step '):
+                    done.add(int(line[5:]))
+                elif line:
+                    marks.add(line)
+    except FileNotFoundError:
+        pass
+    return done, marks
+
+def _append_progress(log, line, sync=False):
+    log.write(line + '\n')
+    log.flush()
+    if sync:
+        os.fsync(log.fileno())
+
+def load_journal(journal_dir=JOURNAL_DIR):
+    """读取日志中的计划，没有日志时返回 None"""
+    try:
+        with open(_journal_path(journal_dir, PLAN_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def journal_status(journal_dir=JOURNAL_DIR):
+    """返回 None（无日志）、'running'、'complete' 或 'rolled-back'"""
+    if load_journal(journal_dir) is None:
+        return None
+    _, marks = _read_progress(journal_dir)
+    for status in ('rolled-back', 'complete'):
+        if status in marks:
+            return status
+    return 'running'
+
+def _completed_steps(journal, done):
+    """已完成的步骤数。步骤按顺序执行，每一步完成后立即把记录落盘，
+    所以日志中记录的最后一步之前都已完成，最多还有紧接着的一步已经改名但没来得及记录。
+
+    只有这一步能按磁盘状态（原路径已空、目标已存在）核对：链式和循环改名中
+    同一路径会先后作为不同步骤的目标和来源，更靠后的步骤无法从磁盘状态判断。
+    """
+    steps = journal['steps']
+    count = max(done) + 1 if done else 0
+    if count < len(steps):
+        src, dst = steps[count]
+        if not os.path.lexists(src) and os.path.lexists(dst):
+            count += 1
+    return count
+
+def _run(journal_dir):
+    """按日志执行（或继续执行）计划：逐步重命名，再备份并更新数据文件"""
+    journal = load_journal(journal_dir)
+    done, marks = _read_progress(journal_dir)
+
+    with open(_journal_path(journal_dir, PROGRESS_FILE), 'a', encoding='utf-8') as log:
+        completed = _completed_steps(journal, done)
+        for i in range(completed, len(journal['steps'])):
+            src, dst = journal['steps'][i]
+            parent = os.path.dirname(dst)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+            os.rename(src, dst)
+            _append_progress(log, f"step {i}", sync=True)
+            print(f"重命名: {src} -> {dst}")
+        _append_progress(log, "moved", sync=True)
+
+        if journal['rename_map'] and 'refs' not in marks:
+            backup_dir = _journal_path(journal_dir, BACKUP_DIR)
+            if 'backup' in marks:
+                # 上次更新到一半中断：先恢复备份，再完整地重新更新一次
+                _restore_backups(journal, backup_dir)
+            else:
+                for data_file in journal['data_files']:
+                    if os.path.exists(data_file):
+                        target = os.path.join(backup_dir, data_file)
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        shutil.copy2(data_file, target)
+                _append_progress(log, "backup", sync=True)
+            update_references(journal['rename_map'], journal['data_files'])
+            # 页面读取的是编译后的分片，数据文件改了就要重新编译
+            compile_data()
+            _append_progress(log, "refs", sync=True)
+
+        _append_progress(log, "complete", sync=True)
+
+    return journal['rename_map']
+
+def _restore_backups(journal, backup_dir):
+    """用备份覆盖数据文件"""
+    for data_file in journal['data_files']:
+        backup = os.path.join(backup_dir, data_file)
+        if os.path.exists(backup):
+            shutil.copy2(backup, data_file)
+            print(f"已恢复 {data_file}")
+
+def execute_plan(plan, update_refs=True, data_files=DATA_FILES, journal_dir=JOURNAL_DIR):
+    """先写日志再批量执行计划，返回 URL 重命名映射
+
+    执行中断后可以用 resume_journal 继续，或用 rollback_journal 撤销。
+    """
+    if journal_status(journal_dir) == 'running':
+        raise PendingJournalError(f"{journal_dir} 中有未完成的重命名，请先 --resume 或 --rollback")
+
+    if not plan['steps']:
+        return {}
+
+    shutil.rmtree(journal_dir, ignore_errors=True)
+    os.makedirs(journal_dir)
+    journal = {
+        'version': 1,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'steps': plan['steps'],
+        'rename_map': rename_map_for(plan) if update_refs else {},
+        'data_files': list(data_files),
+    }
+    tmp_file = _journal_path(journal_dir, PLAN_FILE + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(journal, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, _journal_path(journal_dir, PLAN_FILE))
+
+    return _run(journal_dir)
+
+def resume_journal(journal_dir=JOURNAL_DIR):
+    """继续执行被中断的计划"""
+    if journal_status(journal_dir) != 'running':
+        print("没有需要继续的重命名")
+        return {}
+    return _run(journal_dir)
+
+def rollback_journal(journal_dir=JOURNAL_DIR):
+    """按相反顺序撤销已执行的步骤，并恢复数据文件"""
+    journal = load_journal(journal_dir)
+    if journal is None or journal_status(journal_dir) == 'rolled-back':
+        print("没有可以回滚的重命名")
+        return
+    done, marks = _read_progress(journal_dir)
+
+    with open(_journal_path(journal_dir, PROGRESS_FILE), 'a', encoding='utf-8') as log:
+        for i in reversed(range(_completed_steps(journal, done))):
+            src, dst = journal['steps'][i]
+            os.rename(dst, src)
+            print(f"撤销: {dst} -> {src}")
+        if 'backup' in marks:
+            _restore_backups(journal, _journal_path(journal_dir, BACKUP_DIR))
+            compile_data()
+        _append_progress(log, "rolled-back", sync=True)
+    print("回滚完成")
+
+def run_plan(moves, dry_run=False, on_collision='suffix', update_refs=True):
+    """各重命名脚本的公共入口：规划、输出计划，非 dry-run 时执行，返回 (计划, URL 映射)"""
+    plan = plan_renames(moves, on_collision)
+    if dry_run:
+        print_plan(plan)
+        return plan, rename_map_for(plan)
+    for item in plan['skipped']:
+        reason = "不存在" if item['reason'] == 'missing' else "目标已存在"
+        print(f"跳过（{reason}）: {item['src']} -> {item['dst']}")
+    return plan, execute_plan(plan, update_refs)
+
+def main():
+    parser = argparse.ArgumentParser(description="查看、继续或回滚重命名日志")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--status', action='store_true', help="查看日志状态")
+    group.add_argument('--resume', action='store_true', help="继续执行中断的重命名")
+    group.add_argument('--rollback', action='store_true', help="撤销日志中的重命名并恢复数据文件")
+    parser.add_argument('--journal', default=JOURNAL_DIR, help="日志目录")
+    args = parser.parse_args()
+
+    if args.status:
+        status = journal_status(args.journal)
+        if status is None:
+            print("没有重命名日志")
+        else:
+            journal = load_journal(args.journal)
+            done, _ = _read_progress(args.journal)
+            print(f"状态: {status}，创建于 {journal['created']}，已记录 {len(done)}/{len(journal['steps'])} 步")
+    elif args.resume:
+        resume_journal(args.journal)
+    else:
+        rollback_journal(args.journal)
+
+if __name__ == "__main__":
+    try:
+        main()
+    except PendingJournalError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
@@ -1,11 +1,8 @@
 import Link from 'next/link';
 import { notFound } from 'next/navigation';
 import { Metadata } from 'next';
-import { BlogPost } from '@/types';
 import BlogPostClient from './BlogPostClient';
-
-// Import data
-import blogData from '@/data/blog.json';
+import { loadBlogPost } from '@/lib/shards';
 
 interface PageProps {
   params: {
@@ -14,9 +11,7 @@ interface PageProps {
 }
 
 export async function generateMetadata({ params }: PageProps): Promise<Metadata> {
-  const post: BlogPost | undefined = blogData.find(
-    (p) => p.slug === params.slug
-  );
+  const post = await loadBlogPost(params.slug);
 
   if (!post) {
     return {
@@ -45,10 +40,9 @@ export async function generateMetadata({ params }: PageProps): Promise<Metadata>
   };
 }
 
-export default function BlogPostPage({ params }: PageProps) {
-  const post: BlogPost | undefined = blogData.find(
-    (p) => p.slug === params.slug
-  );
+export default async function BlogPostPage({ params }: PageProps) {
+  // 只加载当前文章的分片
+  const post = await loadBlogPost(params.slug);
 
   if (!post) {
     notFound();
@@ -4,15 +4,19 @@ import { useState } from 'react';
 import Link from 'next/link';
 import { useTranslations } from 'next-intl';
 
-import { BlogPost } from '@/types';
+import { BlogPostSummary } from '@/types';
 
-// Import sample data
-import blogData from '@/data/blog.json';
+// 列表页只需要不含正文的精简索引（compile_data.py 生成）
+import blogData from '@/data/compiled/blog-index.json';
 import blogConfig from '@/data/blog-config.json';
+import { formatMimeType, siblingUrl } from '@/lib/imageFormats';
+
+// 头图可能带有预生成的兄弟格式（convert_images.py --siblings）
+const heroImage: { url: string; alt: string; formats?: string[] } = blogConfig.heroImage;
 
 // Note: metadata moved to layout.tsx for client component
 
-interface ExtendedBlogPost extends BlogPost {
+interface ExtendedBlogPost extends BlogPostSummary {
   category?: string;
   order?: number;
 }
@@ -70,11 +74,16 @@ export default function BlogPage({ params }: { params: { locale: string } }) {
       {/* Hero Section with Custom Image */}
       <section className="relative h-96 flex items-center justify-center overflow-hidden">
         <div className="absolute inset-0">
-          <img
-            src={blogConfig.heroImage.url}
-            alt={blogConfig.heroImage.alt}
-            className="w-full h-full object-cover"
-          />
+          <picture className="block w-full h-full">
+            {heroImage.formats?.map((format) => (
+              <source key={format} type={formatMimeType(format)} srcSet={siblingUrl(heroImage.url, format)} />
+            ))}
+            <img
+              src={heroImage.url}
+              alt={heroImage.alt}
+              className="w-full h-full object-cover"
+            />
+          </picture>
           <div className="absolute inset-0 bg-black bg-opacity-50" />
         </div>
         
@@ -127,11 +136,16 @@ export default function BlogPage({ params }: { params: { locale: string } }) {
                   {/* Featured Image */}
                   <div className="relative h-48">
                     {post.featuredImageUrl ? (
-                      <img
-                        src={post.featuredImageUrl}
-                        alt={post.title}
-                        className="w-full h-full object-cover"
-                      />
+                      <picture className="block w-full h-full">
+                        {post.featuredImageFormats?.map((format) => (
+                          <source key={format} type={formatMimeType(format)} srcSet={siblingUrl(post.featuredImageUrl, format)} />
+                        ))}
+                        <img
+                          src={post.featuredImageUrl}
+                          alt={post.title}
+                          className="w-full h-full object-cover"
+                        />
+                      </picture>
                     ) : (
                       <div className="bg-gradient-to-br from-gray-400 to-gray-600 h-full flex items-center justify-center">
                         <span className="text-white font-semibold">
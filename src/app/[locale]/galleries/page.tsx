@@ -2,10 +2,10 @@
 
 import Link from 'next/link';
 import { useTranslations } from 'next-intl';
-import { Gallery } from '@/types';
+import { GallerySummary } from '@/types';
 
-// Import sample data
-import galleriesData from '@/data/galleries.json';
+// 列表页只需要精简索引（compile_data.py 生成）
+import galleriesData from '@/data/compiled/galleries-index.json';
 
 export default function GalleriesPage({ params }: { params: { locale: string } }) {
   const { locale } = params;
@@ -29,7 +29,7 @@ export default function GalleriesPage({ params }: { params: { locale: string } }
       return defaultTexts[key] || key;
     }
   };
-  const galleries: Gallery[] = galleriesData;
+  const galleries: GallerySummary[] = galleriesData;
 
   return (
     <div className="min-h-screen bg-gray-50">
@@ -77,7 +77,7 @@ export default function GalleriesPage({ params }: { params: { locale: string } }
                     </h3>
                     <div className="flex items-center justify-between">
                       <span className="text-white/90 text-lg font-medium drop-shadow-md">
-                        {gallery.photos.length} {getTranslation('photosCount')}
+                        {gallery.photoCount} {getTranslation('photosCount')}
                       </span>
                       <div className="opacity-0 group-hover:opacity-100 transition-opacity duration-300">
                         <span className="text-white text-lg font-semibold bg-white/20 backdrop-blur-sm px-4 py-2 rounded-full border border-white/30">
@@ -3,8 +3,10 @@
 import Link from 'next/link';
 import { useState, useEffect, useRef } from 'react';
 import { useTranslations } from 'next-intl';
-import { Gallery } from '@/types';
-import galleries from '@/data/galleries.json';
+import { GallerySummary } from '@/types';
+import galleriesData from '@/data/compiled/galleries-index.json';
+
+const galleries: GallerySummary[] = galleriesData;
 
 // 注意：由于使用了客户端组件，metadata 需要在 layout.tsx 中设置
 
@@ -13,7 +15,7 @@ const featuredGalleries = galleries.slice(0, 12);
 
 // 从所有画廊中提取单张作品
 const featuredPhotos = galleries.flatMap(gallery =>
-  gallery.photos.slice(0, 2).map(photo => ({
+  gallery.previewPhotos.slice(0, 2).map(photo => ({
     ...photo,
     galleryTitle: gallery.title,
     gallerySlug: gallery.slug
@@ -21,7 +23,7 @@ const featuredPhotos = galleries.flatMap(gallery =>
 ).slice(0, 18); // 显示18张单张作品
 
 // 瀑布流组件
-function MasonryGrid({ galleries, isSinglePhoto = false, getTranslation, currentLocale }: { galleries: Gallery[]; isSinglePhoto?: boolean; getTranslation: (key: string) => string; currentLocale: string }) {
+function MasonryGrid({ galleries, isSinglePhoto = false, getTranslation, currentLocale }: { galleries: GallerySummary[]; isSinglePhoto?: boolean; getTranslation: (key: string) => string; currentLocale: string }) {
   const [imageHeights, setImageHeights] = useState<{ [key: string]: number }>({});
   const [isLoaded, setIsLoaded] = useState(false);
   const [selectedImage, setSelectedImage] = useState<string | null>(null);
@@ -105,7 +107,7 @@ function MasonryGrid({ galleries, isSinglePhoto = false, getTranslation, current
                           {gallery.description}
                         </p>
                         <div className="mt-2 text-xs text-gray-300">
-                          {gallery.photos.length} {getTranslation('featuredGalleries.photosCount')}
+                          {gallery.photoCount} {getTranslation('featuredGalleries.photosCount')}
                         </div>
                       </div>
                     </div>
@@ -179,7 +181,7 @@ function MasonryGrid({ galleries, isSinglePhoto = false, getTranslation, current
                           {gallery.description}
                         </p>
                         <div className="mt-2 text-xs text-gray-300">
-                          {gallery.photos.length} {getTranslation('featuredGalleries.photosCount')}
+                          {gallery.photoCount} {getTranslation('featuredGalleries.photosCount')}
                         </div>
                       </div>
                     </div>
@@ -322,7 +324,8 @@ export default function Home({ params }: { params: { locale: string } }) {
                 title: photo.title || photo.galleryTitle,
                 description: photo.description || `来自《${photo.galleryTitle}》`,
                 coverPhotoUrl: photo.url,
-                photos: [photo]
+                photoCount: 1,
+                previewPhotos: [photo]
               }))}
               isSinglePhoto={true}
               getTranslation={getTranslation}
@@ -2,6 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import fs from 'fs';
 import path from 'path';
 import { BlogPost } from '@/types';
+import { compileBlog } from '@/lib/compileBlog';
 
 const BLOG_DATA_PATH = path.join(process.cwd(), 'src/data/blog.json');
 const TUTORIAL_DATA_PATH = path.join(process.cwd(), 'src/data/tutorials.json');
@@ -29,6 +30,8 @@ function readTutorialData(): BlogPost[] {
 function writeBlogData(posts: BlogPost[]): boolean {
   try {
     fs.writeFileSync(BLOG_DATA_PATH, JSON.stringify(posts, null, 2));
+    // 页面读取的是编译后的索引和分片，不重新生成的话改动不会出现在站点上
+    compileBlog(posts);
     return true;
   } catch (error) {
     console.error('Error writing blog data:', error);
@@ -5,6 +5,8 @@ import { useTranslations } from 'next-intl';
 import Link from 'next/link';
 import { usePathname } from 'next/navigation';
 
+import SearchBox from '@/components/SearchBox';
+
 export default function Navbar() {
   const [isMenuOpen, setIsMenuOpen] = useState(false);
   const pathname = usePathname();
@@ -56,6 +58,8 @@ export default function Navbar() {
                 {item.label}
               </Link>
             ))}
+
+            <SearchBox locale={currentLocale} />
             
             {/* Language Switch Button */}
             <Link
@@ -95,6 +99,10 @@ export default function Navbar() {
                 {item.label}
               </Link>
             ))}
+
+            <div className="py-2">
+              <SearchBox locale={currentLocale} onNavigate={() => setIsMenuOpen(false)} />
+            </div>
             
             {/* Mobile Language Switch */}
             <Link
@@ -0,0 +1,85 @@
+'use client';
+
+import { useEffect, useState } from 'react';
+import Link from 'next/link';
+import { useTranslations } from 'next-intl';
+
+import { search, SearchResult } from '@/lib/search';
+
+// 停止输入后再查询，避免每个按键都下载分片
+const SEARCH_DELAY = 200;
+const RESULT_LIMIT = 8;
+
+export default function SearchBox({ locale, onNavigate }: { locale: string; onNavigate?: () => void }) {
+  const t = useTranslations('Navbar');
+  const [query, setQuery] = useState('');
+  const [results, setResults] = useState<SearchResult[]>([]);
+  // 结果对应的查询词，用来区分“还在查询”和“没有结果”
+  const [resultQuery, setResultQuery] = useState('');
+
+  useEffect(() => {
+    if (!query.trim()) {
+      setResults([]);
+      setResultQuery('');
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      search(query, RESULT_LIMIT).then((found) => {
+        if (!cancelled) {
+          setResults(found);
+          setResultQuery(query);
+        }
+      });
+    }, SEARCH_DELAY);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query]);
+
+  const hrefFor = (result: SearchResult) =>
+    `/${locale}/${result.type === 'blog' ? 'blog' : 'galleries'}/${result.slug}`;
+
+  const close = () => {
+    setQuery('');
+    onNavigate?.();
+  };
+
+  return (
+    <div className="relative">
+      <input
+        type="search"
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+        onKeyDown={(e) => e.key === 'Escape' && setQuery('')}
+        placeholder={t('searchPlaceholder')}
+        aria-label={t('searchPlaceholder')}
+        className="w-full md:w-56 px-3 py-1 rounded-md border border-gray-300 text-sm focus:outline-none focus:border-gray-500"
+      />
+
+      {query.trim() && resultQuery === query && (
+        <ul className="absolute right-0 z-20 mt-2 w-full md:w-80 bg-white border border-gray-200 rounded-md shadow-lg overflow-hidden">
+          {results.length === 0 ? (
+            <li className="px-4 py-3 text-sm text-gray-500">{t('noResults')}</li>
+          ) : (
+            results.map((result) => (
+              <li key={`${result.type}:${result.slug}`}>
+                <Link
+                  href={hrefFor(result)}
+                  onClick={close}
+                  className="flex items-center justify-between px-4 py-2 hover:bg-gray-50 transition-colors duration-200"
+                >
+                  <span className="text-sm text-gray-800 truncate">{result.title}</span>
+                  <span className="ml-3 shrink-0 text-xs text-gray-400">
+                    {result.type === 'blog' ? t('blog') : t('galleries')}
+                  </span>
+                </Link>
+              </li>
+            ))
+          )}
+        </ul>
+      )}
+    </div>
+  );
+}
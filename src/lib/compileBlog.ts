@@ -0,0 +1,51 @@
+// 与 compile_data.py 的 compile_blog 相同：管理后台改写 blog.json 后立即重写博客列表索引和文章分片
+import fs from 'fs';
+import path from 'path';
+import { BlogPost, BlogPostSummary } from '@/types';
+
+const COMPILED_DIR = path.join(process.cwd(), 'src/data/compiled');
+const BLOG_INDEX_PATH = path.join(COMPILED_DIR, 'blog-index.json');
+const BLOG_SHARD_DIR = path.join(COMPILED_DIR, 'blog');
+
+// slug 直接用作分片文件名
+const SLUG_RE = /^[A-Za-z0-9][A-Za-z0-9_-]*$/;
+
+// 内容没变的文件不重写，避免无关分片触发重新编译
+function writeIfChanged(file: string, data: unknown): void {
+  const text = JSON.stringify(data, null, 2);
+  try {
+    if (fs.readFileSync(file, 'utf8') === text) return;
+  } catch {
+    // 文件不存在时直接写入
+  }
+  const tmpFile = `${file}.tmp`;
+  fs.writeFileSync(tmpFile, text);
+  fs.renameSync(tmpFile, file);
+}
+
+// 列表索引不含正文和图片列表
+function summarize(post: BlogPost): BlogPostSummary {
+  const summary: Partial<BlogPost> = { ...post };
+  delete summary.content;
+  delete summary.images;
+  return summary as BlogPostSummary;
+}
+
+export function compileBlog(posts: BlogPost[]): void {
+  const valid = posts.filter((post) => SLUG_RE.test(post.slug));
+  fs.mkdirSync(BLOG_SHARD_DIR, { recursive: true });
+
+  for (const post of valid) {
+    writeIfChanged(path.join(BLOG_SHARD_DIR, `${post.slug}.json`), post);
+  }
+
+  // 删除已经没有对应文章的分片
+  const slugs = new Set(valid.map((post) => post.slug));
+  for (const name of fs.readdirSync(BLOG_SHARD_DIR)) {
+    if (name.endsWith('.json') && !slugs.has(name.slice(0, -'.json'.length))) {
+      fs.unlinkSync(path.join(BLOG_SHARD_DIR, name));
+    }
+  }
+
+  writeIfChanged(BLOG_INDEX_PATH, valid.map(summarize));
+}
@@ -0,0 +1,11 @@
+// 预生成的兄弟格式（由 convert_images.py --siblings 生成并记录在数据文件中）
+
+// 同一张图片其他格式的地址：/a/b.webp -> /a/b.avif
+export function siblingUrl(url: string, format: string): string {
+  return url.replace(/\.[^./]+$/, `.${format}`);
+}
+
+// <source> 的 MIME 类型：avif -> image/avif，jxl -> image/jxl
+export function formatMimeType(format: string): string {
+  return `image/${format}`;
+}
@@ -0,0 +1,17 @@
+// next/image 自定义加载器：返回 generate_thumbnails.py 预生成的静态变体，运行时不再缩放图片
+import type { ImageLoaderProps } from 'next/image';
+import loaderManifest from '@/data/image-loader-manifest.json';
+
+// 原图 URL -> [[宽度, 变体 URL], ...]，按宽度从小到大排列，最后一项是原图
+const variants = loaderManifest as Record<string, [number, string][]>;
+
+export default function imageLoader({ src, width, quality }: ImageLoaderProps): string {
+  const candidates = variants[src];
+  if (!candidates || candidates.length === 0) {
+    // 清单里没有（未运行 generate_thumbnails.py 或新加的图片）时交给 Next 内置优化，避免直接下载原图
+    return `/_next/image?url=${encodeURIComponent(src)}&w=${width}&q=${quality ?? 75}`;
+  }
+  // 取不小于请求宽度的最小变体，都不够宽时用原图
+  const match = candidates.find(([candidateWidth]) => candidateWidth >= width);
+  return (match ?? candidates[candidates.length - 1])[1];
+}
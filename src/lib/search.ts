@@ -0,0 +1,105 @@
+// 查询 build_search_index.py 生成的倒排索引，只下载查询词所在的分片
+const SEARCH_BASE = '/search';
+
+// 与 build_search_index.py 的 tokenize 保持一致（查询端不做词汇表扩展）
+const TOKEN_RE = /[\u4e00-\u9fff]+|[a-z0-9]+/g;
+
+export interface SearchDoc {
+  type: 'blog' | 'gallery';
+  slug: string;
+  title: string;
+  image: string;
+}
+
+export interface SearchResult extends SearchDoc {
+  score: number;
+}
+
+interface SearchDocs {
+  version: number;
+  cjkShardShift: number;
+  docs: (SearchDoc | null)[]; // 下标为文档编号，已删除的记录为 null
+}
+
+// 词项 -> [文档编号, 权重, 文档编号, 权重, ...]
+type TermShard = Record<string, number[]>;
+
+const cache = new Map<string, Promise<unknown>>();
+
+function fetchJson<T>(path: string, fallback: T): Promise<T> {
+  if (!cache.has(path)) {
+    const request = fetch(`${SEARCH_BASE}/${path}`)
+      .then((res) => (res.ok ? res.json() : fallback))
+      .catch(() => {
+        // 网络错误不缓存，下次查询重试
+        cache.delete(path);
+        return fallback;
+      });
+    cache.set(path, request);
+  }
+  return cache.get(path) as Promise<T>;
+}
+
+export function tokenize(text: string): string[] {
+  const terms: string[] = [];
+  for (const run of text.normalize('NFKC').toLowerCase().match(TOKEN_RE) ?? []) {
+    if (run.charCodeAt(0) < 128) {
+      if (run.length > 1 || /^\d$/.test(run)) terms.push(run);
+      continue;
+    }
+    if (run.length === 1) terms.push(run);
+    for (let i = 0; i < run.length - 1; i++) terms.push(run.slice(i, i + 2));
+  }
+  return Array.from(new Set(terms));
+}
+
+function shardKey(term: string, cjkShardShift: number): string {
+  const code = term.charCodeAt(0);
+  return code < 128 ? term[0] : `u${(code >> cjkShardShift).toString(16)}`;
+}
+
+// 词项命中的 文档编号 -> 权重；prefix 为 true 时合并所有以该词开头的词项（用于正在输入的最后一个词）
+function collectPostings(shard: TermShard, term: string, prefix: boolean): Map<number, number> {
+  const hits = new Map<number, number>();
+  const terms = prefix ? Object.keys(shard).filter((t) => t.startsWith(term)) : term in shard ? [term] : [];
+  for (const t of terms) {
+    const postings = shard[t];
+    for (let i = 0; i < postings.length; i += 2) {
+      hits.set(postings[i], (hits.get(postings[i]) ?? 0) + postings[i + 1]);
+    }
+  }
+  return hits;
+}
+
+export async function search(query: string, limit = 20): Promise<SearchResult[]> {
+  const terms = tokenize(query);
+  if (terms.length === 0) return [];
+
+  const index = await fetchJson<SearchDocs>('docs.json', { version: 0, cjkShardShift: 0, docs: [] });
+  const total = index.docs.filter(Boolean).length;
+  if (total === 0) return [];
+
+  const shards = await Promise.all(
+    terms.map((term) => fetchJson<TermShard>(`terms-${shardKey(term, index.cjkShardShift)}.json`, {}))
+  );
+
+  // 所有查询词都要命中；按 权重 × idf 累加得分
+  let scores = new Map<number, number>();
+  for (let i = 0; i < terms.length; i++) {
+    const hits = collectPostings(shards[i], terms[i], i === terms.length - 1);
+    const idf = Math.log(1 + total / Math.max(hits.size, 1));
+    const next = new Map<number, number>();
+    hits.forEach((weight, doc) => {
+      if (i === 0 || scores.has(doc)) {
+        next.set(doc, (scores.get(doc) ?? 0) + weight * idf);
+      }
+    });
+    scores = next;
+  }
+
+  return Array.from(scores.entries())
+    .filter(([doc]) => index.docs[doc])
+    .map(([doc, score]) => ({ ...(index.docs[doc] as SearchDoc), score }))
+    .sort((a, b) => b.score - a.score)
+    .slice(0, limit);
+}
@@ -0,0 +1,21 @@
+// 按 slug 加载 compile_data.py 生成的分片，每个详情页只打包自己的数据
+import galleryIndexData from '@/data/compiled/galleries-index.json';
+import blogIndexData from '@/data/compiled/blog-index.json';
+import { BlogPost, GalleryShard } from '@/types';
+
+export async function loadGalleryShard(slug: string): Promise<GalleryShard | null> {
+  // 先查索引，避免用任意 slug 拼出不存在的模块路径
+  if (!galleryIndexData.some((g) => g.slug === slug)) {
+    return null;
+  }
+  const shard = await import(`@/data/compiled/galleries/${slug}.json`);
+  return shard.default as GalleryShard;
+}
+
+export async function loadBlogPost(slug: string): Promise<BlogPost | null> {
+  if (!blogIndexData.some((p) => p.slug === slug)) {
+    return null;
+  }
+  const post = await import(`@/data/compiled/blog/${slug}.json`);
+  return post.default as BlogPost;
+}
@@ -1,3 +1,10 @@
+// 照片的一个响应式尺寸
+export interface PhotoVariant {
+  url: string;
+  width: number;
+  height: number;
+}
+
 // 单张照片
 export interface Photo {
   id: string;
@@ -7,8 +14,22 @@ export interface Photo {
   description?: string; // 图片描述
   date: string;        // 拍摄日期
   location?: string;    // 拍摄地点
+  variants?: PhotoVariant[]; // 按宽度从小到大排列的响应式变体
+  formats?: string[];   // 原图和所有变体都已预生成的兄弟格式，如 ["avif"]
 }
 
+// 构建时预先提取的图片元数据，键为图片 URL（由 build_image_manifest.py 生成）
+export interface ImageMetadata {
+  width: number;
+  height: number;
+  blurhash: string;
+  lqip: string;           // 内联的低清占位图 data URI
+  dominantColor: string;  // 主色 #rrggbb
+  takenAt: string | null; // EXIF 拍摄时间
+}
+
+export type ImageManifest = Record<string, ImageMetadata>;
+
 // 作品集/系列
 export interface Gallery {
   slug: string;        // 用于 URL, e.g., "huangshan-1998"
@@ -18,6 +39,30 @@ export interface Gallery {
   photos: Photo[];     // 包含的照片
 }
 
+// 作品集列表项（compile_data.py 生成的 galleries-index.json）
+export interface GallerySummary {
+  slug: string;
+  title: string;
+  description: string;
+  coverPhotoUrl: string;
+  photoCount: number;
+  previewPhotos: Photo[]; // 首页展示的前几张照片
+}
+
+// 上一个/下一个作品集的导航链接
+export interface GalleryLink {
+  slug: string;
+  title: string;
+}
+
+// 单个作品集分片（compile_data.py 生成的 compiled/galleries/<slug>.json）
+export interface GalleryShard {
+  gallery: Gallery;
+  imageManifest: ImageManifest; // 只包含本作品集照片的元数据
+  prev: GalleryLink | null;
+  next: GalleryLink | null;
+}
+
 // 博客文章
 export interface BlogPost {
   slug: string;
@@ -26,11 +71,15 @@ export interface BlogPost {
   excerpt: string;       // 摘要
   content: string;       // Markdown/MDX 格式的内容
   featuredImageUrl: string;
+  featuredImageFormats?: string[]; // 封面图已预生成的兄弟格式
   category?: string;
   order?: number;
   images?: string[];     // 教程相关图片数组
 }
 
+// 博客列表项：不含正文（compile_data.py 生成的 blog-index.json）
+export type BlogPostSummary = Omit<BlogPost, 'content' | 'images'>;
+
 // 摄影师简介
 export interface PhotographerProfile {
   name: string;
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from rename_plan import plan_renames
+
+
+def touch(*names):
+    for name in names:
+        with open(name, 'w') as f:
+            f.write(name)
+
+
+def test_skipped_source_blocks_move_onto_it(tmp_path, monkeypatch):
+    """b -> c 因 c 已存在被跳过，b 仍然占用，a -> b 也必须跳过"""
+    monkeypatch.chdir(tmp_path)
+    touch('a', 'b', 'c')
+
+    plan = plan_renames([('a', 'b'), ('b', 'c')], on_collision='skip')
+
+    assert plan['moves'] == []
+    assert plan['steps'] == []
+    assert sorted((item['src'], item['dst']) for item in plan['skipped']) == [('a', 'b'), ('b', 'c')]
+
+
+def test_skip_keeps_chain_when_every_source_moves(tmp_path, monkeypatch):
+    """b -> c 能执行时 b 会空出来，a -> b 不算冲突"""
+    monkeypatch.chdir(tmp_path)
+    touch('a', 'b')
+
+    plan = plan_renames([('a', 'b'), ('b', 'c')], on_collision='skip')
+
+    assert plan['moves'] == [['a', 'b'], ['b', 'c']]
+    assert plan['steps'] == [['b', 'c'], ['a', 'b']]
+    assert plan['skipped'] == []